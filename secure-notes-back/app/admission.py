@@ -0,0 +1,164 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+from fastapi import HTTPException, Request
+from sqlalchemy import Float, case, delete, literal
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from .config import (
+    ADMISSION_BACKEND, ADMISSION_MAX_KEYS, AUTH_ACCOUNT_BURST, AUTH_ACCOUNT_RATE, AUTH_IP_BURST, AUTH_IP_RATE,
+)
+from .extensions import AsyncSessionLocal
+from .metrics import metrics
+from .models import RateLimitBucket
+import hashlib
+import math
+import time
+
+
+class Rule(NamedTuple):
+    """Seau à jetons : rate jetons par seconde, au plus burst accumulés (rate <= 0 : pas de limite)"""
+    rate: float
+    burst: float
+
+
+def refill(tokens: float, updated_at: float, now: float, rule: Rule) -> float:
+    return min(rule.burst, tokens + max(0.0, now - updated_at) * rule.rate)
+
+
+class BucketBackend(ABC):
+    """État des seaux : take() consomme un jeton et renvoie 0, ou le délai avant le prochain jeton"""
+
+    @abstractmethod
+    async def take(self, key: str, rule: Rule, now: Optional[float] = None) -> float:
+        ...
+
+    @abstractmethod
+    async def reset(self) -> None:
+        ...
+
+
+class MemoryBuckets(BucketBackend):
+    """Seaux propres au processus, bornés en nombre de clés (les moins récentes sont oubliées)
+
+    Avec N workers, chaque client obtient au plus N fois le débit configuré.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, rule: Rule, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        entry = self._buckets.get(key)
+        tokens = rule.burst if entry is None else refill(entry[0], entry[1], now, rule)
+        admitted = tokens >= 1
+        self._buckets[key] = (tokens - 1 if admitted else tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return 0.0 if admitted else (1 - tokens) / rule.rate
+
+    async def reset(self) -> None:
+        self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class DatabaseBuckets(BucketBackend):
+    """Seaux partagés par tous les workers, dans la table rate_limit_buckets
+
+    Chaque tentative coûte un seul INSERT ... ON CONFLICT DO UPDATE ... RETURNING : le
+    remplissage et la consommation sont calculés par la base, sans verrou applicatif.
+    """
+
+    DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+    def __init__(self, session_factory: async_sessionmaker, max_idle: float = 3600, prune_every: int = 1000):
+        self.session_factory = session_factory
+        self.max_idle = max_idle
+        self.prune_every = prune_every
+        self._calls = 0
+
+    def _upsert(self, dialect: str, key: str, rule: Rule, now: float):
+        table = RateLimitBucket.__table__
+        available = table.c.tokens + (literal(now, Float) - table.c.updated_at) * rule.rate
+        refilled = case((available > rule.burst, literal(rule.burst, Float)), else_=available)
+        admitted = refilled >= 1
+        return (
+            self.DIALECTS[dialect](table)
+            .values(key=key, tokens=rule.burst - 1, updated_at=now, admitted=True)
+            .on_conflict_do_update(
+                index_elements=[table.c.key],
+                set_={"tokens": case((admitted, refilled - 1), else_=refilled), "updated_at": now, "admitted": admitted},
+            )
+            .returning(table.c.tokens, table.c.admitted)
+        )
+
+    async def take(self, key: str, rule: Rule, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        async with self.session_factory() as db:
+            tokens, admitted = (await db.execute(self._upsert(db.bind.dialect.name, key, rule, now))).one()
+            self._calls += 1
+            if self._calls % self.prune_every == 0:
+                # Un seau inactif depuis max_idle est plein : le supprimer ne change rien
+                await db.execute(delete(RateLimitBucket).where(RateLimitBucket.updated_at < now - self.max_idle))
+            await db.commit()
+        return 0.0 if admitted else (1 - tokens) / rule.rate
+
+    async def reset(self) -> None:
+        async with self.session_factory() as db:
+            await db.execute(delete(RateLimitBucket))
+            await db.commit()
+
+
+def account_key(email: str) -> str:
+    # Condensat : les adresses ne sont pas conservées dans l'état de limitation
+    return hashlib.sha256(email.strip().lower().encode()).hexdigest()[:32]
+
+
+def client_ip(request: Request) -> str:
+    # Derrière un proxy, uvicorn remplace client par X-Forwarded-For (FORWARDED_ALLOW_IPS)
+    return request.client.host if request.client else "unknown"
+
+
+class AdmissionController:
+    """Refuse les tentatives d'authentification excédentaires avant toute requête SQL ou bcrypt"""
+
+    def __init__(self, backend: BucketBackend, per_ip: Rule, per_account: Rule):
+        self.backend = backend
+        self.per_ip = per_ip
+        self.per_account = per_account
+
+    async def admit(self, action: str, ip: str, account: Optional[str] = None) -> None:
+        """HTTPException 429 avec Retry-After si l'IP ou le compte a épuisé son seau"""
+        checks = [("ip", f"{action}:ip:{ip}", self.per_ip)]
+        if account is not None:
+            checks.append(("account", f"{action}:account:{account_key(account)}", self.per_account))
+        for reason, key, rule in checks:
+            if rule.rate <= 0:
+                continue
+            retry_after = await self.backend.take(key, rule)
+            if retry_after > 0:
+                metrics.admission_rejections.inc((action, reason))
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many attempts, try again later",
+                    headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+                )
+
+
+def build_backend(kind: str) -> BucketBackend:
+    if kind == "database":
+        return DatabaseBuckets(AsyncSessionLocal)
+    if kind == "memory":
+        return MemoryBuckets(ADMISSION_MAX_KEYS)
+    raise ValueError(f"Unknown ADMISSION_BACKEND: {kind}")
+
+
+auth_admission = AdmissionController(
+    build_backend(ADMISSION_BACKEND),
+    per_ip=Rule(AUTH_IP_RATE, AUTH_IP_BURST),
+    per_account=Rule(AUTH_ACCOUNT_RATE, AUTH_ACCOUNT_BURST),
+)
@@ -0,0 +1,220 @@
+from email.utils import format_datetime
+from typing import List, NamedTuple, Optional
+from urllib.parse import quote
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from .blobs import BlobStore, attachment_store
+from .config import ATTACHMENT_ACCEL_REDIRECT, ATTACHMENT_CHUNK_SIZE, ATTACHMENT_GC_GRACE
+from .extensions import AsyncSessionLocal
+from .models import Attachment
+from .repositories import AttachmentRepository
+import asyncio
+import datetime
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTENT_TYPE = "application/octet-stream"
+# En-têtes et champs autres que le fichier tolérés au-delà de la taille maximale
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadError(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+class Upload(NamedTuple):
+    key: str
+    size: int
+    filename: str
+    content_type: str
+
+
+class _FilePart:
+    """État du parseur multipart : seul le premier champ fichier est conservé"""
+
+    def __init__(self):
+        self.headers = {}
+        self.field, self.value = b"", b""
+        self.in_file = False
+        self.found = False
+        self.filename = ""
+        self.content_type = DEFAULT_CONTENT_TYPE
+        self.chunks: List[bytes] = []
+
+    def on_part_begin(self):
+        self.headers = {}
+
+    def on_header_field(self, data, start, end):
+        self.field += data[start:end]
+
+    def on_header_value(self, data, start, end):
+        self.value += data[start:end]
+
+    def on_header_end(self):
+        self.headers[self.field.lower()] = self.value
+        self.field, self.value = b"", b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.headers.get(b"content-disposition"))
+        self.in_file = not self.found and b"filename" in options
+        if self.in_file:
+            self.found = True
+            # Nom sans chemin : il ne sert qu'à Content-Disposition au téléchargement
+            name = options[b"filename"].decode("utf-8", "replace").replace("\\", "/").rsplit("/", 1)[-1]
+            self.filename = name[:255] or "attachment"
+            content_type = self.headers.get(b"content-type", b"").decode("latin-1").strip()
+            self.content_type = content_type[:255] or DEFAULT_CONTENT_TYPE
+
+    def on_part_data(self, data, start, end):
+        if self.in_file:
+            self.chunks.append(data[start:end])
+
+    def on_part_end(self):
+        self.in_file = False
+
+
+async def receive_upload(request: Request, store: BlobStore, max_size: int) -> Upload:
+    """Lit un corps multipart/form-data au fil de l'eau et écrit son fichier dans store
+
+    Le fichier n'est jamais entièrement en mémoire : les données de chaque morceau reçu
+    sont transmises au blob store, qui les écrit par blocs fixes.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type"))
+    if content_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise UploadError(400, "Expected a multipart/form-data body")
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > max_size + MULTIPART_OVERHEAD:
+        raise UploadError(413, "Attachment too large")
+
+    part = _FilePart()
+    callbacks = {name: getattr(part, name) for name in (
+        "on_part_begin", "on_header_field", "on_header_value", "on_header_end",
+        "on_headers_finished", "on_part_data", "on_part_end",
+    )}
+    parser = MultipartParser(options[b"boundary"], callbacks, max_size=max_size + MULTIPART_OVERHEAD)
+    writer = store.writer()
+    try:
+        async for chunk in request.stream():
+            try:
+                parser.write(chunk)
+            except MultipartParseError as e:
+                raise UploadError(400, f"Invalid multipart body: {e}") from e
+            for data in part.chunks:
+                await writer.write(data)
+            part.chunks.clear()
+            if writer.size > max_size:
+                raise UploadError(413, "Attachment too large")
+        parser.finalize()
+        if not part.found:
+            raise UploadError(400, "No file in the multipart body")
+        blob = await writer.commit()
+    except BaseException:
+        await writer.abort()
+        raise
+    return Upload(blob.key, blob.size, part.filename, part.content_type)
+
+
+class BlobFileResponse(FileResponse):
+    # Blocs plus gros que les 64 Ko par défaut : moins d'allers-retours vers le pool de threads
+    chunk_size = ATTACHMENT_CHUNK_SIZE
+
+
+def content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def attachment_response(attachment: Attachment, store: BlobStore = attachment_store) -> Response:
+    """Téléchargement d'une pièce jointe, requêtes Range comprises
+
+    Toujours en attachment avec nosniff : un fichier HTML ou SVG envoyé n'est jamais
+    interprété par le navigateur sur l'origine de l'API.
+    """
+    headers = {
+        "ETag": f'"{attachment.sha256}"',
+        # Le contenu d'une pièce jointe ne change jamais
+        "Cache-Control": "private, max-age=31536000, immutable",
+        "Content-Disposition": content_disposition(attachment.filename),
+        "X-Content-Type-Options": "nosniff",
+    }
+    if attachment.created_at is not None:
+        headers["Last-Modified"] = format_datetime(attachment.created_at.replace(tzinfo=datetime.timezone.utc), usegmt=True)
+    if ATTACHMENT_ACCEL_REDIRECT:
+        # nginx lit le fichier (sendfile) et gère lui-même Range et If-Range
+        headers["X-Accel-Redirect"] = f"{ATTACHMENT_ACCEL_REDIRECT}/{store.relative_path(attachment.sha256)}"
+        return Response(media_type=attachment.content_type, headers=headers)
+    # Serveur ASGI avec l'extension pathsend : envoi du fichier sans passer par Python
+    return BlobFileResponse(store.path(attachment.sha256), media_type=attachment.content_type, headers=headers)
+
+
+async def sweep_orphan_blobs(
+    db: AsyncSession,
+    store: BlobStore = attachment_store,
+    grace: float = ATTACHMENT_GC_GRACE,
+    keys: Optional[List[str]] = None,
+    batch_size: int = 1000,
+) -> int:
+    """Supprime les contenus qu'aucune pièce jointe ne référence et inutilisés depuis grace secondes
+
+    Les pièces jointes disparaissent aussi par ON DELETE CASCADE (note, compte) : leurs
+    contenus sont retrouvés ici. Le délai de grâce protège un envoi dédupliqué dont la
+    ligne n'est pas encore validée.
+    """
+    cutoff = time.time() - grace
+    if keys is None:
+        keys = await store.stale_keys(cutoff)
+    deleted = 0
+    for low in range(0, len(keys), batch_size):
+        batch = keys[low:low + batch_size]
+        referenced = await AttachmentRepository.referenced_hashes(db, batch)
+        # Pas de transaction ouverte pendant les suppressions de fichiers
+        await db.rollback()
+        for key in batch:
+            if key not in referenced and await store.delete(key, older_than=cutoff):
+                deleted += 1
+    await store.remove_stale_uploads(cutoff)
+    if deleted:
+        logger.info("Orphan attachment blobs removed", extra={"count": deleted})
+    return deleted
+
+
+async def sweep_deleted_blobs(
+    keys: List[str],
+    store: BlobStore = attachment_store,
+    session_factory: async_sessionmaker = AsyncSessionLocal,
+    grace: float = ATTACHMENT_GC_GRACE,
+) -> None:
+    """Balayage des contenus d'une suppression, après la réponse
+
+    Tâche d'arrière-plan : la session de la requête (get_db) est déjà fermée, le balayage
+    ouvre la sienne.
+    """
+    try:
+        async with session_factory() as db:
+            await sweep_orphan_blobs(db, store, grace=grace, keys=keys)
+    except Exception:
+        logger.exception("Attachment blob sweep failed")
+
+
+async def sweep_orphan_blobs_forever(
+    session_factory: async_sessionmaker = AsyncSessionLocal,
+    interval: float = 3600,
+) -> None:
+    """Balayage périodique des contenus orphelins, lancé par chaque worker (idempotent)"""
+    while True:
+        try:
+            async with session_factory() as db:
+                await sweep_orphan_blobs(db)
+        except Exception:
+            logger.exception("Attachment blob sweep failed")
+        await asyncio.sleep(interval)
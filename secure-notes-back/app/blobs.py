@@ -0,0 +1,197 @@
+from abc import ABC, abstractmethod
+from typing import List, NamedTuple, Optional
+from .config import ATTACHMENT_CHUNK_SIZE, ATTACHMENT_DIR
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+
+BLOB_KEY = re.compile(r"[0-9a-f]{64}")
+
+
+class StoredBlob(NamedTuple):
+    key: str
+    size: int
+    # Contenu déjà présent : le fichier envoyé a été écarté au profit de l'existant
+    deduplicated: bool
+
+
+class BlobWriter(ABC):
+    """Écriture d'un blob au fil de l'eau ; commit() le range sous le condensat de son contenu"""
+
+    @abstractmethod
+    async def write(self, data: bytes) -> None:
+        ...
+
+    @abstractmethod
+    async def commit(self) -> StoredBlob:
+        ...
+
+    @abstractmethod
+    async def abort(self) -> None:
+        ...
+
+
+class BlobStore(ABC):
+    """Stockage des contenus des pièces jointes, adressés par leur SHA-256"""
+
+    @abstractmethod
+    def writer(self) -> BlobWriter:
+        ...
+
+    @abstractmethod
+    def path(self, key: str) -> str:
+        """Fichier local du blob, servi directement (sendfile, plages)"""
+
+    @abstractmethod
+    def relative_path(self, key: str) -> str:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str, older_than: Optional[float] = None) -> bool:
+        ...
+
+    @abstractmethod
+    async def stale_keys(self, older_than: float) -> List[str]:
+        ...
+
+    @abstractmethod
+    async def remove_stale_uploads(self, older_than: float) -> int:
+        ...
+
+
+class LocalBlobWriter(BlobWriter):
+    """Fichier temporaire écrit par blocs de chunk_size dans le pool de threads
+
+    La mémoire utilisée est bornée par un bloc, quelle que soit la taille du fichier. Le
+    condensat est calculé pendant l'écriture, sans relire le fichier.
+    """
+
+    def __init__(self, store: "LocalBlobStore"):
+        self.store = store
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._buffer = bytearray()
+        self._file = None
+
+    async def write(self, data: bytes) -> None:
+        self._buffer += data
+        self.size += len(data)
+        full = len(self._buffer) - len(self._buffer) % self.store.chunk_size
+        if full:
+            chunk = bytes(self._buffer[:full])
+            del self._buffer[:full]
+            await asyncio.get_running_loop().run_in_executor(None, self._write_chunk, chunk)
+
+    def _write_chunk(self, chunk: bytes) -> None:
+        if self._file is None:
+            os.makedirs(self.store.temp_dir, exist_ok=True)
+            self._file = tempfile.NamedTemporaryFile(dir=self.store.temp_dir, delete=False)
+        # sha256 et write libèrent le GIL sur les gros blocs
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def _commit(self, chunk: bytes) -> StoredBlob:
+        self._write_chunk(chunk)
+        self._file.flush()
+        key = self._hash.hexdigest()
+        final = self.store.path(key)
+        if os.path.exists(final):
+            # Déjà stocké : le blob existant est rafraîchi pour ne pas être balayé entre-temps,
+            # la copie est jetée sans fsync par commit()
+            self._file.close()
+            os.utime(final)
+            return StoredBlob(key, self.size, True)
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        os.replace(self._file.name, final)
+        return StoredBlob(key, self.size, False)
+
+    async def commit(self) -> StoredBlob:
+        chunk = bytes(self._buffer)
+        self._buffer = bytearray()
+        loop = asyncio.get_running_loop()
+        blob = await loop.run_in_executor(None, self._commit, chunk)
+        if blob.deduplicated:
+            # Libérer un gros fichier peut prendre des secondes (discard) : la réponse n'attend
+            # pas, et un arrêt entre-temps laisse un fichier temporaire que le balayage retrouve
+            loop.run_in_executor(None, self._abort)
+        return blob
+
+    def _abort(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            try:
+                os.unlink(self._file.name)
+            except FileNotFoundError:
+                pass
+
+    async def abort(self) -> None:
+        self._buffer = bytearray()
+        await asyncio.get_running_loop().run_in_executor(None, self._abort)
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs dans root/ab/cd/<sha256>, envois en cours dans root/tmp (même système de fichiers)"""
+
+    def __init__(self, root: str, chunk_size: int = 1024 * 1024):
+        self.root = os.path.abspath(root)
+        self.chunk_size = chunk_size
+        self.temp_dir = os.path.join(self.root, "tmp")
+
+    def writer(self) -> LocalBlobWriter:
+        return LocalBlobWriter(self)
+
+    def relative_path(self, key: str) -> str:
+        if not BLOB_KEY.fullmatch(key):
+            raise ValueError(f"Invalid blob key: {key!r}")
+        return f"{key[:2]}/{key[2:4]}/{key}"
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, self.relative_path(key))
+
+    def _delete(self, key: str, older_than: Optional[float]) -> bool:
+        path = self.path(key)
+        try:
+            if older_than is not None and os.stat(path).st_mtime >= older_than:
+                return False
+            os.unlink(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def delete(self, key: str, older_than: Optional[float] = None) -> bool:
+        """Supprime le blob, sauf s'il a été écrit ou réutilisé après older_than"""
+        return await asyncio.get_running_loop().run_in_executor(None, self._delete, key, older_than)
+
+    def _stale_keys(self, older_than: float) -> List[str]:
+        keys = []
+        for directory, subdirs, files in os.walk(self.root):
+            if directory == self.root:
+                subdirs[:] = [name for name in subdirs if name != "tmp"]
+            for name in files:
+                if BLOB_KEY.fullmatch(name) and os.stat(os.path.join(directory, name)).st_mtime < older_than:
+                    keys.append(name)
+        return keys
+
+    async def stale_keys(self, older_than: float) -> List[str]:
+        return await asyncio.get_running_loop().run_in_executor(None, self._stale_keys, older_than)
+
+    def _remove_stale_uploads(self, older_than: float) -> int:
+        removed = 0
+        if not os.path.isdir(self.temp_dir):
+            return 0
+        for entry in os.scandir(self.temp_dir):
+            if entry.is_file() and entry.stat().st_mtime < older_than:
+                os.unlink(entry.path)
+                removed += 1
+        return removed
+
+    async def remove_stale_uploads(self, older_than: float) -> int:
+        """Fichiers temporaires d'envois interrompus (arrêt du worker pendant un envoi)"""
+        return await asyncio.get_running_loop().run_in_executor(None, self._remove_stale_uploads, older_than)
+
+
+attachment_store = LocalBlobStore(ATTACHMENT_DIR, ATTACHMENT_CHUNK_SIZE)
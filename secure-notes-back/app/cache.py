@@ -0,0 +1,45 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from .config import USER_CACHE_SIZE, USER_CACHE_TTL
+import time
+
+
+class TTLCache:
+    """Cache LRU borné dont les entrées expirent après un délai (propre au processus)"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Utilisateurs authentifiés, indexés par id (invalidés à chaque modification du compte)
+user_cache = TTLCache(max_size=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Iterable, Optional, Tuple
+from fastapi import Request
+import hashlib
+
+# Le client garde la réponse pour lui seul et la revalide à chaque lecture (304 si inchangée)
+CACHE_CONTROL = "private, no-cache"
+
+
+def note_etag(note_id: int, updated_at: Optional[datetime]) -> str:
+    """Validateur fort d'une note : change à chaque modification (updated_at)"""
+    version = f"{note_id}:{updated_at.isoformat() if updated_at else ''}"
+    return f'"{hashlib.sha256(version.encode()).hexdigest()[:32]}"'
+
+
+def page_etag(scope: str, versions: Iterable[Tuple[int, Optional[datetime]]]) -> str:
+    """Validateur fort d'une page de notes, à partir des couples (id, updated_at) qui la composent"""
+    digest = hashlib.sha256(scope.encode())
+    for note_id, updated_at in versions:
+        digest.update(f"|{note_id}:{updated_at.isoformat() if updated_at else ''}".encode())
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def http_date(value: datetime) -> str:
+    # updated_at est enregistré en UTC sans fuseau
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime] = None) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """Vrai si la copie du client est à jour (RFC 9110 : If-None-Match prime sur If-Modified-Since)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Comparaison faible pour GET : W/"x" désigne la même représentation que "x"
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag.removeprefix("W/") in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
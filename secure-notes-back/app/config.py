@@ -0,0 +1,137 @@
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+# Hachage des mots de passe (bcrypt)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")  # "thread" ou "process"
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Calculs en attente d'un worker au-delà desquels login/register répondent 503 (négatif : illimité)
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+
+# Contrôle d'admission de /auth/login et /auth/register : seaux à jetons par IP et par compte
+# (débit en tentatives par seconde, RATE=0 désactive la règle), état "memory" ou "database"
+ADMISSION_BACKEND = os.getenv("ADMISSION_BACKEND", "memory").lower()
+ADMISSION_MAX_KEYS = int(os.getenv("ADMISSION_MAX_KEYS", "100000"))
+AUTH_IP_RATE = float(os.getenv("AUTH_IP_RATE", "1"))
+AUTH_IP_BURST = float(os.getenv("AUTH_IP_BURST", "20"))
+AUTH_ACCOUNT_RATE = float(os.getenv("AUTH_ACCOUNT_RATE", "0.1"))
+AUTH_ACCOUNT_BURST = float(os.getenv("AUTH_ACCOUNT_BURST", "5"))
+
+# Jetons d'accès JWT : clé lue une fois, claims vérifiés mis en cache jusqu'à leur expiration
+SECRET_KEY = os.getenv("SECRET_KEY")
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+# Jetons révoqués (logout) dimensionnant le filtre de Bloom, et son taux de faux positifs
+TOKEN_REVOCATION_CAPACITY = int(os.getenv("TOKEN_REVOCATION_CAPACITY", "100000"))
+TOKEN_REVOCATION_ERROR_RATE = float(os.getenv("TOKEN_REVOCATION_ERROR_RATE", "0.001"))
+# Révocations partagées par la table revoked_tokens : délai maximal, en secondes, avant qu'un
+# worker applique un logout fait sur un autre
+TOKEN_REVOCATION_REFRESH = float(os.getenv("TOKEN_REVOCATION_REFRESH", "1"))
+
+# Cache des utilisateurs authentifiés (USER_CACHE_SIZE=0 pour le désactiver)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "10"))
+
+# Configuration plein texte Postgres utilisée par l'index GIN des notes
+SEARCH_CONFIG = os.getenv("SEARCH_CONFIG", "simple")
+
+# Partitionnement de notes par hachage de owner_id (Postgres, migration 0007) : nombre de
+# partitions, 0 pour une table unique
+NOTES_PARTITIONS = int(os.getenv("NOTES_PARTITIONS", "0"))
+
+# Encodeur JSON des réponses : "orjson" (si installé) ou "json"
+JSON_ENCODER = os.getenv("JSON_ENCODER", "orjson").lower()
+
+# Chiffrement des notes : clé maître AES-256 en base64 (chiffrement désactivé si absente)
+NOTES_MASTER_KEY = os.getenv("NOTES_MASTER_KEY", "")
+DATA_KEY_CACHE_SIZE = int(os.getenv("DATA_KEY_CACHE_SIZE", "1024"))
+DATA_KEY_CACHE_TTL = float(os.getenv("DATA_KEY_CACHE_TTL", "300"))
+# Nombre de notes à partir duquel un lot est déchiffré dans le pool de threads
+DECRYPT_THREAD_THRESHOLD = int(os.getenv("DECRYPT_THREAD_THRESHOLD", "256"))
+
+# Suppression de compte : au-delà du seuil, les notes sont purgées en arrière-plan par lots
+ACCOUNT_PURGE_THRESHOLD = int(os.getenv("ACCOUNT_PURGE_THRESHOLD", "5000"))
+ACCOUNT_PURGE_BATCH_SIZE = int(os.getenv("ACCOUNT_PURGE_BATCH_SIZE", "1000"))
+# Pause entre deux lots, en secondes, pour laisser passer les autres écritures
+ACCOUNT_PURGE_PAUSE = float(os.getenv("ACCOUNT_PURGE_PAUSE", "0.05"))
+# Bail du worker qui purge un compte, en secondes : renouvelé à chaque lot, repris par un autre à expiration
+ACCOUNT_PURGE_LEASE = float(os.getenv("ACCOUNT_PURGE_LEASE", "60"))
+
+# Flux /notes/stream : "local" (événements vus par le worker qui écrit), "postgres"
+# (LISTEN/NOTIFY, tous les workers) ou "auto" (postgres sur Postgres avec plusieurs workers
+# en prod, local sinon), commentaire keep-alive toutes les SSE_HEARTBEAT secondes
+EVENTS_BROKER = os.getenv("EVENTS_BROKER", "auto").lower()
+EVENTS_OUTBOX_SIZE = int(os.getenv("EVENTS_OUTBOX_SIZE", "10000"))
+SSE_HEARTBEAT = float(os.getenv("SSE_HEARTBEAT", "15"))
+# Événements en attente par connexion avant de les remplacer par un sync
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "64"))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "3000"))
+
+# Pièces jointes : contenus dédupliqués par SHA-256 sous ATTACHMENT_DIR, écrits par blocs
+ATTACHMENT_DIR = os.getenv("ATTACHMENT_DIR", "./data/attachments")
+ATTACHMENT_CHUNK_SIZE = int(os.getenv("ATTACHMENT_CHUNK_SIZE", str(1024 * 1024)))
+ATTACHMENT_MAX_SIZE = int(os.getenv("ATTACHMENT_MAX_SIZE", str(2 * 1024 ** 3)))
+# Préfixe d'une location nginx "internal" sur ATTACHMENT_DIR : les téléchargements lui sont
+# délégués par X-Accel-Redirect (sendfile) au lieu d'être lus par le worker
+ATTACHMENT_ACCEL_REDIRECT = os.getenv("ATTACHMENT_ACCEL_REDIRECT", "").rstrip("/")
+# Contenus sans pièce jointe supprimés s'ils n'ont pas servi depuis ce délai (secondes)
+ATTACHMENT_GC_GRACE = float(os.getenv("ATTACHMENT_GC_GRACE", "600"))
+ATTACHMENT_SWEEP_INTERVAL = float(os.getenv("ATTACHMENT_SWEEP_INTERVAL", "3600"))
+
+# Taille des lots d'insertion pour /notes/batch et /notes/import
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+
+# File d'envoi des emails (SMTP_START_TLS : true, false ou auto)
+SMTP_START_TLS = {"true": True, "false": False}.get(os.getenv("SMTP_START_TLS", "true").lower())
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "10"))
+MAIL_QUEUE_SIZE = int(os.getenv("MAIL_QUEUE_SIZE", "1000"))
+MAIL_WORKERS = int(os.getenv("MAIL_WORKERS", "2"))
+MAIL_POOL_SIZE = int(os.getenv("MAIL_POOL_SIZE", "2"))
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "20"))
+MAIL_MAX_RETRIES = int(os.getenv("MAIL_MAX_RETRIES", "5"))
+MAIL_RETRY_BASE_DELAY = float(os.getenv("MAIL_RETRY_BASE_DELAY", "2"))
+
+# Pool de connexions à la base (ignoré pour SQLite en mémoire)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Durée maximale d'une requête SQL côté Postgres en millisecondes (0 pour désactiver)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+# Réplicas en lecture (URLs séparées par des virgules) : les GET y sont envoyés, sauf pendant
+# REPLICA_STICKINESS secondes après une écriture de l'utilisateur (lecture de ses écritures)
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_STICKINESS = float(os.getenv("REPLICA_STICKINESS", "5"))
+# Un réplica injoignable est écarté pendant ce délai, les lectures repassent par le primaire
+REPLICA_RETRY_AFTER = float(os.getenv("REPLICA_RETRY_AFTER", "30"))
+
+# Résultat du health check mis en cache pour ne pas consommer de connexion à chaque sonde
+HEALTH_CACHE_TTL = float(os.getenv("HEALTH_CACHE_TTL", "5"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+
+# Serveur ASGI lancé par run.py : "dev" (rechargement auto) ou "prod" (multi-workers)
+SERVER_MODE = os.getenv("SERVER_MODE", "dev").lower()
+SERVER_HOST = os.getenv("HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("PORT", "8000"))
+# Nombre de workers en prod (par défaut un par cœur)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+# Durée de maintien des connexions keep-alive, à garder au-dessus de celle du reverse proxy
+KEEP_ALIVE_TIMEOUT = int(os.getenv("KEEP_ALIVE_TIMEOUT", "75"))
+GRACEFUL_SHUTDOWN_TIMEOUT = int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "30"))
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "2048"))
+FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+ACCESS_LOG = os.getenv("ACCESS_LOG", "false").lower() == "true"
+
+# Migrations Alembic appliquées par run.py avant le lancement des workers
+RUN_MIGRATIONS = os.getenv("RUN_MIGRATIONS", "true").lower() == "true"
+MIGRATION_MAX_WAIT = float(os.getenv("MIGRATION_MAX_WAIT", "60"))
+
+# Observabilité : requêtes SQL lentes, en-tête Server-Timing, journaux structurés
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SERVER_TIMING = os.getenv("SERVER_TIMING", "true").lower() == "true"
+REQUEST_LOG = os.getenv("REQUEST_LOG", "true").lower() == "true"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # "json" ou "text"
@@ -1,20 +1,35 @@
-from .extensions import SessionLocal
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from .extensions import AsyncSessionLocal
+from .replicas import open_read_session, replica_router
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
-def get_db():
-    """Dependency pour obtenir une session de base de données"""
-    db = SessionLocal()
-    try:
+async def get_db():
+    """Dependency pour obtenir une session asynchrone de base de données"""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+async def get_read_db(request: Request, db: AsyncSession = Depends(get_db)):
+    """Session de lecture : un réplica, ou la session primaire de get_db (écritures, fenêtre
+    de lecture de ses écritures, aucun réplica disponible)"""
+    session = await open_read_session(replica_router, request)
+    if session is None:
+        yield db
+        return
+    async with session:
+        yield session
 
 
 SKIP = 0
 LIMIT = 20
+MAX_LIMIT = 100
+MAX_SEARCH_OFFSET = 1000
+EXPORT_BATCH_SIZE = 1000
+BATCH_MAX_ITEMS = 1000
+MAX_REPORTED_ERRORS = 100
 
 SMTP_SERVER = os.getenv("SMTP_SERVER")
 SMTP_PORT = int(os.getenv("SMTP_PORT"))
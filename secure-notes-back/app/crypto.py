@@ -0,0 +1,207 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from .cache import TTLCache
+from .config import DATA_KEY_CACHE_SIZE, DATA_KEY_CACHE_TTL, DECRYPT_THREAD_THRESHOLD, NOTES_MASTER_KEY
+from .models import Note, User
+import asyncio
+import base64
+import binascii
+import os
+
+# Préfixes de version : une valeur sans préfixe est une note antérieure au chiffrement
+FIELD_PREFIX = "enc:v1:"
+WRAPPED_KEY_PREFIX = "v1:"
+NONCE_SIZE = 12
+ENCRYPTED_FIELDS = ("title", "content")
+PENDING_KEYS = "pending_data_keys"
+
+
+def parse_master_key(value: str) -> Optional[bytes]:
+    """Clé maître AES-256 encodée en base64, None si elle n'est pas configurée"""
+    if not value:
+        return None
+    try:
+        key = base64.b64decode(value, validate=True)
+    except binascii.Error as e:
+        raise ValueError("NOTES_MASTER_KEY must be base64 encoded") from e
+    if len(key) != 32:
+        raise ValueError("NOTES_MASTER_KEY must decode to 32 bytes")
+    return key
+
+
+class NoteCipher:
+    """Chiffrement d'enveloppe AES-GCM des champs des notes
+
+    Chaque utilisateur a une clé de données aléatoire, stockée dans users.wrapped_data_key
+    chiffrée par la clé maître. Les clés déchiffrées sont gardées dans un cache LRU borné :
+    lire ou écrire un champ ne coûte alors qu'une opération AES-GCM. Le propriétaire et le
+    nom du champ sont authentifiés (AAD), une valeur ne peut pas être déplacée d'une note
+    d'un utilisateur vers celle d'un autre.
+    """
+
+    def __init__(
+        self,
+        master_key: Optional[bytes],
+        cache_size: int = 1024,
+        cache_ttl: float = 300,
+        thread_threshold: int = 256,
+    ):
+        self._master = AESGCM(master_key) if master_key else None
+        self._keys = TTLCache(max_size=cache_size, ttl=cache_ttl)
+        self.thread_threshold = thread_threshold
+
+    @property
+    def enabled(self) -> bool:
+        return self._master is not None
+
+    # Clés de données
+
+    def _wrap(self, owner_id: int, data_key: bytes) -> str:
+        nonce = os.urandom(NONCE_SIZE)
+        wrapped = self._master.encrypt(nonce, data_key, f"user:{owner_id}".encode())
+        return WRAPPED_KEY_PREFIX + base64.b64encode(nonce + wrapped).decode()
+
+    def _unwrap(self, owner_id: int, value: str) -> AESGCM:
+        if not value.startswith(WRAPPED_KEY_PREFIX):
+            raise ValueError(f"Unsupported data key format for user {owner_id}")
+        raw = base64.b64decode(value[len(WRAPPED_KEY_PREFIX):])
+        return AESGCM(self._master.decrypt(raw[:NONCE_SIZE], raw[NONCE_SIZE:], f"user:{owner_id}".encode()))
+
+    async def data_key(self, db: AsyncSession, owner_id: int, create: bool = True) -> Optional[AESGCM]:
+        """Clé de données de l'utilisateur, créée à sa première note (None si create=False)"""
+        aead = self._keys.get(owner_id)
+        if aead is not None:
+            return aead
+        # Clé créée dans la transaction en cours : cachée seulement après le commit
+        pending: Dict[Tuple["NoteCipher", int], AESGCM] = db.info.setdefault(PENDING_KEYS, {})
+        if (self, owner_id) in pending:
+            return pending[self, owner_id]
+
+        wrapped = (await db.execute(select(User.wrapped_data_key).where(User.id == owner_id))).scalar_one_or_none()
+        if wrapped is not None:
+            aead = self._unwrap(owner_id, wrapped)
+            self._keys.set(owner_id, aead)
+            return aead
+        if not create:
+            return None
+
+        # Première note : la condition IS NULL départage deux écritures concurrentes,
+        # la clé relue est celle qui a été enregistrée
+        await db.execute(
+            update(User)
+            .where(User.id == owner_id, User.wrapped_data_key.is_(None))
+            .values(wrapped_data_key=self._wrap(owner_id, AESGCM.generate_key(bit_length=256)))
+            .execution_options(synchronize_session=False)
+        )
+        wrapped = (await db.execute(select(User.wrapped_data_key).where(User.id == owner_id))).scalar_one_or_none()
+        if wrapped is None:
+            raise ValueError(f"User {owner_id} not found")
+        pending[self, owner_id] = self._unwrap(owner_id, wrapped)
+        return pending[self, owner_id]
+
+    def forget(self, owner_id: int) -> None:
+        self._keys.invalidate(owner_id)
+
+    # Champs
+
+    @staticmethod
+    def encrypt_field(aead: AESGCM, owner_id: int, field: str, value: Optional[str]) -> Optional[str]:
+        if value is None:
+            return None
+        nonce = os.urandom(NONCE_SIZE)
+        ciphertext = aead.encrypt(nonce, value.encode(), f"{owner_id}:{field}".encode())
+        return FIELD_PREFIX + base64.b64encode(nonce + ciphertext).decode()
+
+    @staticmethod
+    def decrypt_field(aead: Optional[AESGCM], owner_id: int, field: str, value: Optional[str]) -> Optional[str]:
+        if value is None or not value.startswith(FIELD_PREFIX):
+            return value
+        if aead is None:
+            raise ValueError(f"No data key for user {owner_id}")
+        raw = base64.b64decode(value[len(FIELD_PREFIX):])
+        return aead.decrypt(raw[:NONCE_SIZE], raw[NONCE_SIZE:], f"{owner_id}:{field}".encode()).decode()
+
+    async def encrypt_values(self, db: AsyncSession, owner_id: int, values: Dict) -> Dict:
+        """Copie de values avec title et content chiffrés pour owner_id"""
+        if not self.enabled:
+            return values
+        aead = await self.data_key(db, owner_id)
+        encrypted = dict(values)
+        for field in ENCRYPTED_FIELDS:
+            if field in encrypted:
+                encrypted[field] = self.encrypt_field(aead, owner_id, field, encrypted[field])
+        return encrypted
+
+    async def encrypt_rows(self, db: AsyncSession, owner_id: int, rows: List[Dict]) -> List[Dict]:
+        if not self.enabled:
+            return rows
+        return [await self.encrypt_values(db, owner_id, row) for row in rows]
+
+    # Déchiffrement par lots
+
+    @staticmethod
+    def _is_encrypted(title: Optional[str], content: Optional[str]) -> bool:
+        return (content is not None and content.startswith(FIELD_PREFIX)) or (title is not None and title.startswith(FIELD_PREFIX))
+
+    def _decrypt_batch(self, items: Sequence[Tuple[AESGCM, int, Optional[str], str]]) -> List[Tuple[Optional[str], str]]:
+        return [
+            (self.decrypt_field(aead, owner_id, "title", title), self.decrypt_field(aead, owner_id, "content", content))
+            for aead, owner_id, title, content in items
+        ]
+
+    async def _decrypt(self, items: Sequence[Tuple[AESGCM, int, Optional[str], str]]) -> List[Tuple[Optional[str], str]]:
+        if len(items) >= self.thread_threshold > 0:
+            # Gros lot (export, import) : la boucle d'événements reste disponible pendant AES-GCM
+            return await asyncio.get_running_loop().run_in_executor(None, self._decrypt_batch, items)
+        return self._decrypt_batch(items)
+
+    async def decrypt_notes(self, db: AsyncSession, notes: Iterable[Note]) -> None:
+        """Remplace en place title et content par leur clair, sans marquer les notes modifiées"""
+        if not self.enabled:
+            return
+        # Les notes antérieures au chiffrement restent en clair et n'ont pas besoin de clé
+        notes = [note for note in notes if self._is_encrypted(note.title, note.content)]
+        if not notes:
+            return
+        keys = {owner_id: await self.data_key(db, owner_id, create=False) for owner_id in {note.owner_id for note in notes}}
+        plaintexts = await self._decrypt([(keys[note.owner_id], note.owner_id, note.title, note.content) for note in notes])
+        for note, (title, content) in zip(notes, plaintexts):
+            set_committed_value(note, "title", title)
+            set_committed_value(note, "content", content)
+
+    async def decrypt_rows(
+        self,
+        db: AsyncSession,
+        owner_id: int,
+        rows: Iterable[Tuple[int, Optional[str], str]]
+    ) -> List[Tuple[int, Optional[str], str]]:
+        """Lignes (id, title, content) d'un même propriétaire, déchiffrées"""
+        rows = list(rows)
+        if not self.enabled or not any(self._is_encrypted(title, content) for _, title, content in rows):
+            return rows
+        aead = await self.data_key(db, owner_id, create=False)
+        plaintexts = await self._decrypt([(aead, owner_id, title, content) for _, title, content in rows])
+        return [(row[0], title, content) for row, (title, content) in zip(rows, plaintexts)]
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed_keys(session: Session) -> None:
+    for (cipher, owner_id), aead in session.info.pop(PENDING_KEYS, {}).items():
+        cipher._keys.set(owner_id, aead)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_keys(session: Session) -> None:
+    # La clé n'a pas été enregistrée : elle ne doit chiffrer aucune autre note
+    session.info.pop(PENDING_KEYS, None)
+
+
+note_cipher = NoteCipher(
+    parse_master_key(NOTES_MASTER_KEY),
+    cache_size=DATA_KEY_CACHE_SIZE,
+    cache_ttl=DATA_KEY_CACHE_TTL,
+    thread_threshold=DECRYPT_THREAD_THRESHOLD,
+)
@@ -0,0 +1,295 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from .config import EVENTS_BROKER, EVENTS_OUTBOX_SIZE, SERVER_MODE, SSE_QUEUE_SIZE, WEB_CONCURRENCY
+from .extensions import DATABASE_URL
+from .metrics import metrics
+from .pagination import encode_change_cursor
+from .startup import backoff_delays
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+PENDING_EVENTS = "pending_note_events"
+# (owner_id, type, note_id, change_seq) : "upsert" ou "delete" d'une note, "sync" pour un lot
+# (note_id 0) ou des événements perdus, le client relit alors /notes/changes
+NoteEvent = Tuple[int, str, int, int]
+SYNC = "sync"
+# Au-delà, les événements d'une transaction sont résumés en un seul "sync" par propriétaire
+MAX_EVENTS_PER_COMMIT = 32
+
+
+def record_note_event(db, owner_id: int, kind: str, note_id: int, change_seq: int) -> None:
+    """Événement publié au commit de la transaction en cours, oublié si elle est annulée"""
+    db.info.setdefault(PENDING_EVENTS, []).append((owner_id, kind, note_id, change_seq))
+
+
+def coalesce(events: List[NoteEvent]) -> List[NoteEvent]:
+    if len(events) <= MAX_EVENTS_PER_COMMIT:
+        return events
+    last_seq: Dict[int, int] = {}
+    for owner_id, _, _, change_seq in events:
+        last_seq[owner_id] = max(change_seq, last_seq.get(owner_id, 0))
+    return [(owner_id, SYNC, 0, change_seq) for owner_id, change_seq in last_seq.items()]
+
+
+def format_sse(note_event: NoteEvent) -> bytes:
+    """Message SSE compact ; l'id d'un upsert ou d'un delete est un jeton since de /notes/changes"""
+    _, kind, note_id, change_seq = note_event
+    if kind == SYNC:
+        return f"event: {SYNC}\ndata: {{\"seq\":{change_seq}}}\n\n".encode()
+    cursor = encode_change_cursor(change_seq, note_id)
+    return f"id: {cursor}\nevent: {kind}\ndata: {{\"id\":{note_id},\"seq\":{change_seq}}}\n\n".encode()
+
+
+class Subscription:
+    """File bornée d'une connexion ouverte ; en cas de débordement elle est vidée au profit d'un sync"""
+
+    __slots__ = ("owner_id", "max_size", "_events", "_waiter")
+
+    def __init__(self, owner_id: int, max_size: int = 64):
+        self.owner_id = owner_id
+        self.max_size = max_size
+        self._events: Deque[NoteEvent] = deque()
+        self._waiter: Optional[asyncio.Future] = None
+
+    def push(self, note_event: NoteEvent) -> None:
+        if len(self._events) >= self.max_size:
+            # Client trop lent : il relira les changements plutôt que de faire grossir la file
+            self._events.clear()
+            note_event = (self.owner_id, SYNC, 0, note_event[3])
+            metrics.events_dropped.inc()
+        self._events.append(note_event)
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[NoteEvent]:
+        """Événement suivant, None si rien n'est arrivé avant timeout"""
+        if not self._events:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await asyncio.wait_for(self._waiter, timeout)
+            except asyncio.TimeoutError:
+                return None
+            finally:
+                self._waiter = None
+        return self._events.popleft()
+
+
+class Broker(ABC):
+    """Diffusion des événements entre workers : publish() envoie, deliver() est appelé à la réception"""
+
+    @abstractmethod
+    async def start(self, deliver: Callable[[NoteEvent], None], resync: Callable[[], None]) -> None:
+        ...
+
+    @abstractmethod
+    def publish(self, note_event: NoteEvent) -> None:
+        ...
+
+    @abstractmethod
+    async def stop(self) -> None:
+        ...
+
+
+class PostgresBroker(Broker):
+    """LISTEN/NOTIFY sur une connexion asyncpg dédiée, hors du pool des requêtes
+
+    Chaque worker reçoit aussi ses propres notifications : un événement n'est délivré
+    localement qu'une fois, à sa réception. Pendant une coupure les événements sont perdus,
+    les abonnés reçoivent un sync à la reconnexion.
+    """
+
+    CHANNEL = "note_events"
+
+    def __init__(self, dsn: str, outbox_size: int = 10_000):
+        self.dsn = dsn
+        self.outbox_size = outbox_size
+        self.connected = False
+        self._outbox: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Callable[[NoteEvent], None], resync: Callable[[], None]) -> None:
+        self._deliver = deliver
+        self._resync = resync
+        self._outbox = asyncio.Queue(maxsize=self.outbox_size)
+        self._task = asyncio.create_task(self._run())
+
+    def publish(self, note_event: NoteEvent) -> None:
+        if self._outbox is None:
+            return
+        try:
+            self._outbox.put_nowait(json.dumps(note_event, separators=(",", ":")))
+        except asyncio.QueueFull:
+            metrics.events_dropped.inc()
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        owner_id, kind, note_id, change_seq = json.loads(payload)
+        self._deliver((owner_id, kind, note_id, change_seq))
+
+    async def _run(self) -> None:
+        import asyncpg
+
+        delays = backoff_delays()
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                await connection.add_listener(self.CHANNEL, self._on_notify)
+                self.connected = True
+                delays = backoff_delays()
+                # Des notifications ont pu être manquées pendant la coupure
+                self._resync()
+                while True:
+                    payload = await self._outbox.get()
+                    await connection.execute("SELECT pg_notify($1, $2)", self.CHANNEL, payload)
+            except Exception as e:
+                delay = next(delays)
+                logger.warning("Event broker disconnected: %s, retry in %.1fs", e, delay)
+            finally:
+                self.connected = False
+                if connection is not None:
+                    connection.terminate()
+            await asyncio.sleep(delay)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._outbox = None
+
+
+class EventHub:
+    """Pub/sub en mémoire des changements de notes, par propriétaire
+
+    Sans broker les événements ne sont vus que par le worker qui a fait l'écriture ;
+    avec un broker ils passent par lui pour atteindre tous les workers.
+    """
+
+    def __init__(self, broker: Optional[Broker] = None, queue_size: int = 64):
+        self.broker = broker
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self.delivered = 0
+
+    async def start(self) -> None:
+        if self.broker is not None:
+            await self.broker.start(self.deliver, self.resync)
+
+    async def stop(self) -> None:
+        if self.broker is not None:
+            await self.broker.stop()
+
+    def subscribe(self, owner_id: int) -> Subscription:
+        subscription = Subscription(owner_id, self.queue_size)
+        self._subscribers.setdefault(owner_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.owner_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.owner_id]
+
+    def publish(self, events: Iterable[NoteEvent]) -> None:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Session synchrone (scripts, migrations) : aucun abonné dans ce processus
+            return
+        for note_event in events:
+            if self.broker is not None:
+                self.broker.publish(note_event)
+            else:
+                self.deliver(note_event)
+
+    def deliver(self, note_event: NoteEvent) -> None:
+        for subscription in self._subscribers.get(note_event[0], ()):
+            subscription.push(note_event)
+            self.delivered += 1
+
+    def resync(self) -> None:
+        for owner_id, subscribers in self._subscribers.items():
+            for subscription in subscribers:
+                subscription.push((owner_id, SYNC, 0, 0))
+
+    def stats(self) -> dict:
+        stats = {
+            "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "users": len(self._subscribers),
+            "delivered": self.delivered,
+            "broker": type(self.broker).__name__ if self.broker is not None else "local",
+        }
+        if isinstance(self.broker, PostgresBroker):
+            stats["broker_connected"] = self.broker.connected
+        return stats
+
+
+async def event_stream(
+    hub: EventHub,
+    owner_id: int,
+    heartbeat: float = 15,
+    retry_ms: int = 3000,
+    resume: bool = False,
+) -> AsyncIterator[bytes]:
+    """Corps text/event-stream d'une connexion : événements du propriétaire et commentaires keep-alive
+
+    L'abonnement est pris dans le générateur : il est libéré par le finally même si le
+    client se déconnecte avant le premier envoi.
+    """
+    subscription = hub.subscribe(owner_id)
+    try:
+        yield f"retry: {retry_ms}\n\n".encode()
+        if resume:
+            # Reconnexion (Last-Event-ID) : des changements ont pu avoir lieu entre-temps
+            yield format_sse((owner_id, SYNC, 0, 0))
+        while True:
+            note_event = await subscription.get(heartbeat)
+            yield format_sse(note_event) if note_event is not None else b": ping\n\n"
+    finally:
+        hub.unsubscribe(subscription)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_events(session: Session) -> None:
+    events = session.info.pop(PENDING_EVENTS, None)
+    if events:
+        note_events.publish(coalesce(events))
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_events(session: Session) -> None:
+    # Les changements n'ont pas eu lieu : personne ne doit en être averti
+    session.info.pop(PENDING_EVENTS, None)
+
+
+def broker_kind(kind: str, database_url: str, server_mode: str, workers: int) -> str:
+    """Broker effectif : "auto" choisit postgres dès que plusieurs workers prod partagent une base Postgres"""
+    multi_worker = server_mode == "prod" and workers > 1
+    if kind == "auto":
+        postgres = make_url(database_url).get_backend_name() == "postgresql"
+        kind = "postgres" if multi_worker and postgres else "local"
+    if kind == "local" and multi_worker:
+        # Un flux ne verrait que les écritures traitées par son propre worker, sans sync pour le signaler
+        logger.error(
+            "EVENTS_BROKER=local with %d workers: /notes/stream clients miss changes written by other workers, "
+            "use EVENTS_BROKER=postgres", workers,
+        )
+    return kind
+
+
+def build_broker(kind: str) -> Optional[Broker]:
+    if kind == "local":
+        return None
+    if kind == "postgres":
+        return PostgresBroker(make_url(DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False), EVENTS_OUTBOX_SIZE)
+    raise ValueError(f"Unknown EVENTS_BROKER: {kind}")
+
+
+note_events = EventHub(build_broker(broker_kind(EVENTS_BROKER, DATABASE_URL, SERVER_MODE, WEB_CONCURRENCY)), SSE_QUEUE_SIZE)
@@ -0,0 +1,50 @@
+from typing import AsyncIterator
+from .constants import EXPORT_BATCH_SIZE
+from .extensions import AsyncSessionLocal
+from .repositories import NoteRepository
+from .schemas import note_list_adapter, validate_orm
+import zlib
+
+
+async def export_notes_ndjson(
+    owner_id: int,
+    compress: bool = False,
+    session_factory=AsyncSessionLocal,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> AsyncIterator[bytes]:
+    """Flux NDJSON (éventuellement gzip) des notes d'un utilisateur, un morceau par lot
+
+    Le générateur ouvre sa propre session : celle de get_db est fermée avant l'envoi
+    du corps d'une StreamingResponse. La carte d'identité ne garde que des références
+    faibles : la mémoire reste bornée par batch_size.
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+    async with session_factory() as db:
+        async for notes in NoteRepository.stream_by_user_id(db, user_id=owner_id, batch_size=batch_size):
+            chunk = "".join(note.model_dump_json() + "\n" for note in validate_orm(note_list_adapter, notes)).encode()
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+    if compressor is not None:
+        yield compressor.flush()
+
+
+def accepts_encoding(accept_encoding: str, coding: str) -> bool:
+    """Vrai si l'en-tête Accept-Encoding autorise coding (RFC 9110 : q=0 refuse, * vaut pour tout codage)"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    if coding in accepted:
+        return accepted[coding] > 0
+    return accepted.get("*", 0) > 0
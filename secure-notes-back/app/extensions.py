@@ -1,15 +1,93 @@
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from .config import (
+    DATABASE_REPLICA_URLS, DB_MAX_OVERFLOW, DB_POOL_PRE_PING, DB_POOL_RECYCLE, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_STATEMENT_TIMEOUT_MS,
+)
+from .instrumentation import instrument_engine
+from .pool import TimedAsyncAdaptedQueuePool, TimedQueuePool
 import os
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Drivers asynchrones utilisés par les routes (les drivers synchrones restent pour les scripts)
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    """Convertit une URL de base de données synchrone vers son équivalent asynchrone"""
+    parsed = make_url(url)
+    drivername = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+def engine_options(url: str) -> dict:
+    """Options du pool et timeout des requêtes selon le dialecte de l'URL"""
+    parsed = make_url(url)
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # SQLite en mémoire utilise un pool à connexion unique, rien à dimensionner
+        return options
+
+    is_async = parsed.get_dialect().is_async
+    options.update(
+        poolclass=TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    if parsed.get_backend_name() == "postgresql" and DB_STATEMENT_TIMEOUT_MS > 0:
+        if parsed.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+def enable_sqlite_foreign_keys(engine: Engine) -> None:
+    """Active les clés étrangères SQLite sur chaque connexion (ON DELETE CASCADE compris)"""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+# Moteur synchrone : création des tables, scripts d'administration
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
\ No newline at end of file
+# Moteur asynchrone : utilisé par toutes les routes via get_db
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+
+# Suppression d'un compte : les notes partent par la cascade de la base, y compris sur SQLite
+enable_sqlite_foreign_keys(engine)
+enable_sqlite_foreign_keys(async_engine.sync_engine)
+
+# Réplicas en lecture, même configuration de pool que le primaire (app/replicas.py)
+replica_engines = [
+    create_async_engine(to_async_url(url), **engine_options(to_async_url(url))) for url in DATABASE_REPLICA_URLS
+]
+
+# Durée et nombre de requêtes SQL attribués à la requête HTTP en cours
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+for replica_engine in replica_engines:
+    instrument_engine(replica_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+Base = declarative_base()
@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from .cache import TTLCache
+from .config import HEALTH_CACHE_TTL, HEALTH_CHECK_TIMEOUT
+from .extensions import async_engine
+import asyncio
+import time
+
+
+class DatabaseHealth:
+    """Sonde SELECT 1 dont le résultat est réutilisé pendant ttl secondes
+
+    Les health checks fréquents (docker, load balancer) ne prennent ainsi qu'une connexion
+    du pool par période, et une base lente ne les bloque pas au-delà de timeout.
+    """
+
+    def __init__(self, engine: AsyncEngine, ttl: float = 5, timeout: float = 2):
+        self.engine = engine
+        self.timeout = timeout
+        self._cache = TTLCache(max_size=1, ttl=ttl)
+
+    async def _probe(self) -> None:
+        async with self.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def check(self) -> dict:
+        result = self._cache.get("database")
+        if result is not None:
+            return result
+
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._probe(), self.timeout)
+            result = {"status": "connected"}
+        except asyncio.TimeoutError:
+            result = {"status": "disconnected", "error": f"Health check timed out after {self.timeout}s"}
+        except Exception as e:
+            result = {"status": "disconnected", "error": str(e)}
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        result["checked_at"] = datetime.now(timezone.utc).isoformat()
+        self._cache.set("database", result)
+        return result
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+database_health = DatabaseHealth(async_engine, ttl=HEALTH_CACHE_TTL, timeout=HEALTH_CHECK_TIMEOUT)
@@ -0,0 +1,61 @@
+from typing import Any, AsyncIterator, Dict, Optional
+from fastapi import Request
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from .config import IMPORT_CHUNK_SIZE
+from .constants import MAX_REPORTED_ERRORS
+from .repositories import NoteRepository
+import json
+
+
+class NoteImport(BaseModel):
+    title: Optional[str] = None
+    content: str
+
+
+def describe_error(error: ValueError) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, detail['loc'])) or 'note'}: {detail['msg']}" for detail in error.errors())
+    return str(error)
+
+async def iter_ndjson_lines(request: Request) -> AsyncIterator[bytes]:
+    """Lignes non vides d'un corps NDJSON, lues au fil de l'eau sans charger tout le corps"""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+async def import_notes(
+    db: AsyncSession,
+    owner_id: int,
+    items: AsyncIterator[Any],
+    chunk_size: int = IMPORT_CHUNK_SIZE
+) -> Dict[str, Any]:
+    """Valide chaque élément et insère les notes valides par lots de chunk_size
+
+    Les éléments invalides sont ignorés et signalés par leur position. La transaction
+    reste ouverte : l'appelant valide (ou annule) l'ensemble de l'import.
+    """
+    created, error_count, errors, pending = 0, 0, [], []
+    index = 0
+    async for item in items:
+        try:
+            if isinstance(item, (bytes, str)):
+                item = json.loads(item)
+            pending.append(NoteImport.model_validate(item).model_dump())
+        except ValueError as e:
+            error_count += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"index": index, "error": describe_error(e)})
+        index += 1
+        if len(pending) >= chunk_size:
+            created += len(await NoteRepository.insert_many(db, owner_id=owner_id, rows=pending))
+            pending = []
+    if pending:
+        created += len(await NoteRepository.insert_many(db, owner_id=owner_id, rows=pending))
+    return {"created": created, "error_count": error_count, "errors": errors}
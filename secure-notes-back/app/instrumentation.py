@@ -0,0 +1,156 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from . import config
+from .metrics import metrics
+import logging
+import time
+
+logger = logging.getLogger("app.requests")
+sql_logger = logging.getLogger("app.sql")
+
+QUERY_START = "query_start"
+
+
+class RequestMetrics:
+    """Temps passé par une requête HTTP dans la base, bcrypt et JWT"""
+    __slots__ = ("db_ms", "queries", "slow_queries", "timings")
+
+    def __init__(self):
+        self.db_ms = 0.0
+        self.queries = 0
+        self.slow_queries: List[str] = []
+        self.timings: Dict[str, float] = {}
+
+    def add(self, name: str, elapsed_ms: float) -> None:
+        self.timings[name] = self.timings.get(name, 0.0) + elapsed_ms
+
+
+# Positionnée par le middleware ; propagée aux greenlets de SQLAlchemy et aux tâches filles
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+def current_metrics() -> Optional[RequestMetrics]:
+    return _current.get()
+
+
+@contextmanager
+def timed(name: str):
+    """Ajoute la durée du bloc à la requête en cours (sans effet hors requête)"""
+    request_metrics = _current.get()
+    if request_metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        request_metrics.add(name, (time.perf_counter() - start) * 1000)
+
+
+# Hooks du moteur SQLAlchemy
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(QUERY_START, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info[QUERY_START].pop()) * 1000
+    request_metrics = _current.get()
+    if request_metrics is not None:
+        request_metrics.db_ms += elapsed_ms
+        request_metrics.queries += 1
+    if elapsed_ms >= config.SLOW_QUERY_MS:
+        metrics.slow_queries.inc()
+        if request_metrics is not None:
+            request_metrics.slow_queries.append(statement)
+        sql_logger.warning("slow query", extra={"duration_ms": round(elapsed_ms, 2), "statement": statement[:1000]})
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get(QUERY_START):
+        connection.info[QUERY_START].pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Mesure chaque instruction SQL du moteur (synchrone, ou sync_engine d'un AsyncEngine)"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def uninstrument_engine(engine: Engine) -> None:
+    for name, fn in (
+        ("before_cursor_execute", _before_cursor_execute),
+        ("after_cursor_execute", _after_cursor_execute),
+        ("handle_error", _handle_error),
+    ):
+        if event.contains(engine, name, fn):
+            event.remove(engine, name, fn)
+
+
+def server_timing(request_metrics: RequestMetrics, total_ms: float) -> str:
+    parts = [f'db;dur={request_metrics.db_ms:.1f};desc="{request_metrics.queries} queries"']
+    parts += [f"{name};dur={elapsed:.1f}" for name, elapsed in request_metrics.timings.items()]
+    parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
+
+
+class InstrumentationMiddleware:
+    """Middleware ASGI : en-tête Server-Timing, journal structuré et histogrammes par route
+
+    Le libellé de route est le modèle du chemin (/notes/{note_id}) pour borner la cardinalité.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_metrics = RequestMetrics()
+        token = _current.set(request_metrics)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if config.SERVER_TIMING:
+                    total_ms = (time.perf_counter() - start) * 1000
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing(request_metrics, total_ms).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            self._record(scope, status, (time.perf_counter() - start), request_metrics)
+
+    @staticmethod
+    def _record(scope, status: int, elapsed: float, request_metrics: RequestMetrics) -> None:
+        route = getattr(scope.get("route"), "path", "unmatched")
+        metrics.request_duration.observe((scope["method"], route, status), elapsed)
+        metrics.db_queries.inc((route,), request_metrics.queries)
+        metrics.db_time.inc((route,), request_metrics.db_ms / 1000)
+        if config.REQUEST_LOG:
+            logger.info("request", extra={
+                "method": scope["method"],
+                "route": route,
+                "path": scope["path"],
+                "status": status,
+                "duration_ms": round(elapsed * 1000, 2),
+                "db_ms": round(request_metrics.db_ms, 2),
+                "queries": request_metrics.queries,
+                "slow_queries": len(request_metrics.slow_queries),
+                **{f"{name}_ms": round(value, 2) for name, value in request_metrics.timings.items()},
+            })
@@ -0,0 +1,50 @@
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from .config import LOG_FORMAT, LOG_LEVEL
+import json
+import logging
+import queue
+
+# Attributs standard d'un LogRecord : tout le reste vient de extra= et est sérialisé
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par événement, avec les champs passés en extra="""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_FIELDS})
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT) -> QueueListener:
+    """Journaux émis via une file : l'écriture sur stderr se fait dans un thread dédié
+
+    Un appel de log dans une route ne coûte qu'un put_nowait, jamais une écriture bloquante.
+    """
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    log_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for existing in [h for h in root.handlers if isinstance(h, QueueHandler)]:
+        root.removeHandler(existing)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+    listener.start()
+    return listener
+
+
+def stop_logging(listener: Optional[QueueListener]) -> None:
+    """Vide la file puis arrête le thread d'écriture"""
+    if listener is not None:
+        listener.stop()
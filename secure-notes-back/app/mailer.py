@@ -0,0 +1,260 @@
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from email.message import EmailMessage
+from typing import List, Optional, Set
+from aiosmtplib import SMTP, SMTPRecipientsRefused, SMTPResponseException
+from .config import (
+    MAIL_BATCH_SIZE, MAIL_MAX_RETRIES, MAIL_POOL_SIZE, MAIL_QUEUE_SIZE, MAIL_RETRY_BASE_DELAY,
+    MAIL_WORKERS, SMTP_START_TLS, SMTP_TIMEOUT,
+)
+from .constants import SMTP_SERVER, SMTP_PORT, EMAIL_ADDRESS, EMAIL_PASSWORD
+import asyncio
+import logging
+import random
+
+logger = logging.getLogger(__name__)
+
+
+def build_message(to: str, subject: str, body: str, sender: Optional[str] = EMAIL_ADDRESS) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = to
+    message["Subject"] = subject
+    message.set_content(body)
+    return message
+
+
+class SMTPConnectionPool:
+    """Connexions SMTP ouvertes et authentifiées une fois, puis réutilisées entre les envois"""
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        size: int = 2,
+        start_tls: Optional[bool] = True,
+        timeout: float = 10,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.start_tls = start_tls
+        self.timeout = timeout
+        self.opened = 0
+        self._idle: List[SMTP] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @asynccontextmanager
+    async def connection(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.size)
+        async with self._semaphore:
+            smtp = await self._checkout()
+            try:
+                yield smtp
+            except BaseException:
+                # Connexion dans un état inconnu : on ne la remet pas dans le pool
+                await self._discard(smtp)
+                raise
+            self._idle.append(smtp)
+
+    async def _checkout(self) -> SMTP:
+        while self._idle:
+            smtp = self._idle.pop()
+            if smtp.is_connected:
+                return smtp
+        smtp = SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            username=self.username or None,
+            password=self.password or None,
+            start_tls=self.start_tls,
+            timeout=self.timeout,
+        )
+        # connect() enchaîne EHLO, STARTTLS et AUTH
+        await smtp.connect()
+        self.opened += 1
+        return smtp
+
+    @staticmethod
+    async def _discard(smtp: SMTP) -> None:
+        try:
+            await smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def reset(self) -> None:
+        """Oublie les connexions, par exemple lorsque la boucle d'événements a changé"""
+        self._idle = []
+        self._semaphore = None
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for smtp in idle:
+            await self._discard(smtp)
+
+
+@dataclass
+class _Envelope:
+    message: EmailMessage
+    attempt: int = 0
+
+
+class MailQueue:
+    """File d'envoi en mémoire : des workers dépilent les emails par lots sur le pool SMTP
+
+    Les erreurs temporaires (4xx, coupure réseau) sont retentées avec un délai exponentiel,
+    les refus définitifs (5xx) sont abandonnés et journalisés.
+    """
+
+    def __init__(
+        self,
+        pool: SMTPConnectionPool,
+        max_size: int = 1000,
+        workers: int = 2,
+        batch_size: int = 20,
+        max_retries: int = 5,
+        retry_base_delay: float = 2.0,
+    ):
+        self.pool = pool
+        self.max_size = max_size
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.sent = 0
+        self.failed = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._retrying: Set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self.pool.reset()
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._retrying = set()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def enqueue(self, message: EmailMessage) -> None:
+        """Ajoute un email à la file sans attendre, lève asyncio.QueueFull si elle est pleine"""
+        self._ensure_started()
+        self._queue.put_nowait(_Envelope(message))
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self) -> dict:
+        return {"queued": self.depth, "retrying": len(self._retrying), "sent": self.sent, "failed": self.failed}
+
+    async def _worker(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            try:
+                await self._send_batch(batch)
+            except Exception:
+                logger.exception("Unexpected error in mail worker")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _send_batch(self, batch: List[_Envelope]) -> None:
+        remaining = list(batch)
+        try:
+            async with self.pool.connection() as smtp:
+                while remaining:
+                    envelope = remaining[0]
+                    try:
+                        await smtp.send_message(envelope.message)
+                        self.sent += 1
+                    except (SMTPResponseException, SMTPRecipientsRefused) as e:
+                        code = getattr(e, "code", 550)
+                        if code >= 500:
+                            self._give_up(envelope, e)
+                        else:
+                            self._retry(envelope, e)
+                    remaining.pop(0)
+        except Exception as e:
+            # Connexion perdue ou impossible : tout ce qui n'est pas parti est retenté
+            for envelope in remaining:
+                self._retry(envelope, e)
+
+    def _give_up(self, envelope: _Envelope, error: Exception) -> None:
+        self.failed += 1
+        logger.error("Giving up email to %s after %d attempt(s): %s", envelope.message["To"], envelope.attempt + 1, error)
+
+    def _retry(self, envelope: _Envelope, error: Exception) -> None:
+        if envelope.attempt >= self.max_retries:
+            self._give_up(envelope, error)
+            return
+        delay = self.retry_base_delay * 2 ** envelope.attempt * random.uniform(0.5, 1.5)
+        envelope.attempt += 1
+        logger.warning("Email to %s failed (%s), retry in %.1fs", envelope.message["To"], error, delay)
+        task = asyncio.create_task(self._requeue_later(envelope, delay))
+        self._retrying.add(task)
+        task.add_done_callback(self._retrying.discard)
+
+    async def _requeue_later(self, envelope: _Envelope, delay: float) -> None:
+        await asyncio.sleep(delay)
+        try:
+            self._queue.put_nowait(envelope)
+        except asyncio.QueueFull as e:
+            self._give_up(envelope, e)
+
+    async def drain(self, timeout: Optional[float] = None) -> None:
+        """Attend que la file et les nouvelles tentatives programmées soient vides"""
+        if self._queue is None:
+            return
+
+        async def wait_empty():
+            while True:
+                await self._queue.join()
+                if not self._retrying:
+                    return
+                await asyncio.gather(*self._retrying, return_exceptions=True)
+
+        await asyncio.wait_for(wait_empty(), timeout)
+
+    async def stop(self, timeout: float = 10) -> None:
+        try:
+            await self.drain(timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Mail queue stopped with %d email(s) still queued", self.depth)
+        for task in [*self._tasks, *self._retrying]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._retrying, return_exceptions=True)
+        self._tasks, self._retrying, self._loop = [], set(), None
+        await self.pool.close()
+
+
+smtp_pool = SMTPConnectionPool(
+    SMTP_SERVER,
+    SMTP_PORT,
+    username=EMAIL_ADDRESS,
+    password=EMAIL_PASSWORD,
+    size=MAIL_POOL_SIZE,
+    start_tls=SMTP_START_TLS,
+    timeout=SMTP_TIMEOUT,
+)
+
+mail_queue = MailQueue(
+    smtp_pool,
+    max_size=MAIL_QUEUE_SIZE,
+    workers=MAIL_WORKERS,
+    batch_size=MAIL_BATCH_SIZE,
+    max_retries=MAIL_MAX_RETRIES,
+    retry_base_delay=MAIL_RETRY_BASE_DELAY,
+)
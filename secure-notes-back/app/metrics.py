@@ -0,0 +1,92 @@
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+# Bornes en secondes, de la requête servie depuis un cache au hachage bcrypt
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, labels: Tuple = (), amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, labels: Tuple = ()) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.label_names, labels)} {value}" for labels, value in self._values.items()]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # Par série : compte par intervalle (non cumulé), somme, total
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, labels: Tuple, value: float) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, labels: Tuple) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.label_names + ('le',), labels + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Métriques au format texte Prometheus, propres au processus (un scrape par worker)"""
+
+    def __init__(self):
+        self.request_duration = Histogram(
+            "http_request_duration_seconds", "Durée des requêtes HTTP par route", ("method", "route", "status"),
+        )
+        self.db_queries = Counter("db_queries_total", "Requêtes SQL exécutées par route", ("route",))
+        self.db_time = Counter("db_query_seconds_total", "Temps passé dans la base par route", ("route",))
+        self.slow_queries = Counter("db_slow_queries_total", "Requêtes SQL au-dessus de SLOW_QUERY_MS")
+        self.admission_rejections = Counter(
+            "admission_rejections_total", "Tentatives d'authentification refusées", ("action", "reason"),
+        )
+        self.events_dropped = Counter("note_events_dropped_total", "Événements de notes remplacés par un sync")
+
+    def render(self) -> str:
+        lines = []
+        for metric in (
+            self.request_duration, self.db_queries, self.db_time, self.slow_queries, self.admission_rejections,
+            self.events_dropped,
+        ):
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
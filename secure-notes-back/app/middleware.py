@@ -1,29 +1,57 @@
 from fastapi import Request, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.cache import user_cache
 from app.repositories import UserRepository
-from app.constants import get_db
+from app.constants import get_read_db
 from app.routes.auth_routes import verify_token
+from app.tokens import token_verifier
 from .models import User
 import os
 
-def get_current_user_from_access_cookie(
+TEST_USER = User(id=1, email="test@example.com", name="Test User")
+
+async def get_current_user_from_access_cookie(
+    request: Request,
+    db: AsyncSession = Depends(get_read_db)
+):
+    user = await get_current_user_even_if_deleting(request, db=db)
+    # Compte en cours de suppression : ses jetons encore valides n'ouvrent plus l'accès aux notes
+    if user.deleting_at is not None:
+        raise HTTPException(status_code=410, detail="Account is being deleted")
+    return user
+
+async def get_current_user_even_if_deleting(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
+    """Utilisateur du cookie d'accès, y compris pendant la suppression de son compte (suivi de la purge)"""
     # En mode test, bypass toute logique et laisse les patchs agir
     if os.getenv("TESTING") == "1":
-        return {"id": 1, "email": "test@example.com"}
+        return TEST_USER
+
+    # Une seule résolution par requête, même si la dépendance est déclarée plusieurs fois
+    current_user = getattr(request.state, "current_user", None)
+    if current_user is not None:
+        return current_user
 
     token = request.cookies.get("access_token")
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
+    # Révocations faites par les autres workers depuis la dernière relecture
+    await token_verifier.refresh()
     user_id = verify_token(token)
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user: User = UserRepository.get_by_id(db, user_id=user_id)
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
+    user: User = user_cache.get(user_id)
+    if user is None:
+        user = await UserRepository.get_by_id(db, user_id=user_id)
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found")
+        # Détaché de la session : l'instance en cache est partagée entre requêtes
+        db.expunge(user)
+        user_cache.set(user_id, user)
 
+    request.state.current_user = user
     return user
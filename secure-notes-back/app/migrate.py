@@ -0,0 +1,58 @@
+"""Migrations du schéma (Alembic), à lancer une fois par déploiement et non par worker.
+
+Usage (depuis secure-notes-back/) :
+    python -m app.migrate
+"""
+from pathlib import Path
+from typing import Optional
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import NullPool
+from .extensions import DATABASE_URL
+from .startup import backoff_delays
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def alembic_config(url: Optional[str] = None) -> Config:
+    config = Config(str(BASE_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BASE_DIR / "migrations"))
+    if url:
+        # Passée hors du fichier ini pour ne pas interpréter les % du mot de passe
+        config.attributes["url"] = url
+    return config
+
+
+def wait_for_connection(url: str, max_wait: float) -> None:
+    """Attend que la base accepte les connexions (démarrage simultané des conteneurs)"""
+    engine = create_engine(url, poolclass=NullPool)
+    deadline = time.monotonic() + max_wait
+    try:
+        for delay in backoff_delays():
+            try:
+                with engine.connect():
+                    return
+            except OperationalError as e:
+                if time.monotonic() + delay > deadline:
+                    raise
+                logger.warning("Database not ready for migrations (%s), retry in %.1fs", e.orig, delay)
+                time.sleep(delay)
+    finally:
+        engine.dispose()
+
+
+def upgrade_database(url: Optional[str] = None, revision: str = "head", max_wait: float = 60) -> None:
+    """Applique les migrations une fois la base joignable (une erreur de migration n'est pas réessayée)"""
+    wait_for_connection(url or DATABASE_URL, max_wait)
+    command.upgrade(alembic_config(url), revision)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    upgrade_database()
@@ -1,7 +1,25 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import (
+    BigInteger, Column, Integer, String, Boolean, DateTime, Float, ForeignKey, ForeignKeyConstraint, Index, func, literal_column,
+)
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from .extensions import Base
+from .config import NOTES_PARTITIONS, SEARCH_CONFIG
+from .extensions import Base, DATABASE_URL
+
+# Recherche plein texte Postgres : NoteRepository.search doit réutiliser exactement cette
+# expression (constantes inline, pas de paramètres) pour que l'index GIN soit utilisé
+SEARCH_REGCONFIG = literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+
+# Schéma appliqué par la migration 0007 : sur Postgres avec NOTES_PARTITIONS, la clé primaire de
+# notes est (id, owner_id) et les pièces jointes la référencent par (note_id, owner_id)
+NOTES_PARTITIONED = NOTES_PARTITIONS > 0 and make_url(DATABASE_URL).get_backend_name() == "postgresql"
+
+def search_document(title, content):
+    return func.to_tsvector(
+        SEARCH_REGCONFIG,
+        func.coalesce(title, literal_column("''", String)) + literal_column("' '", String) + content,
+    )
 
 class User(Base):
     __tablename__ = "users"
@@ -11,40 +29,106 @@ class User(Base):
     name = Column(String, nullable=False)
     hashed_password = Column(String, nullable=False)
     is_email_verified = Column(Boolean, default=False)
+    # Clé de données AES-GCM des notes, chiffrée par la clé maître (app/crypto.py)
+    wrapped_data_key = Column(String, nullable=True)
+    # Dernier numéro de changement attribué à ses notes (synchronisation incrémentale)
+    change_seq = Column(Integer, nullable=False, default=0, server_default="0")
+    # Suppression en cours (purge par lots) : le compte n'est plus utilisable
+    deleting_at = Column(DateTime, nullable=True)
+    # Worker propriétaire de la purge et fin de son bail (horodatage Unix) : une seule purge par compte
+    purge_owner = Column(String(32), nullable=True)
+    purge_lease_until = Column(Float, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    notes = relationship("Note", back_populates="owner", cascade="all,delete")
+    # passive_deletes : les notes sont supprimées par ON DELETE CASCADE, sans être chargées
+    notes = relationship("Note", back_populates="owner", cascade="all,delete", passive_deletes=True)
 
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "email": self.email,
-            "name": self.name,
-            "hashed_password": self.hashed_password,
-            "is_email_verified": self.is_email_verified,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-        }       
 
 class Note(Base):
+    # Avec NOTES_PARTITIONS, la migration 0007 partitionne la table par hachage de owner_id (clé
+    # primaire (id, owner_id)) : les requêtes filtrent toujours sur owner_id pour n'en lire qu'une
     __tablename__ = "notes"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     title = Column(String, index=True)
     content = Column(String, nullable=False)
-    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, primary_key=NOTES_PARTITIONED)
+    # Numéro de la dernière écriture, croissant par propriétaire (GET /notes/changes)
+    change_seq = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     owner = relationship("User", back_populates="notes")
 
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "title": self.title,
-            "content": self.content,
-            "owner_id": self.owner_id,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-        }
\ No newline at end of file
+    __table_args__ = (
+        # Pagination par clé : WHERE owner_id = ? AND (updated_at, id) < (?, ?) ORDER BY updated_at DESC, id DESC
+        Index("ix_notes_owner_updated_id", "owner_id", "updated_at", "id"),
+        # Synchronisation : WHERE owner_id = ? AND (change_seq, id) > (?, ?) ORDER BY change_seq, id
+        Index("ix_notes_owner_change_seq_id", "owner_id", "change_seq", "id"),
+        # Recherche plein texte, Postgres uniquement (repli en mémoire ailleurs)
+        Index("ix_notes_search_document", search_document(title, content), postgresql_using="gin")
+        .ddl_if(dialect="postgresql"),
+    )
+
+
+class NoteTombstone(Base):
+    """Trace d'une note supprimée, renvoyée aux clients qui synchronisent après sa suppression"""
+    __tablename__ = "note_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    note_id = Column(Integer, nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    change_seq = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_note_tombstones_owner_change_seq_note_id", "owner_id", "change_seq", "note_id"),
+    )
+
+
+class Attachment(Base):
+    """Pièce jointe d'une note ; le contenu est dans le blob store, sous son SHA-256"""
+    __tablename__ = "attachments"
+
+    id = Column(Integer, primary_key=True)
+    note_id = Column(Integer, nullable=False, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(255), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    # Clé du contenu, partagée par les pièces jointes identiques (déduplication)
+    sha256 = Column(String(64), nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        ForeignKeyConstraint(["note_id", "owner_id"], ["notes.id", "notes.owner_id"], ondelete="CASCADE")
+        if NOTES_PARTITIONED
+        else ForeignKeyConstraint(["note_id"], ["notes.id"], ondelete="CASCADE"),
+    )
+
+
+class RateLimitBucket(Base):
+    """Seau à jetons partagé entre workers (ADMISSION_BACKEND=database)"""
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String(128), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    # Horodatage Unix du dernier remplissage
+    updated_at = Column(Float, nullable=False, index=True)
+    # Résultat de la dernière tentative, relu par RETURNING
+    admitted = Column(Boolean, nullable=False)
+
+
+class RevokedToken(Base):
+    """Jeton d'accès révoqué (logout), partagé par tous les workers jusqu'à son expiration"""
+    __tablename__ = "revoked_tokens"
+
+    # Empreinte SHA-256 (hex) du jeton : le jeton lui-même n'est pas conservé
+    digest = Column(String(64), primary_key=True)
+    # Horodatages Unix : exp du jeton, et révocation (relue par les autres workers)
+    expires_at = Column(Float, nullable=False, index=True)
+    revoked_at = Column(Float, nullable=False, index=True)
+
+
+note_search_document = search_document(Note.title, Note.content)
@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import Tuple
+import base64
+import binascii
+import json
+
+
+def encode_cursor(updated_at: datetime, note_id: int) -> str:
+    """Jeton opaque de continuation pointant après la note (updated_at, id)"""
+    raw = json.dumps([updated_at.isoformat(), note_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Décode un jeton produit par encode_cursor, lève ValueError s'il est invalide"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        updated_at, note_id = json.loads(raw)
+        return datetime.fromisoformat(updated_at), int(note_id)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def encode_change_cursor(change_seq: int, note_id: int) -> str:
+    """Jeton de synchronisation pointant après le changement (change_seq, id)"""
+    raw = json.dumps([change_seq, note_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_change_cursor(cursor: str) -> Tuple[int, int]:
+    """Décode un jeton produit par encode_change_cursor, lève ValueError s'il est invalide"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        change_seq, note_id = json.loads(raw)
+        return int(change_seq), int(note_id)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
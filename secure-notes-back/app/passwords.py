@@ -0,0 +1,108 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+from passlib.context import CryptContext
+from .config import BCRYPT_ROUNDS, PASSWORD_HASH_EXECUTOR, PASSWORD_HASH_MAX_QUEUE, PASSWORD_HASH_WORKERS
+from .instrumentation import timed
+import asyncio
+import threading
+
+# min/max = rounds : tout hash produit avec un autre coût est signalé par needs_update
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# Fonctions de niveau module pour rester sérialisables par un ProcessPoolExecutor
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+def check_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+def needs_rehash(hashed_password: str) -> bool:
+    """Indique si le hash a été calculé avec d'autres paramètres que pwd_context"""
+    try:
+        return pwd_context.needs_update(hashed_password)
+    except ValueError:
+        # Hash illisible : on ne tente pas de le remplacer
+        return False
+
+
+class HashingOverloaded(Exception):
+    """File de calculs bcrypt pleine : la requête doit être refusée (503) plutôt que d'attendre"""
+
+    def __init__(self, retry_after: int = 1):
+        super().__init__("Password hashing queue is full")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """Exécute bcrypt dans un pool borné pour ne jamais bloquer la boucle d'événements
+
+    Au-delà de max_queue calculs en attente, les nouveaux sont refusés immédiatement
+    (HashingOverloaded) : une rafale de connexions ne peut pas occuper tous les cœurs.
+    """
+
+    def __init__(self, executor_kind: str = "thread", max_workers: int = 4, max_queue: int = -1):
+        self.executor_kind = executor_kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        # Création paresseuse : un pool de processus doit naître après le fork des workers
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    executor_class = ProcessPoolExecutor if self.executor_kind == "process" else ThreadPoolExecutor
+                    self._executor = executor_class(max_workers=self.max_workers)
+        return self._executor
+
+    async def _submit(self, fn, *args):
+        if 0 <= self.max_queue <= self.queue_depth:
+            self.rejected += 1
+            raise HashingOverloaded()
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        try:
+            with timed("bcrypt"):
+                return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    @property
+    def queue_depth(self) -> int:
+        """Nombre de calculs en attente d'un worker libre"""
+        return max(0, self.pending - self.max_workers)
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(check_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.executor_kind,
+            "workers": self.max_workers,
+            "in_flight": min(self.pending, self.max_workers),
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_EXECUTOR, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE)
@@ -0,0 +1,74 @@
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+import time
+
+
+class PoolMetrics:
+    """Compteurs d'attente lors de l'obtention d'une connexion du pool"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, waited: float) -> None:
+        self.checkouts += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+
+    def to_dict(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_total, 6),
+            "wait_seconds_avg": round(self.wait_total / self.checkouts, 6) if self.checkouts else 0.0,
+            "wait_seconds_max": round(self.wait_max, 6),
+        }
+
+
+class _TimedPoolMixin:
+    """Mesure le temps passé dans connect() : attente d'un slot libre, ouverture et pre-ping"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self):
+        # Conserve les compteurs lorsque SQLAlchemy recrée le pool (dispose, invalidation)
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        self.metrics.record(time.perf_counter() - start)
+        return connection
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_stats(pool) -> dict:
+    """Etat du pool : taille, connexions prêtées, débordement et temps d'attente"""
+    stats = {"class": type(pool).__name__}
+    for name, attribute in (("size", "size"), ("checked_in", "checkedin"), ("checked_out", "checkedout"), ("overflow", "overflow")):
+        method = getattr(pool, attribute, None)
+        if method is not None:
+            stats[name] = method()
+    if hasattr(pool, "_max_overflow"):
+        stats["max_overflow"] = pool._max_overflow
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(metrics.to_dict())
+    return stats
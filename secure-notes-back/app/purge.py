@@ -0,0 +1,121 @@
+from typing import Dict, List, Optional
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from .cache import user_cache
+from .config import ACCOUNT_PURGE_BATCH_SIZE, ACCOUNT_PURGE_LEASE, ACCOUNT_PURGE_PAUSE
+from .crypto import note_cipher
+from .extensions import AsyncSessionLocal
+from .repositories import NoteRepository, UserRepository
+from .search import search_index
+import asyncio
+import logging
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class AccountPurger:
+    """Purge en arrière-plan des notes d'un compte marqué deleting_at, par lots bornés
+
+    Chaque lot est une transaction courte : pas de verrou long ni de requête qui expire.
+    Le compte lui-même est supprimé une fois ses notes parties. Une purge interrompue
+    (redémarrage) reprend au démarrage suivant grâce au marqueur en base.
+
+    Chaque worker démarre les purges en attente : un bail en base (users.purge_owner,
+    renouvelé à chaque lot) réserve chaque compte à un seul d'entre eux. Les autres attendent
+    l'expiration du bail, ce qui reprend la purge d'un worker arrêté.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        batch_size: int = 1000,
+        pause: float = 0.05,
+        lease: float = 60.0,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.pause = pause
+        self.lease = lease
+        self.owner = uuid.uuid4().hex
+        # Notes supprimées par compte pour les purges de ce processus
+        self.progress: Dict[int, int] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    def start(self, user_id: int) -> None:
+        """Lance la purge du compte si elle ne tourne pas déjà dans ce processus"""
+        if user_id in self._tasks:
+            return
+        self.progress.setdefault(user_id, 0)
+        task = asyncio.create_task(self._purge(user_id))
+        self._tasks[user_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(user_id, None))
+
+    def is_running(self, user_id: int) -> bool:
+        return user_id in self._tasks
+
+    async def _claim(self, user_id: int) -> bool:
+        """Prend ou renouvelle le bail du compte ; attend celui d'un autre worker
+
+        False quand le compte n'est plus à purger (supprimé par le worker qui le tenait).
+        """
+        while True:
+            async with self.session_factory() as db:
+                if await UserRepository.claim_purge(db, user_id, self.owner, time.time(), self.lease):
+                    return True
+                if not await UserRepository.is_deleting(db, user_id):
+                    return False
+            await asyncio.sleep(self.lease)
+
+    async def _purge(self, user_id: int) -> None:
+        try:
+            while True:
+                if not await self._claim(user_id):
+                    self.progress.pop(user_id, None)
+                    return
+                # Un lot incomplet ne prouve rien (lecture concurrente, réplication) : on
+                # s'arrête sur un lot vide puis un comptage confirme qu'il ne reste rien
+                async with self.session_factory() as db:
+                    deleted = await NoteRepository.purge_batch(db, user_id, self.batch_size)
+                    remaining = 1 if deleted else await UserRepository.count_notes(db, user_id, limit=1)
+                    if not remaining and await UserRepository.delete_marked(db, user_id, self.owner):
+                        break
+                self.progress[user_id] += deleted
+                await asyncio.sleep(self.pause)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Le compte reste marqué : la purge reprendra au prochain démarrage
+            logger.exception("Account purge failed", extra={"user_id": user_id})
+            return
+        search_index.unload(user_id)
+        user_cache.invalidate(user_id)
+        note_cipher.forget(user_id)
+        self.progress.pop(user_id, None)
+        logger.info("Account purged", extra={"user_id": user_id})
+
+    async def resume(self) -> List[int]:
+        """Relance les purges laissées inachevées"""
+        async with self.session_factory() as db:
+            user_ids = await UserRepository.get_deleting_ids(db)
+        for user_id in user_ids:
+            self.start(user_id)
+        return user_ids
+
+    async def wait(self, user_id: int, timeout: Optional[float] = None) -> None:
+        task = self._tasks.get(user_id)
+        if task is not None:
+            await asyncio.wait_for(asyncio.shield(task), timeout)
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def stats(self) -> dict:
+        return {"running": len(self._tasks), "deleted": sum(self.progress.values())}
+
+
+account_purger = AccountPurger(AsyncSessionLocal, ACCOUNT_PURGE_BATCH_SIZE, ACCOUNT_PURGE_PAUSE, ACCOUNT_PURGE_LEASE)
@@ -0,0 +1,144 @@
+from typing import List, Optional
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from starlette.requests import Request
+from .cache import TTLCache
+from .config import REPLICA_RETRY_AFTER, REPLICA_STICKINESS
+from .extensions import replica_engines
+from .tokens import token_verifier
+import asyncio
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+# Horodatage Unix jusqu'auquel le client lit sur le primaire, partagé par tous les workers
+STICKY_COOKIE = "primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class Replica:
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.session_factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        self.down_until = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.engine.url.render_as_string(hide_password=True)
+
+    def is_available(self, now: float) -> bool:
+        return self.down_until <= now
+
+
+class ReplicaRouter:
+    """Choisit la base d'une lecture : un réplica disponible, ou le primaire
+
+    Le primaire est imposé pendant stickiness secondes après une écriture de l'utilisateur,
+    par un cookie (valable sur tous les workers) et par une table en mémoire (valable pour
+    ses autres clients servis par ce worker). Un réplica qui refuse la connexion est écarté
+    pendant retry_after secondes.
+    """
+
+    def __init__(self, engines: List[AsyncEngine], stickiness: float = 5, retry_after: float = 30):
+        self.replicas = [Replica(engine) for engine in engines]
+        self.stickiness = stickiness
+        self.retry_after = retry_after
+        self._sticky_users = TTLCache(max_size=100_000, ttl=stickiness)
+        self._next = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def mark_write(self, user_id: Optional[int]) -> float:
+        """Enregistre une écriture, renvoie l'horodatage de fin de la fenêtre"""
+        if user_id is not None:
+            self._sticky_users.set(user_id, True)
+        return time.time() + self.stickiness
+
+    def is_sticky(self, request: Request) -> bool:
+        try:
+            if float(request.cookies.get(STICKY_COOKIE, 0)) > time.time():
+                return True
+        except ValueError:
+            pass
+        user_id = request_user_id(request)
+        return user_id is not None and self._sticky_users.get(user_id, False)
+
+    def choose(self, request: Request) -> Optional[Replica]:
+        """Réplica pour la requête, None pour lire sur le primaire"""
+        if not self.replicas or request.method not in SAFE_METHODS or self.is_sticky(request):
+            return None
+        now = time.monotonic()
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(self._next + offset) % len(self.replicas)]
+            if replica.is_available(now):
+                self._next = (self._next + offset + 1) % len(self.replicas)
+                return replica
+        return None
+
+    def mark_down(self, replica: Replica, error: Exception) -> None:
+        replica.down_until = time.monotonic() + self.retry_after
+        logger.warning("Replica unavailable, reads go to the primary", extra={"replica": replica.name, "error": str(error)})
+
+    def stats(self) -> list:
+        now = time.monotonic()
+        return [{"replica": replica.name, "available": replica.is_available(now)} for replica in self.replicas]
+
+    async def dispose(self) -> None:
+        await asyncio.gather(*(replica.engine.dispose() for replica in self.replicas))
+
+
+def request_user_id(request: Request) -> Optional[int]:
+    """Utilisateur du cookie d'accès, sans requête SQL (claims JWT en cache)"""
+    token = request.cookies.get("access_token")
+    if not token:
+        return None
+    try:
+        return int(token_verifier.decode(token)["sub"])
+    except Exception:
+        return None
+
+
+async def open_read_session(router: ReplicaRouter, request: Request) -> Optional[AsyncSession]:
+    """Session connectée sur un réplica, None s'il faut lire sur le primaire"""
+    replica = router.choose(request)
+    if replica is None:
+        return None
+    session = replica.session_factory()
+    try:
+        # Connexion prise tout de suite : un réplica en panne bascule sur le primaire ici,
+        # pas au milieu de la route
+        await session.connection()
+    except (DBAPIError, OSError, asyncio.TimeoutError) as e:
+        await session.close()
+        router.mark_down(replica, e)
+        return None
+    return session
+
+
+class StickyPrimaryMiddleware:
+    """Après une écriture réussie, envoie les lectures du client sur le primaire quelques secondes"""
+
+    def __init__(self, app, router: Optional[ReplicaRouter] = None):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope, receive, send):
+        router = self.router or replica_router
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not router.enabled:
+            return await self.app(scope, receive, send)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = router.mark_write(request_user_id(Request(scope)))
+                cookie = f"{STICKY_COOKIE}={math.ceil(until)}; Max-Age={math.ceil(router.stickiness)}; Path=/; HttpOnly; SameSite=Lax"
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+replica_router = ReplicaRouter(replica_engines, REPLICA_STICKINESS, REPLICA_RETRY_AFTER)
@@ -1,64 +1,561 @@
-from typing import Optional, List
-from sqlalchemy.orm import Session
-from .models import User, Note
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, Optional, List, Tuple
+from sqlalchemy import BigInteger, DateTime, String, delete, func, insert, literal, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from .crypto import note_cipher
+from .events import SYNC, record_note_event
+from .models import Attachment, User, Note, NoteTombstone, SEARCH_REGCONFIG, note_search_document
+from .search import search_index
 
 
 class UserRepository:
 
     @staticmethod
-    def get_by_id(db: Session, user_id: int) -> Optional[User]:
-        return db.query(User).filter(User.id == user_id).first()
+    async def get_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
+        result = await db.execute(select(User).where(User.id == user_id))
+        return result.scalars().first()
 
     @staticmethod
-    def get_by_email(db: Session, email: str) -> Optional[User]:
-        return db.query(User).filter(User.email == email).first()
+    async def get_by_email(db: AsyncSession, email: str) -> Optional[User]:
+        result = await db.execute(select(User).where(User.email == email))
+        return result.scalars().first()
 
     @staticmethod
-    def get_all(db: Session, skip: int, limit: int) -> List[User]:
-        return db.query(User).offset(skip).limit(limit).all()
+    async def get_all(db: AsyncSession, skip: int, limit: int) -> List[User]:
+        result = await db.execute(select(User).offset(skip).limit(limit))
+        return list(result.scalars().all())
 
     @staticmethod
-    def create(db: Session, user: User) -> User:
+    async def create(db: AsyncSession, user: User) -> User:
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
         return user
 
     @staticmethod
-    def update(db: Session, user: User) -> User:
-        db.merge(user)
-        db.commit()
+    async def update(db: AsyncSession, user: User) -> User:
+        await db.merge(user)
+        await db.commit()
         return user
 
     @staticmethod
-    def delete(db: Session, user: User) -> None:
-        db.delete(user)
-        db.commit()
+    async def delete(db: AsyncSession, user: User) -> None:
+        # Une seule instruction : notes et pierres tombales suivent par ON DELETE CASCADE
+        await db.delete(user)
+        await db.commit()
+
+    @staticmethod
+    async def count_notes(db: AsyncSession, user_id: int, limit: Optional[int] = None) -> int:
+        """Nombre de notes de l'utilisateur, compté au plus jusqu'à limit"""
+        notes = select(Note.id).where(Note.owner_id == user_id)
+        if limit is not None:
+            notes = notes.limit(limit)
+        return (await db.execute(select(func.count()).select_from(notes.subquery()))).scalar_one()
+
+    @staticmethod
+    async def mark_deleting(db: AsyncSession, user_id: int) -> bool:
+        """Marque le compte en cours de suppression, False s'il l'était déjà"""
+        result = await db.execute(
+            update(User)
+            .where(User.id == user_id, User.deleting_at.is_(None))
+            .values(deleting_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+    @staticmethod
+    async def get_deleting_ids(db: AsyncSession) -> List[int]:
+        result = await db.execute(select(User.id).where(User.deleting_at.is_not(None)))
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def is_deleting(db: AsyncSession, user_id: int) -> bool:
+        result = await db.execute(select(User.id).where(User.id == user_id, User.deleting_at.is_not(None)))
+        return result.first() is not None
+
+    @staticmethod
+    async def claim_purge(db: AsyncSession, user_id: int, owner: str, now: float, lease: float) -> bool:
+        """Prend ou prolonge la purge d'un compte marqué, False si un autre worker la tient
+
+        Un UPDATE conditionnel : le bail d'un worker arrêté expire et la purge peut être reprise.
+        """
+        result = await db.execute(
+            update(User)
+            .where(
+                User.id == user_id,
+                User.deleting_at.is_not(None),
+                (User.purge_owner == owner) | User.purge_lease_until.is_(None) | (User.purge_lease_until < now),
+            )
+            .values(purge_owner=owner, purge_lease_until=now + lease)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+    @staticmethod
+    async def delete_marked(db: AsyncSession, user_id: int, owner: str) -> bool:
+        """Supprime le compte marqué dont owner tient la purge, seulement s'il n'a plus de notes
+
+        La cascade ne supprime alors aucune note : pas de longue transaction.
+        """
+        remaining = select(Note.id).where(Note.owner_id == user_id).exists()
+        result = await db.execute(
+            delete(User).where(User.id == user_id, User.deleting_at.is_not(None), User.purge_owner == owner, ~remaining)
+        )
+        await db.commit()
+        return result.rowcount == 1
 
 class NoteRepository:
 
     @staticmethod
-    def get_by_id(db: Session, note_id: int) -> Optional[Note]:
-        return db.query(Note).filter(Note.id == note_id).first()
+    async def get_by_id(db: AsyncSession, note_id: int) -> Optional[Note]:
+        """Note par id seul : sans owner_id, toutes les partitions de notes sont parcourues"""
+        result = await db.execute(select(Note).where(Note.id == note_id))
+        note = result.scalars().first()
+        if note is not None:
+            await note_cipher.decrypt_notes(db, [note])
+        return note
+
+    @staticmethod
+    async def get_owned(db: AsyncSession, note_id: int, owner_id: int) -> Optional[Note]:
+        """Note du propriétaire, None si elle n'existe pas ou appartient à un autre utilisateur"""
+        result = await db.execute(select(Note).where(Note.id == note_id, Note.owner_id == owner_id))
+        note = result.scalars().first()
+        if note is not None:
+            await note_cipher.decrypt_notes(db, [note])
+        return note
+
+    @staticmethod
+    async def list_owned(
+        db: AsyncSession,
+        owner_id: int,
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Note]:
+        """Page de notes la plus récente d'abord, reprise après la clé (updated_at, id)"""
+        result = await db.execute(NoteRepository._page_query(select(Note), owner_id, limit, after))
+        notes = list(result.scalars().all())
+        # Toute la page est déchiffrée en un appel (une seule clé de données)
+        await note_cipher.decrypt_notes(db, notes)
+        return notes
+
+    @staticmethod
+    async def get_by_user_id(
+        db: AsyncSession,
+        user_id: int,
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Note]:
+        return await NoteRepository.list_owned(db, owner_id=user_id, limit=limit, after=after)
+
+    @staticmethod
+    def _page_query(query, user_id: int, limit: int, after: Optional[Tuple[datetime, int]]):
+        query = query.where(Note.owner_id == user_id)
+        if after is not None:
+            query = query.where(tuple_(Note.updated_at, Note.id) < tuple_(*after))
+        return query.order_by(Note.updated_at.desc(), Note.id.desc()).limit(limit)
+
+    @staticmethod
+    async def get_owned_version(db: AsyncSession, note_id: int, owner_id: int) -> Optional[Tuple[int, Optional[datetime]]]:
+        """(id, updated_at) de la note du propriétaire, sans charger son contenu"""
+        result = await db.execute(
+            select(Note.id, Note.updated_at).where(Note.id == note_id, Note.owner_id == owner_id)
+        )
+        row = result.first()
+        return tuple(row) if row is not None else None
+
+    @staticmethod
+    async def get_page_versions(
+        db: AsyncSession,
+        user_id: int,
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Tuple[int, Optional[datetime]]]:
+        """(id, updated_at) des notes de la page que renverrait list_owned (index couvrant)"""
+        result = await db.execute(NoteRepository._page_query(select(Note.id, Note.updated_at), user_id, limit, after))
+        return [tuple(row) for row in result.all()]
+
+    @staticmethod
+    async def stream_by_user_id(db: AsyncSession, user_id: int, batch_size: int) -> AsyncIterator[List[Note]]:
+        """Toutes les notes d'un utilisateur par lots, lues via un curseur côté serveur"""
+        result = await db.stream_scalars(
+            select(Note)
+            .where(Note.owner_id == user_id)
+            .order_by(Note.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for notes in result.partitions():
+            await note_cipher.decrypt_notes(db, notes)
+            yield notes
 
     @staticmethod
-    def get_by_user_id(db: Session, user_id: int, skip: int, limit: int) -> List[Note]:
-        return db.query(Note).filter(Note.owner_id == user_id).offset(skip).limit(limit).all()
+    async def get_collection_version(db: AsyncSession, user_id: int) -> Tuple[int, Optional[datetime], Optional[int]]:
+        """(nombre, dernière modification, plus grand id) des notes : change à chaque écriture"""
+        result = await db.execute(
+            select(func.count(Note.id), func.max(Note.updated_at), func.max(Note.id)).where(Note.owner_id == user_id)
+        )
+        return tuple(result.one())
 
     @staticmethod
-    def create(db: Session, note: Note) -> Note:
+    async def search(
+        db: AsyncSession,
+        owner_id: int,
+        query: str,
+        limit: int,
+        offset: int = 0
+    ) -> List[Tuple[Note, float]]:
+        """Notes du propriétaire contenant tous les termes, classées par pertinence"""
+        # Le tsvector ne peut pas être calculé sur des notes chiffrées
+        if db.get_bind().dialect.name == "postgresql" and not note_cipher.enabled:
+            ts_query = func.plainto_tsquery(SEARCH_REGCONFIG, query)
+            rank = func.ts_rank(note_search_document, ts_query).label("rank")
+            result = await db.execute(
+                select(Note, rank)
+                .where(Note.owner_id == owner_id, note_search_document.op("@@")(ts_query))
+                .order_by(rank.desc(), Note.id.desc())
+                .offset(offset)
+                .limit(limit)
+            )
+            return [(note, float(score)) for note, score in result.all()]
+
+        # Repli : index inversé en mémoire, rechargé quand users.change_seq a bougé depuis son
+        # chargement (écriture d'un autre worker) ; lu avant les notes, un écart ne fait que recharger
+        change_seq = (await db.execute(select(User.change_seq).where(User.id == owner_id))).scalar_one_or_none()
+        if change_seq is None:
+            return []
+        if search_index.version(owner_id) != change_seq:
+            rows = await db.execute(select(Note.id, Note.title, Note.content).where(Note.owner_id == owner_id))
+            search_index.load(owner_id, await note_cipher.decrypt_rows(db, owner_id, rows.all()), change_seq)
+        hits = search_index.search(owner_id, query, limit=limit, offset=offset)
+        if not hits:
+            return []
+        result = await db.execute(
+            select(Note).where(Note.owner_id == owner_id, Note.id.in_([note_id for note_id, _ in hits]))
+        )
+        notes = {note.id: note for note in result.scalars()}
+        await note_cipher.decrypt_notes(db, notes.values())
+        return [(notes[note_id], score) for note_id, score in hits if note_id in notes]
+
+    @staticmethod
+    def _increment_change_seq(owner_id: int):
+        return (
+            update(User)
+            .where(User.id == owner_id)
+            .values(change_seq=User.change_seq + 1, updated_at=User.updated_at)
+            .returning(User.change_seq)
+        )
+
+    @staticmethod
+    async def next_change_seq(db: AsyncSession, owner_id: int) -> int:
+        """Numéro de changement suivant du propriétaire, dans la transaction en cours
+
+        Le verrou pris sur la ligne de l'utilisateur jusqu'au commit ordonne les écritures
+        concurrentes : un numéro n'est jamais visible avant un numéro plus petit.
+        """
+        result = await db.execute(
+            NoteRepository._increment_change_seq(owner_id).execution_options(synchronize_session=False)
+        )
+        change_seq = result.scalar_one_or_none()
+        if change_seq is None:
+            raise ValueError(f"User {owner_id} not found")
+        return change_seq
+
+    @staticmethod
+    async def get_changes(
+        db: AsyncSession,
+        owner_id: int,
+        after: Tuple[int, int],
+        limit: int
+    ) -> List[Tuple[int, int, Optional[Note]]]:
+        """(change_seq, id, note) écrites ou supprimées (note None) après la clé (change_seq, id)"""
+        result = await db.execute(
+            select(Note)
+            .where(Note.owner_id == owner_id, tuple_(Note.change_seq, Note.id) > tuple_(*after))
+            .order_by(Note.change_seq, Note.id)
+            .limit(limit)
+        )
+        notes = list(result.scalars().all())
+        tombstones = await db.execute(
+            select(NoteTombstone.change_seq, NoteTombstone.note_id)
+            .where(
+                NoteTombstone.owner_id == owner_id,
+                tuple_(NoteTombstone.change_seq, NoteTombstone.note_id) > tuple_(*after),
+            )
+            .order_by(NoteTombstone.change_seq, NoteTombstone.note_id)
+            .limit(limit)
+        )
+        changes = sorted(
+            [(note.change_seq, note.id, note) for note in notes] + [(seq, note_id, None) for seq, note_id in tombstones.all()],
+            key=lambda change: change[:2],
+        )[:limit]
+        await note_cipher.decrypt_notes(db, [note for _, _, note in changes if note is not None])
+        return changes
+
+    @staticmethod
+    async def create(db: AsyncSession, note: Note) -> Note:
+        note.change_seq = await NoteRepository.next_change_seq(db, note.owner_id)
+        encrypted = await note_cipher.encrypt_values(db, note.owner_id, {"title": note.title, "content": note.content})
+        note.title, note.content = encrypted["title"], encrypted["content"]
         db.add(note)
-        db.commit()
-        db.refresh(note)
+        # id et dates sont renseignés par le flush (INSERT), sans relecture de la note
+        await db.flush()
+        record_note_event(db, note.owner_id, "upsert", note.id, note.change_seq)
+        await db.commit()
+        await note_cipher.decrypt_notes(db, [note])
+        search_index.add(note.owner_id, note.id, note.title, note.content)
+        search_index.advance(note.owner_id, note.change_seq)
         return note
 
     @staticmethod
-    def update(db: Session, note: Note) -> Note:
-        db.merge(note)
-        db.commit()
+    async def update(db: AsyncSession, note: Note) -> Note:
+        note.change_seq = await NoteRepository.next_change_seq(db, note.owner_id)
+        # UPDATE par (id, owner_id) plutôt que merge, qui relit et écrit par id seul : la clé
+        # de partition est toujours dans la condition
+        await db.execute(
+            update(Note)
+            .where(Note.id == note.id, Note.owner_id == note.owner_id)
+            .values(
+                **await note_cipher.encrypt_values(db, note.owner_id, {"title": note.title, "content": note.content}),
+                change_seq=note.change_seq,
+            )
+        )
+        record_note_event(db, note.owner_id, "upsert", note.id, note.change_seq)
+        await db.commit()
+        search_index.add(note.owner_id, note.id, note.title, note.content)
+        search_index.advance(note.owner_id, note.change_seq)
+        return note
+
+    @staticmethod
+    async def patch(db: AsyncSession, note_id: int, owner_id: int, values: Dict) -> Optional[Note]:
+        """UPDATE ... RETURNING des seuls champs fournis, sans lecture préalable
+
+        La condition sur owner_id remplace le contrôle d'accès : None si la note n'existe
+        pas ou n'appartient pas au propriétaire.
+        """
+        statement = (
+            update(Note)
+            .where(Note.id == note_id, Note.owner_id == owner_id)
+            .values(**await note_cipher.encrypt_values(db, owner_id, values))
+            .returning(Note)
+            .execution_options(synchronize_session=False)
+        )
+        if db.get_bind().dialect.name == "postgresql":
+            # Numéro de changement pris dans la même instruction (CTE modifiante) : un aller-retour
+            next_seq = NoteRepository._increment_change_seq(owner_id).cte("next_change_seq")
+            statement = statement.add_cte(next_seq).values(change_seq=select(next_seq.c.change_seq).scalar_subquery())
+        else:
+            statement = statement.values(change_seq=await NoteRepository.next_change_seq(db, owner_id))
+
+        note = (await db.execute(statement)).scalars().first()
+        if note is None:
+            await db.rollback()
+            return None
+        record_note_event(db, owner_id, "upsert", note.id, note.change_seq)
+        await db.commit()
+        await note_cipher.decrypt_notes(db, [note])
+        if search_index.is_loaded(owner_id):
+            search_index.add(owner_id, note.id, note.title, note.content)
+            search_index.advance(owner_id, note.change_seq)
         return note
 
     @staticmethod
-    def delete(db: Session, note: Note) -> None:
-        db.delete(note)
-        db.commit()
\ No newline at end of file
+    async def delete(db: AsyncSession, note: Note) -> None:
+        change_seq = await NoteRepository.next_change_seq(db, note.owner_id)
+        db.add(NoteTombstone(note_id=note.id, owner_id=note.owner_id, change_seq=change_seq))
+        await db.execute(delete(Note).where(Note.id == note.id, Note.owner_id == note.owner_id))
+        record_note_event(db, note.owner_id, "delete", note.id, change_seq)
+        await db.commit()
+        search_index.remove(note.id)
+        search_index.advance(note.owner_id, change_seq)
+
+    @staticmethod
+    async def delete_owned(db: AsyncSession, note_id: int, owner_id: int) -> bool:
+        """DELETE ... RETURNING id limité au propriétaire, False si aucune note n'a été supprimée"""
+        if db.get_bind().dialect.name == "postgresql":
+            # Suppression, numéro de changement et pierre tombale en une instruction
+            next_seq = NoteRepository._increment_change_seq(owner_id).cte("next_change_seq")
+            deleted = (
+                delete(Note).where(Note.id == note_id, Note.owner_id == owner_id).returning(Note.id).cte("deleted")
+            )
+            result = await db.execute(
+                insert(NoteTombstone)
+                .from_select(
+                    ["note_id", "owner_id", "change_seq", "deleted_at"],
+                    select(deleted.c.id, literal(owner_id), next_seq.c.change_seq, literal(datetime.utcnow())),
+                )
+                .add_cte(next_seq)
+                .add_cte(deleted)
+                .returning(NoteTombstone.change_seq)
+            )
+            change_seq = result.scalar_one_or_none()
+            found = change_seq is not None
+        else:
+            result = await db.execute(
+                delete(Note)
+                .where(Note.id == note_id, Note.owner_id == owner_id)
+                .returning(Note.id)
+                .execution_options(synchronize_session=False)
+            )
+            found = result.first() is not None
+            if found:
+                change_seq = await NoteRepository.next_change_seq(db, owner_id)
+                await db.execute(insert(NoteTombstone), [{"note_id": note_id, "owner_id": owner_id, "change_seq": change_seq}])
+        if not found:
+            await db.rollback()
+            return False
+        record_note_event(db, owner_id, "delete", note_id, change_seq)
+        await db.commit()
+        search_index.remove(note_id)
+        search_index.advance(owner_id, change_seq)
+        return True
+
+    # Opérations en lot : une instruction par lot, la transaction est validée par l'appelant
+
+    @staticmethod
+    async def insert_many(db: AsyncSession, owner_id: int, rows: List[Dict]) -> List[int]:
+        """INSERT ... RETURNING id de plusieurs notes, ids dans l'ordre des lignes"""
+        if not rows:
+            return []
+        change_seq = await NoteRepository.next_change_seq(db, owner_id)
+        values = [{**row, "owner_id": owner_id, "change_seq": change_seq} for row in rows]
+        result = await db.execute(
+            insert(Note).returning(Note.id, sort_by_parameter_order=True),
+            await note_cipher.encrypt_rows(db, owner_id, values),
+        )
+        ids = list(result.scalars().all())
+        record_note_event(db, owner_id, SYNC, 0, change_seq)
+        for note_id, row in zip(ids, values):
+            search_index.add(owner_id, note_id, row.get("title"), row["content"])
+        search_index.advance(owner_id, change_seq)
+        return ids
+
+    @staticmethod
+    async def get_owned_ids(db: AsyncSession, owner_id: int, note_ids: Iterable[int]) -> set:
+        result = await db.execute(select(Note.id).where(Note.owner_id == owner_id, Note.id.in_(list(note_ids))))
+        return set(result.scalars().all())
+
+    @staticmethod
+    async def update_many(db: AsyncSession, owner_id: int, rows: List[Dict]) -> List[int]:
+        """UPDATE par clé primaire (executemany) des notes du propriétaire, rows contiennent 'id'"""
+        owned = await NoteRepository.get_owned_ids(db, owner_id, (row["id"] for row in rows))
+        rows = [row for row in rows if row["id"] in owned]
+        if rows:
+            change_seq = await NoteRepository.next_change_seq(db, owner_id)
+            rows = [{**row, "change_seq": change_seq} for row in rows]
+            await db.execute(
+                update(Note).where(Note.owner_id == owner_id),
+                await note_cipher.encrypt_rows(db, owner_id, rows),
+                execution_options={"synchronize_session": None},
+            )
+            record_note_event(db, owner_id, SYNC, 0, change_seq)
+            if search_index.is_loaded(owner_id):
+                result = await db.execute(select(Note.id, Note.title, Note.content).where(Note.owner_id == owner_id, Note.id.in_(list(owned))))
+                for note_id, title, content in await note_cipher.decrypt_rows(db, owner_id, result.all()):
+                    search_index.add(owner_id, note_id, title, content)
+                search_index.advance(owner_id, change_seq)
+        return [row["id"] for row in rows]
+
+    @staticmethod
+    async def purge_batch(db: AsyncSession, owner_id: int, limit: int) -> int:
+        """Supprime au plus limit notes d'un compte en cours de suppression, dans sa propre transaction
+
+        Ni numéro de changement ni pierre tombale : le compte et son historique disparaissent.
+        """
+        batch = select(Note.id).where(Note.owner_id == owner_id).limit(limit).scalar_subquery()
+        result = await db.execute(
+            delete(Note).where(Note.owner_id == owner_id, Note.id.in_(batch)).execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount
+
+    @staticmethod
+    async def delete_many(db: AsyncSession, owner_id: int, note_ids: List[int]) -> List[int]:
+        """DELETE ... RETURNING id des notes du propriétaire parmi note_ids"""
+        if not note_ids:
+            return []
+        result = await db.execute(
+            delete(Note).where(Note.owner_id == owner_id, Note.id.in_(note_ids)).returning(Note.id)
+        )
+        ids = list(result.scalars().all())
+        if ids:
+            change_seq = await NoteRepository.next_change_seq(db, owner_id)
+            await db.execute(
+                insert(NoteTombstone),
+                [{"note_id": note_id, "owner_id": owner_id, "change_seq": change_seq} for note_id in ids],
+            )
+            record_note_event(db, owner_id, SYNC, 0, change_seq)
+        for note_id in ids:
+            search_index.remove(note_id)
+        if ids:
+            search_index.advance(owner_id, change_seq)
+        return ids
+
+
+class AttachmentRepository:
+
+    @staticmethod
+    async def create_owned(
+        db: AsyncSession,
+        note_id: int,
+        owner_id: int,
+        filename: str,
+        content_type: str,
+        size: int,
+        sha256: str
+    ) -> Optional[Attachment]:
+        """INSERT ... SELECT depuis la note du propriétaire : None si elle n'existe pas ou plus"""
+        owned_note = select(
+            Note.id,
+            Note.owner_id,
+            literal(filename, String),
+            literal(content_type, String),
+            literal(size, BigInteger),
+            literal(sha256, String),
+            literal(datetime.utcnow(), DateTime),
+        ).where(Note.id == note_id, Note.owner_id == owner_id)
+        result = await db.execute(
+            insert(Attachment)
+            .from_select(["note_id", "owner_id", "filename", "content_type", "size", "sha256", "created_at"], owned_note)
+            .returning(Attachment)
+        )
+        attachment = result.scalars().first()
+        await db.commit()
+        return attachment
+
+    @staticmethod
+    async def list_owned(db: AsyncSession, note_id: int, owner_id: int) -> List[Attachment]:
+        result = await db.execute(
+            select(Attachment)
+            .where(Attachment.note_id == note_id, Attachment.owner_id == owner_id)
+            .order_by(Attachment.id)
+        )
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def get_owned(db: AsyncSession, note_id: int, attachment_id: int, owner_id: int) -> Optional[Attachment]:
+        result = await db.execute(
+            select(Attachment).where(
+                Attachment.id == attachment_id, Attachment.note_id == note_id, Attachment.owner_id == owner_id,
+            )
+        )
+        return result.scalars().first()
+
+    @staticmethod
+    async def delete_owned(db: AsyncSession, note_id: int, attachment_id: int, owner_id: int) -> Optional[str]:
+        """DELETE ... RETURNING sha256 limité au propriétaire, None si rien n'a été supprimé"""
+        result = await db.execute(
+            delete(Attachment)
+            .where(Attachment.id == attachment_id, Attachment.note_id == note_id, Attachment.owner_id == owner_id)
+            .returning(Attachment.sha256)
+            .execution_options(synchronize_session=False)
+        )
+        sha256 = result.scalar_one_or_none()
+        await db.commit()
+        return sha256
+
+    @staticmethod
+    async def referenced_hashes(db: AsyncSession, keys: Iterable[str]) -> set:
+        """Contenus encore utilisés par au moins une pièce jointe parmi keys"""
+        result = await db.execute(select(Attachment.sha256).where(Attachment.sha256.in_(list(keys))).distinct())
+        return set(result.scalars().all())
@@ -0,0 +1,28 @@
+from typing import Mapping, Optional
+from fastapi import Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+from .config import JSON_ENCODER
+from .schemas import validate_orm
+
+try:
+    import orjson
+except ImportError:  # orjson est optionnel : repli sur le module json standard
+    orjson = None
+
+# Classe de réponse par défaut des routes (JSON_ENCODER=json pour revenir au module standard)
+DefaultJSONResponse = ORJSONResponse if JSON_ENCODER == "orjson" and orjson is not None else JSONResponse
+
+
+def orm_list_response(
+    adapter: TypeAdapter,
+    objects: list,
+    status_code: int = 200,
+    headers: Optional[Mapping[str, str]] = None
+) -> Response:
+    """Réponse JSON d'une liste d'objets ORM, encodée directement par pydantic-core
+
+    Evite la double conversion du response_model (objets -> dicts -> JSON) sur les longues listes.
+    """
+    body = adapter.dump_json(validate_orm(adapter, objects))
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
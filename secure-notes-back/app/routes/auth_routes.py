@@ -1,23 +1,23 @@
 from fastapi import APIRouter, Response, Request, HTTPException, Depends
 from fastapi.responses import JSONResponse
-from app.constants import get_db, SMTP_SERVER, SMTP_PORT, EMAIL_ADDRESS, EMAIL_PASSWORD, BASE_URL
+from app.admission import auth_admission, client_ip
+from app.cache import user_cache
+from app.config import SECRET_KEY
+from app.constants import get_db, BASE_URL
+from app.mailer import build_message, mail_queue
 from app.models import User
 from app.repositories import UserRepository
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-import os
+from app.passwords import HashingOverloaded, password_hasher, needs_rehash
+from app.tokens import token_verifier
 from dotenv import load_dotenv
 from pydantic import BaseModel
+import asyncio
 import uuid as uuid
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 
 load_dotenv()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 router = APIRouter(
     prefix="/auth",
     tags=["auth"],
@@ -39,14 +39,21 @@ def create_access_token(data: dict, expires_delta: datetime):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, os.getenv("SECRET_KEY"), algorithm="HS256")
+    encoded_jwt = token_verifier.encode(to_encode)
     return encoded_jwt
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    return await password_hasher.verify(plain_password, hashed_password)
+
+async def get_password_hash(password):
+    return await password_hasher.hash(password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+def overloaded_response(error: HashingOverloaded) -> JSONResponse:
+    return JSONResponse(
+        content={"detail": "Server is busy, try again later"},
+        status_code=503,
+        headers={"Retry-After": str(error.retry_after)},
+    )
 
 def verify_token(token: str):
     credentials_exception = HTTPException(
@@ -55,7 +62,8 @@ def verify_token(token: str):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, os.getenv("SECRET_KEY"), algorithms=["HS256"])
+        # Claims en cache jusqu'à l'expiration du jeton, jetons révoqués refusés
+        payload = token_verifier.decode(token)
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
@@ -64,27 +72,17 @@ def verify_token(token: str):
         raise credentials_exception
     
 async def send_email_verification(email: str, subject: str, body: str):
-
+    """Met l'email en file d'attente : l'envoi SMTP se fait en arrière-plan"""
     try:
-        msg = MIMEMultipart()
-        msg['From'] = EMAIL_ADDRESS
-        msg['To'] = email
-        msg['Subject'] = subject
-
-        msg.attach(MIMEText(body, 'plain'))
-
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-        server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-        server.sendmail(EMAIL_ADDRESS, email, msg.as_string())
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to send email: {str(e)}")
+        mail_queue.enqueue(build_message(to=email, subject=subject, body=body))
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Email queue is full, try again later")
 
 def generate_verification_token(email: str):
     expire = datetime.utcnow() + timedelta(hours=24)
     try:
         token = jwt.encode(
-            {"sub": email, "exp": expire},  os.getenv("SECRET_KEY"), algorithm="HS256"
+            {"sub": email, "exp": expire},  SECRET_KEY, algorithm="HS256"
             )
         return token
     except Exception as e:
@@ -93,7 +91,7 @@ def generate_verification_token(email: str):
 def verify_email_token(token: str):
     
     try:
-        payload = jwt.decode(token, os.getenv("SECRET_KEY"), algorithms=["HS256"])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
 
         if payload is None:
             raise HTTPException(status_code=400, detail="Invalid token")
@@ -109,39 +107,53 @@ def verify_email_token(token: str):
     
 
 @router.post("/login")
-async def login(credentials: LoginDetails, db = Depends(get_db)):
+async def login(credentials: LoginDetails, request: Request, db = Depends(get_db)):
+    # Refus (429) avant la requête SQL et le calcul bcrypt
+    await auth_admission.admit("login", client_ip(request), account=credentials.email)
     try:
         response = JSONResponse(
         content={"message": "Login successful"},
         status_code=200
     )
-        user = UserRepository.get_by_email(db, email=credentials.email)
-        if not user or not verify_password(credentials.password, user.hashed_password):
+        user = await UserRepository.get_by_email(db, email=credentials.email)
+        # Connexion rendue au pool pendant bcrypt : des logins en attente ne privent pas /notes
+        await db.close()
+        # Un compte en cours de suppression n'ouvre plus de session
+        if not user or user.deleting_at is not None or not await verify_password(credentials.password, user.hashed_password):
             return {"error": "Invalid credentials"}, 401
+        if needs_rehash(user.hashed_password):
+            # Le coût bcrypt a changé : on remplace le hash tant qu'on a le mot de passe en clair
+            user.hashed_password = await get_password_hash(credentials.password)
+            await UserRepository.update(db, user=user)
+            user_cache.invalidate(user.id)
         access_token_expires = timedelta(hours=24)
         access_token = create_access_token(
             data={"sub": str(user.id)}, expires_delta=access_token_expires
         )
         response.set_cookie(key="access_token", value=access_token, httponly=True, path="/", samesite="lax", secure=False, domain='localhost')
         return response
+    except HashingOverloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         return {"error": str(e)}, 500
 
 
 @router.post("/register")
-async def register(credentials: RegisterDetails, response: Response, db = Depends(get_db)):
+async def register(credentials: RegisterDetails, request: Request, response: Response, db = Depends(get_db)):
+    await auth_admission.admit("register", client_ip(request))
     try:
-        user = UserRepository.get_by_email(db, email=credentials.email)
+        user = await UserRepository.get_by_email(db, email=credentials.email)
         if user:
             return {"error": "Email already registered"}, 400
-        hashed_password = get_password_hash(credentials.password)
+        await db.close()
+        hashed_password = await get_password_hash(credentials.password)
         new_user = User(
             email=credentials.email,
             name=credentials.name,
             hashed_password=hashed_password
         )
 
-        UserRepository.create(db, user=new_user)
+        await UserRepository.create(db, user=new_user)
 
         email_verification_token = generate_verification_token(credentials.email)
 
@@ -151,11 +163,17 @@ async def register(credentials: RegisterDetails, response: Response, db = Depend
             body=f"Cliquez ici pour valider votre email {BASE_URL}/verify-email/{email_verification_token}"
         )
         return JSONResponse(content={"message": "User registered successfully"}, status_code=201)
+    except HashingOverloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         return {"error": str(e)}, 500
 
 @router.post("/logout")
-async def logout():
+async def logout(request: Request):
+    # Le jeton reste refusé jusqu'à son expiration, même s'il a été copié ailleurs
+    token = request.cookies.get("access_token")
+    if token:
+        await token_verifier.revoke(token)
     response = JSONResponse(
         content={"message": "Logged out successfully"},
         status_code=200
@@ -169,9 +187,9 @@ async def verify_email(token: str, db = Depends(get_db)):
         is_valid = verify_email_token(token)
         if not is_valid:
             raise HTTPException(status_code=400, detail='Invalid or expired token')
-        decoded_token = jwt.decode(token, os.getenv("SECRET_KEY"), algorithms=["HS256"])
+        decoded_token = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
         email = decoded_token.get("sub")
-        user = UserRepository.get_by_email(db, email=email)
+        user = await UserRepository.get_by_email(db, email=email)
         if not user:
             return {"error": "User not found"}, 404
         updated_user = User(
@@ -181,7 +199,8 @@ async def verify_email(token: str, db = Depends(get_db)):
             hashed_password=user.hashed_password,
             is_email_verified=True
             )
-        UserRepository.update(db, user=updated_user)
+        await UserRepository.update(db, user=updated_user)
+        user_cache.invalidate(user.id)
         return JSONResponse(content={"message": "Email verified successfully"}, status_code=200)
     except Exception as e:
         return {"error": str(e)}, 500
@@ -1,75 +1,313 @@
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from app.models import User, Note
-from app.repositories import UserRepository, NoteRepository
-from app.constants import get_db
-from app.constants import SKIP, LIMIT
-from pydantic import BaseModel
+from app.repositories import AttachmentRepository, NoteRepository
+from app.constants import get_db, get_read_db
+from app.attachments import UploadError, attachment_response, receive_upload, sweep_deleted_blobs
+from app.blobs import attachment_store
+from app.config import ATTACHMENT_MAX_SIZE, IMPORT_CHUNK_SIZE, SSE_HEARTBEAT, SSE_RETRY_MS
+from app.constants import LIMIT, MAX_LIMIT, MAX_SEARCH_OFFSET, BATCH_MAX_ITEMS, EXPORT_BATCH_SIZE
+from app.conditional import cache_headers, is_conditional, not_modified, note_etag, page_etag
+from app.events import event_stream, note_events
+from app.extensions import AsyncSessionLocal
+from app.export import accepts_encoding, export_notes_ndjson
+from app.importer import NoteImport, import_notes, iter_ndjson_lines
+from app.pagination import encode_cursor, decode_cursor, encode_change_cursor, decode_change_cursor
+from app.responses import DefaultJSONResponse, orm_list_response
+from app.schemas import (
+    AttachmentOut, NoteChange, NoteChanges, NoteOut, NoteSearchResult, NoteTombstoneOut, NoteUpdated,
+    note_list_adapter,
+)
+from app.search import search_index
+from pydantic import BaseModel, Field
+import hashlib
+import json
 from app.middleware import get_current_user_from_access_cookie
 
 
 router = APIRouter(
     prefix="/notes",
     tags=["notes"],
+    default_response_class=DefaultJSONResponse,
     dependencies=[Depends(get_current_user_from_access_cookie)]
 )
 
 class NoteCreate(BaseModel):
+    # Le propriétaire est toujours l'utilisateur authentifié
     title: str
     content: str
-    owner_id: int
 
+class NotePatch(BaseModel):
+    # Seuls les champs envoyés sont modifiés
+    title: Optional[str] = None
+    content: Optional[str] = None
+
+class NoteBatchUpdate(BaseModel):
+    id: int
+    title: Optional[str] = None
+    content: Optional[str] = None
+
+class NoteBatch(BaseModel):
+    create: List[NoteImport] = Field(default_factory=list, max_length=BATCH_MAX_ITEMS)
+    update: List[NoteBatchUpdate] = Field(default_factory=list, max_length=BATCH_MAX_ITEMS)
+    delete: List[int] = Field(default_factory=list, max_length=BATCH_MAX_ITEMS)
+
+
+@router.get("/search", response_model=List[NoteSearchResult])
+async def search_notes(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(LIMIT, ge=1, le=MAX_LIMIT),
+    offset: int = Query(0, ge=0, le=MAX_SEARCH_OFFSET),
+    current_user: User = Depends(get_current_user_from_access_cookie),
+    db = Depends(get_read_db)
+):
+    try:
+        results = await NoteRepository.search(db=db, owner_id=current_user.id, query=q, limit=limit, offset=offset)
+        return [NoteSearchResult.from_hit(note, rank) for note, rank in results]
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+@router.get("/export")
+async def export_notes(
+    request: Request,
+    gzip: Optional[bool] = None,
+    current_user: User = Depends(get_current_user_from_access_cookie),
+    db = Depends(get_read_db)
+):
+    try:
+        count, last_updated, last_id = await NoteRepository.get_collection_version(db=db, user_id=current_user.id)
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+    # Compression négociée par Accept-Encoding ; ?gzip=false la refuse
+    compress = gzip is not False and accepts_encoding(request.headers.get("accept-encoding", ""), "gzip")
+    # Validateur faible : change dès qu'une note est créée, modifiée ou supprimée
+    version = f"{current_user.id}:{count}:{last_updated.isoformat() if last_updated else ''}:{last_id}:{compress}"
+    etag = f'W/"{hashlib.sha256(version.encode()).hexdigest()[:32]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": 'attachment; filename="notes.ndjson"',
+        "Vary": "Accept-Encoding",
+    }
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    if count <= EXPORT_BATCH_SIZE:
+        # Un seul lot : l'export tient en mémoire, la réponse porte sa taille (Content-Length)
+        content = b"".join([chunk async for chunk in export_notes_ndjson(current_user.id, compress=compress)])
+        return Response(content=content, media_type="application/x-ndjson", headers=headers)
+
+    return StreamingResponse(
+        export_notes_ndjson(current_user.id, compress=compress),
+        media_type="application/x-ndjson",
+        headers=headers,
+    )
+
+@router.get("/changes", response_model=NoteChanges)
+async def note_changes(
+    since: Optional[str] = None,
+    limit: int = Query(MAX_LIMIT, ge=1, le=MAX_LIMIT),
+    current_user: User = Depends(get_current_user_from_access_cookie),
+    db = Depends(get_read_db)
+):
+    """Notes créées, modifiées ou supprimées depuis le jeton since (toutes les notes sans jeton)"""
+    try:
+        after = decode_change_cursor(since) if since else (0, 0)
+    except ValueError:
+        return JSONResponse(content={"message": "Invalid cursor"}, status_code=400)
+    try:
+        # Un changement de plus que demandé pour savoir s'il reste des changements à lire
+        changes = await NoteRepository.get_changes(db=db, owner_id=current_user.id, after=after, limit=limit + 1)
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    cursor = encode_change_cursor(*changes[-1][:2]) if changes else encode_change_cursor(*after)
+    return NoteChanges(
+        changes=[
+            NoteChange.model_validate(note) if note is not None else NoteTombstoneOut(id=note_id, change_seq=change_seq)
+            for change_seq, note_id, note in changes
+        ],
+        cursor=cursor,
+        has_more=has_more,
+    )
+
+@router.get("/stream")
+async def stream_note_changes(
+    request: Request,
+    current_user: User = Depends(get_current_user_from_access_cookie),
+    db = Depends(get_read_db)
+):
+    """Server-Sent Events des changements de notes de l'utilisateur, à la place du polling de /notes/changes
 
-@router.get("/{note_id}")  # ou "/note_id/{note_id}" si vous voulez garder ce format
+    Les événements sont des indications : l'id d'un événement est un jeton since, et un
+    événement sync demande de relire /notes/changes depuis le dernier jeton reçu.
+    """
+    # Connexion longue : elle ne garde aucune connexion du pool
+    await db.close()
+    return StreamingResponse(
+        event_stream(
+            note_events,
+            current_user.id,
+            heartbeat=SSE_HEARTBEAT,
+            retry_ms=SSE_RETRY_MS,
+            resume="last-event-id" in request.headers,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/{note_id}", response_model=NoteOut)  # ou "/note_id/{note_id}" si vous voulez garder ce format
 async def read_note(
     note_id: int, 
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user_from_access_cookie), 
-    db = Depends(get_db)
+    db = Depends(get_read_db)
 ):
     try:
-        note = NoteRepository.get_by_id(db=db, note_id=note_id)
+        # Le propriétaire fait partie de la requête : une note d'un autre utilisateur est introuvable
+        if is_conditional(request):
+            # Revalidation sans charger ni déchiffrer le contenu de la note
+            version = await NoteRepository.get_owned_version(db=db, note_id=note_id, owner_id=current_user.id)
+            if not version:
+                raise HTTPException(status_code=404, detail="Note not found")
+            etag = note_etag(*version)
+            if not_modified(request, etag, version[1]):
+                return Response(status_code=304, headers=cache_headers(etag, version[1]))
+
+        note = await NoteRepository.get_owned(db=db, note_id=note_id, owner_id=current_user.id)
         if not note:
             raise HTTPException(status_code=404, detail="Note not found")
         
-        # Vérifier que l'utilisateur a le droit d'accéder à cette note
-        if note.owner_id != current_user.id:
-            raise HTTPException(status_code=403, detail="Access denied")
-        
-        return note.to_dict()
+        response.headers.update(cache_headers(note_etag(note.id, note.updated_at), note.updated_at))
+        return note
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-@router.get("/user_id/{user_id}")
-async def read_notes_by_user(user_id: int, current_user: User = Depends(get_current_user_from_access_cookie), db = Depends(get_db)):
+@router.get("/user_id/{user_id}", response_model=List[NoteOut])
+async def read_notes_by_user(
+    user_id: int,
+    request: Request,
+    limit: int = Query(LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user_from_access_cookie),
+    db = Depends(get_read_db)
+):
     try:
-        user = UserRepository.get_by_id(db=db, user_id=user_id)
-        if not user:
-            return JSONResponse(content={"message": "User not found"}, status_code=404)
-        notes = NoteRepository.get_by_user_id(db=db, user_id=user_id, skip=SKIP, limit=LIMIT)
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return JSONResponse(content={"message": "Invalid cursor"}, status_code=400)
+    # Seules ses propres notes sont listées : pas de lecture de l'utilisateur ni de contrôle par note
+    if user_id != current_user.id:
+        return JSONResponse(content={"message": "Access denied"}, status_code=403)
+    try:
+        # Le validateur dépend de la page demandée et des versions des notes qui la composent
+        scope = f"{user_id}:{limit}:{cursor or ''}"
+        if is_conditional(request):
+            # Revalidation sur l'index (owner_id, updated_at, id), sans lire le contenu des notes
+            versions = await NoteRepository.get_page_versions(db=db, user_id=user_id, limit=limit + 1, after=after)
+            etag = page_etag(scope, versions)
+            if not_modified(request, etag):
+                return Response(status_code=304, headers=cache_headers(etag))
 
-        for note in notes :
-            if note.owner_id != current_user.id :
-                raise HTTPException(status_code=403, detail="Access denied")
+        # Une note de plus que demandé pour savoir s'il existe une page suivante
+        notes = await NoteRepository.list_owned(db=db, owner_id=user_id, limit=limit + 1, after=after)
+        headers = cache_headers(page_etag(scope, ((note.id, note.updated_at) for note in notes)))
+        if len(notes) > limit:
+            notes = notes[:limit]
+            next_cursor = encode_cursor(notes[-1].updated_at, notes[-1].id)
+            headers["X-Next-Cursor"] = next_cursor
+            headers["Link"] = f'</notes/user_id/{user_id}?limit={limit}&cursor={next_cursor}>; rel="next"'
 
-        return JSONResponse(content=[note.to_dict() for note in notes], status_code=200)
+        return orm_list_response(note_list_adapter, notes, headers=headers)
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
-@router.post("/")
+@router.post("/", response_model=NoteOut, status_code=201)
 async def create_note(note_data: NoteCreate, current_user: User = Depends(get_current_user_from_access_cookie), db = Depends(get_db)):
     try:
-        note = NoteRepository.create(db=db, note=Note(
+        note = await NoteRepository.create(db=db, note=Note(
             title=note_data.title,
             content=note_data.content,
-            owner_id=note_data.owner_id
+            owner_id=current_user.id
         ))
-        return JSONResponse(content=note.to_dict(), status_code=201)
+        return note
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
-@router.put("/{note_id}")
+@router.post("/batch")
+async def batch_notes(batch: NoteBatch, current_user: User = Depends(get_current_user_from_access_cookie), db = Depends(get_db)):
+    """Créations, modifications et suppressions des notes de l'utilisateur en une transaction"""
+    owner_id = current_user.id
+    updates = [item.model_dump(exclude_unset=True) for item in batch.update]
+    errors = [
+        {"op": "update", "index": index, "id": row["id"], "error": "Nothing to update"}
+        for index, row in enumerate(updates) if len(row) == 1
+    ]
+    try:
+        rows = [item.model_dump() for item in batch.create]
+        created = []
+        for start in range(0, len(rows), IMPORT_CHUNK_SIZE):
+            created += await NoteRepository.insert_many(db=db, owner_id=owner_id, rows=rows[start:start + IMPORT_CHUNK_SIZE])
+        updated = await NoteRepository.update_many(db=db, owner_id=owner_id, rows=[row for row in updates if len(row) > 1])
+        deleted = await NoteRepository.delete_many(db=db, owner_id=owner_id, note_ids=batch.delete)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        search_index.unload(owner_id)
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+    updated_ids, deleted_ids = set(updated), set(deleted)
+    errors += [
+        {"op": "update", "index": index, "id": row["id"], "error": "Note not found"}
+        for index, row in enumerate(updates) if len(row) > 1 and row["id"] not in updated_ids
+    ]
+    errors += [
+        {"op": "delete", "index": index, "id": note_id, "error": "Note not found"}
+        for index, note_id in enumerate(batch.delete) if note_id not in deleted_ids
+    ]
+    return JSONResponse(
+        content={"created": created, "updated": updated, "deleted": deleted, "errors": errors},
+        status_code=200
+    )
+
+@router.post("/import")
+async def import_notes_route(request: Request, current_user: User = Depends(get_current_user_from_access_cookie), db = Depends(get_db)):
+    """Import de notes depuis un tableau JSON ou un flux NDJSON (application/x-ndjson)"""
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        items = iter_ndjson_lines(request)
+    else:
+        try:
+            payload = json.loads(await request.body())
+        except ValueError:
+            return JSONResponse(content={"message": "Invalid JSON body"}, status_code=400)
+        if not isinstance(payload, list):
+            return JSONResponse(content={"message": "Expected a JSON array of notes"}, status_code=400)
+
+        async def iter_payload():
+            for item in payload:
+                yield item
+        items = iter_payload()
+
+    try:
+        report = await import_notes(db, owner_id=current_user.id, items=items)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        search_index.unload(current_user.id)
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+    return JSONResponse(content=report, status_code=201 if report["created"] else 200)
+
+@router.put("/{note_id}", response_model=NoteUpdated)
 async def update_note(
     note_id: int,
     note_data: NoteCreate,
@@ -77,36 +315,136 @@ async def update_note(
     db = Depends(get_db)
     ):
     try:
-        note = NoteRepository.get_by_id(db=db, note_id=note_id)
-        if not note:
-            return JSONResponse(content={"message": "Note not found"}, status_code=404)
-        
-        if note.owner_id != current_user.id:
-            raise HTTPException(status_code=403, detail="Access denied")
-        
-        update_note = Note(
-            id= note_id,
-            title=note_data.title,
-            content=note_data.content,
-            owner_id=note_data.owner_id 
+        # Remplacement du titre et du contenu en une instruction, limitée aux notes de l'utilisateur
+        updated_note = await NoteRepository.patch(
+            db=db, note_id=note_id, owner_id=current_user.id,
+            values={"title": note_data.title, "content": note_data.content},
         )
+        if not updated_note:
+            return JSONResponse(content={"message": "Note not found"}, status_code=404)
+        return {"message": f"Note {note_id} updated", "note": updated_note}
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
 
-        updated_note= NoteRepository.update(db=db, note=update_note)
-        return JSONResponse(content={"message": f"Note {note_id} updated", "note" : updated_note.to_dict()}, status_code=200)
+@router.patch("/{note_id}", response_model=NoteOut)
+async def patch_note(
+    note_id: int,
+    note_data: NotePatch,
+    response: Response,
+    current_user: User = Depends(get_current_user_from_access_cookie),
+    db = Depends(get_db)
+):
+    """Modification partielle (sauvegarde automatique) en une instruction UPDATE ... RETURNING"""
+    values = note_data.model_dump(exclude_unset=True)
+    if not values:
+        return JSONResponse(content={"message": "Nothing to update"}, status_code=400)
+    if "content" in values and values["content"] is None:
+        return JSONResponse(content={"message": "content cannot be null"}, status_code=422)
+    try:
+        note = await NoteRepository.patch(db=db, note_id=note_id, owner_id=current_user.id, values=values)
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
+    if note is None:
+        # Note absente ou d'un autre utilisateur : indiscernables sans lecture préalable
+        return JSONResponse(content={"message": "Note not found"}, status_code=404)
+
+    response.headers.update(cache_headers(note_etag(note.id, note.updated_at), note.updated_at))
+    return note
 
 @router.delete("/{note_id}")
 async def delete_note(note_id: int, current_user: User = Depends(get_current_user_from_access_cookie), db = Depends(get_db)):
     try:
-        note = NoteRepository.get_by_id(db=db, note_id=note_id)
-        if not note:
+        if not await NoteRepository.delete_owned(db=db, note_id=note_id, owner_id=current_user.id):
             return JSONResponse(content={"message": "Note not found"}, status_code=404)
-        
-        if note.owner_id != current_user.id:
-            raise HTTPException(status_code=403, detail="Access denied")
-        
-        NoteRepository.delete(db=db, note=note)
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
-    return JSONResponse(content={"message": f"Note {note_id} deleted"}, status_code=200)
\ No newline at end of file
+    return JSONResponse(content={"message": f"Note {note_id} deleted"}, status_code=200)
+
+@router.post("/{note_id}/attachments", response_model=AttachmentOut, status_code=201)
+async def upload_attachment(
+    note_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_user_from_access_cookie),
+    db = Depends(get_db)
+):
+    """Pièce jointe envoyée en multipart/form-data (premier champ fichier), écrite au fil de l'eau"""
+    try:
+        # Contrôle d'accès avant de lire le corps : pas d'envoi de plusieurs Go pour rien
+        if not await NoteRepository.get_owned_version(db=db, note_id=note_id, owner_id=current_user.id):
+            return JSONResponse(content={"message": "Note not found"}, status_code=404)
+        # L'envoi peut durer : la connexion retourne au pool pendant ce temps
+        await db.close()
+        upload = await receive_upload(request, attachment_store, ATTACHMENT_MAX_SIZE)
+        attachment = await AttachmentRepository.create_owned(
+            db=db, note_id=note_id, owner_id=current_user.id, filename=upload.filename,
+            content_type=upload.content_type, size=upload.size, sha256=upload.key,
+        )
+    except UploadError as e:
+        return JSONResponse(content={"message": e.message}, status_code=e.status_code)
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+    if attachment is None:
+        # Note supprimée pendant l'envoi : le contenu sera balayé s'il ne sert à rien d'autre
+        return JSONResponse(content={"message": "Note not found"}, status_code=404)
+    # La réponse ne dit pas si le contenu existait déjà (il pourrait venir d'un autre compte)
+    return attachment
+
+@router.get("/{note_id}/attachments", response_model=List[AttachmentOut])
+async def list_attachments(
+    note_id: int,
+    current_user: User = Depends(get_current_user_from_access_cookie),
+    db = Depends(get_read_db)
+):
+    try:
+        return await AttachmentRepository.list_owned(db=db, note_id=note_id, owner_id=current_user.id)
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+@router.get("/{note_id}/attachments/{attachment_id}")
+async def download_attachment(
+    note_id: int,
+    attachment_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_user_from_access_cookie),
+    db = Depends(get_read_db)
+):
+    try:
+        # Même contrôle que read_note : le propriétaire fait partie de la requête
+        attachment = await AttachmentRepository.get_owned(
+            db=db, note_id=note_id, attachment_id=attachment_id, owner_id=current_user.id,
+        )
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+    if attachment is None:
+        return JSONResponse(content={"message": "Attachment not found"}, status_code=404)
+    # Le téléchargement ne garde pas de connexion à la base
+    await db.close()
+    response = attachment_response(attachment, attachment_store)
+    if not_modified(request, response.headers["etag"]):
+        return Response(status_code=304, headers={
+            name: response.headers[name] for name in ("etag", "cache-control") if name in response.headers
+        })
+    return response
+
+@router.delete("/{note_id}/attachments/{attachment_id}")
+async def delete_attachment(
+    note_id: int,
+    attachment_id: int,
+    current_user: User = Depends(get_current_user_from_access_cookie),
+    db = Depends(get_db)
+):
+    try:
+        sha256 = await AttachmentRepository.delete_owned(
+            db=db, note_id=note_id, attachment_id=attachment_id, owner_id=current_user.id,
+        )
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+    if sha256 is None:
+        return JSONResponse(content={"message": "Attachment not found"}, status_code=404)
+    # Le contenu est supprimé après la réponse s'il n'est plus référencé
+    return JSONResponse(
+        content={"message": f"Attachment {attachment_id} deleted"},
+        status_code=200,
+        background=BackgroundTask(sweep_deleted_blobs, [sha256], attachment_store, AsyncSessionLocal),
+    )
+
@@ -1,14 +1,22 @@
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import JSONResponse
+from app.cache import user_cache
+from app.config import ACCOUNT_PURGE_THRESHOLD
 from app.constants import get_db
+from app.crypto import note_cipher
 from app.models import User
+from app.purge import account_purger
 from app.repositories import UserRepository
+from app.responses import DefaultJSONResponse
+from app.schemas import AuthenticatedUser, UserUpdated
+from app.search import search_index
 from pydantic import BaseModel
-from app.middleware import get_current_user_from_access_cookie
+from app.middleware import get_current_user_from_access_cookie, get_current_user_even_if_deleting
 
 router = APIRouter(
     prefix="/users",
-    tags=["users"]
+    tags=["users"],
+    default_response_class=DefaultJSONResponse
 )
 
 class UserCreate(BaseModel):
@@ -16,18 +24,14 @@ class UserCreate(BaseModel):
     name: str
     hashed_password: str
 
-@router.get("/me")
+@router.get("/me", response_model=AuthenticatedUser)
 async def get_authenticated(current_user=Depends(get_current_user_from_access_cookie)):
     if not current_user:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    user_data = current_user.to_dict() if hasattr(current_user, "to_dict") else current_user
-    return JSONResponse(
-        content={"isAuthenticated": True, "user": user_data},
-        status_code=200
-    )
+    return {"isAuthenticated": True, "user": current_user}
 
-@router.put("/{user_id}")
+@router.put("/{user_id}", response_model=UserUpdated)
 async def update_user(
     user_id: int,
     user_data: UserCreate,
@@ -44,30 +48,71 @@ async def update_user(
             name=user_data.name,
             hashed_password=user_data.hashed_password
         )
-        updated_user = UserRepository.update(db=db, user=new_user)
-        user_data = updated_user.to_dict() if hasattr(updated_user, "to_dict") else updated_user
-        return JSONResponse(
-            content={"message": f"User {user_id} updated", "user": user_data},
-            status_code=200
-        )
+        updated_user = await UserRepository.update(db=db, user=new_user)
+        user_cache.invalidate(user_id)
+        return {"message": f"User {user_id} updated", "user": updated_user}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/{user_id}")
 async def delete_user(
     user_id: int,
-    current_user=Depends(get_current_user_from_access_cookie),
+    current_user=Depends(get_current_user_even_if_deleting),
     db=Depends(get_db)
 ):
     if not current_user:
         raise HTTPException(status_code=401, detail="Not authenticated")
+    if current_user.id != user_id:
+        return JSONResponse(content={"message": "Forbidden"}, status_code=403)
 
     try:
-        user = UserRepository.get_by_id(db=db, user_id=user_id)
+        user = await UserRepository.get_by_id(db=db, user_id=user_id)
         if not user:
             return JSONResponse(content={"message": "User not found"}, status_code=404)
 
-        UserRepository.delete(db=db, user=user)
-        return JSONResponse(content={"message": f"User {user_id} deleted"}, status_code=200)
+        if user.deleting_at is None:
+            notes = await UserRepository.count_notes(db, user_id, limit=ACCOUNT_PURGE_THRESHOLD + 1)
+            if notes <= ACCOUNT_PURGE_THRESHOLD:
+                # Une seule instruction DELETE : les notes suivent par ON DELETE CASCADE
+                await UserRepository.delete(db=db, user=user)
+                user_cache.invalidate(user_id)
+                note_cipher.forget(user_id)
+                search_index.unload(user_id)
+                return JSONResponse(content={"message": f"User {user_id} deleted"}, status_code=200)
+            # Gros compte : marqué tout de suite, notes purgées par lots en arrière-plan
+            await UserRepository.mark_deleting(db, user_id)
+            user_cache.invalidate(user_id)
+
+        account_purger.start(user_id)
+        return JSONResponse(
+            content={"message": f"User {user_id} deletion in progress", "status": "deleting"},
+            status_code=202,
+            headers={"Location": f"/users/{user_id}/deletion"},
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{user_id}/deletion")
+async def deletion_status(
+    user_id: int,
+    current_user=Depends(get_current_user_even_if_deleting),
+    db=Depends(get_db)
+):
+    if current_user.id != user_id:
+        return JSONResponse(content={"message": "Forbidden"}, status_code=403)
+
+    try:
+        user = await UserRepository.get_by_id(db=db, user_id=user_id)
+        if not user:
+            return JSONResponse(content={"status": "deleted"}, status_code=404)
+        if user.deleting_at is None:
+            return JSONResponse(content={"status": "active"}, status_code=200)
+        return JSONResponse(content={
+            "status": "deleting",
+            "requested_at": user.deleting_at.isoformat(),
+            "notes_remaining": await UserRepository.count_notes(db, user_id),
+            # Connu seulement du worker qui exécute la purge
+            "notes_deleted": account_purger.progress.get(user_id),
+        }, status_code=200)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
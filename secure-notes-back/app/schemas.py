@@ -0,0 +1,94 @@
+from datetime import datetime
+from typing import List, Literal, Optional, Union
+from pydantic import BaseModel, ConfigDict, TypeAdapter, ValidationError
+
+
+class ORMModel(BaseModel):
+    """Schéma de réponse lu directement sur les attributs d'un objet SQLAlchemy"""
+    model_config = ConfigDict(from_attributes=True)
+
+
+class NoteOut(ORMModel):
+    id: int
+    title: Optional[str] = None
+    content: str
+    owner_id: int
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class NoteSearchResult(NoteOut):
+    rank: float
+
+    @classmethod
+    def from_hit(cls, note, rank: float) -> "NoteSearchResult":
+        return cls(**{name: getattr(note, name) for name in NoteOut.model_fields}, rank=rank)
+
+
+class NoteChange(NoteOut):
+    change_seq: int
+    deleted: Literal[False] = False
+
+
+class NoteTombstoneOut(BaseModel):
+    id: int
+    change_seq: int
+    deleted: Literal[True] = True
+
+
+class NoteChanges(BaseModel):
+    # Changements dans l'ordre où ils ont été écrits, à appliquer dans cet ordre
+    changes: List[Union[NoteChange, NoteTombstoneOut]]
+    cursor: str
+    has_more: bool
+
+
+class NoteUpdated(BaseModel):
+    message: str
+    note: NoteOut
+
+
+class AttachmentOut(ORMModel):
+    id: int
+    note_id: int
+    filename: str
+    content_type: str
+    size: int
+    sha256: str
+    created_at: Optional[datetime] = None
+
+
+class UserOut(ORMModel):
+    # hashed_password n'est volontairement jamais exposé
+    id: int
+    email: str
+    name: str
+    is_email_verified: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class AuthenticatedUser(BaseModel):
+    isAuthenticated: bool
+    user: UserOut
+
+
+class UserUpdated(BaseModel):
+    message: str
+    user: UserOut
+
+
+note_list_adapter = TypeAdapter(List[NoteOut])
+
+
+def validate_orm(adapter: TypeAdapter, objects: list) -> list:
+    """Valide une liste d'instances ORM chargées à partir de leur __dict__
+
+    Bien plus rapide que from_attributes, qui passe par les descripteurs SQLAlchemy
+    pour chaque champ de chaque objet.
+    """
+    try:
+        return adapter.validate_python([vars(obj) for obj in objects])
+    except ValidationError:
+        # Attribut expiré ou différé absent de __dict__ : lecture par les descripteurs
+        return adapter.validate_python(objects, from_attributes=True)
@@ -0,0 +1,149 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import heapq
+import math
+import re
+import unicodedata
+
+WORD_RE = re.compile(r"\w+")
+
+# Paramètres BM25
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """Mots en minuscules et sans accents, proche de la configuration 'simple' de Postgres"""
+    if not text:
+        return []
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(char for char in normalized if not unicodedata.combining(char))
+    return WORD_RE.findall(stripped)
+
+
+class _OwnerIndex:
+    """Listes de postings d'un propriétaire : terme -> {note_id: fréquence}"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.terms: Dict[int, List[str]] = {}
+        self.lengths: Dict[int, int] = {}
+        self.total_length = 0
+
+    def add(self, note_id: int, title: str, content: str) -> None:
+        self.remove(note_id)
+        tokens = tokenize(title) + tokenize(content)
+        counts = Counter(tokens)
+        for term, frequency in counts.items():
+            self.postings.setdefault(term, {})[note_id] = frequency
+        self.terms[note_id] = list(counts)
+        self.lengths[note_id] = len(tokens)
+        self.total_length += len(tokens)
+
+    def remove(self, note_id: int) -> None:
+        for term in self.terms.pop(note_id, ()):
+            posting = self.postings[term]
+            del posting[note_id]
+            if not posting:
+                del self.postings[term]
+        self.total_length -= self.lengths.pop(note_id, 0)
+
+    def search(self, query: str, limit: int, offset: int) -> List[Tuple[int, float]]:
+        terms: Set[str] = set(tokenize(query))
+        if not terms or any(term not in self.postings for term in terms):
+            return []
+
+        # Toutes les notes doivent contenir tous les termes (comme plainto_tsquery)
+        postings = sorted((self.postings[term] for term in terms), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+
+        documents = len(self.lengths)
+        average_length = self.total_length / documents if documents else 0.0
+        weights = [
+            (posting, math.log(1 + (documents - len(posting) + 0.5) / (len(posting) + 0.5)))
+            for posting in postings
+        ]
+
+        def score(note_id: int) -> float:
+            norm = K1 * (1 - B + B * self.lengths[note_id] / average_length) if average_length else K1
+            return sum(idf * posting[note_id] * (K1 + 1) / (posting[note_id] + norm) for posting, idf in weights)
+
+        ranked = heapq.nlargest(offset + limit, ((score(note_id), note_id) for note_id in candidates))
+        return [(note_id, rank) for rank, note_id in ranked[offset:]]
+
+
+class InvertedIndex:
+    """Index de recherche en mémoire utilisé hors Postgres (SQLite, tests)
+
+    Les propriétaires sont chargés paresseusement à leur première recherche, puis tenus
+    à jour par NoteRepository.create/update/delete. L'index est propre au processus : chaque
+    propriétaire est chargé à un users.change_seq, et une recherche qui lit un autre numéro
+    (écriture d'un autre worker) le recharge.
+    """
+
+    def __init__(self):
+        self._owners: Dict[int, _OwnerIndex] = {}
+        self._note_owner: Dict[int, int] = {}
+        self._versions: Dict[int, int] = {}
+
+    def is_loaded(self, owner_id: int) -> bool:
+        return owner_id in self._owners
+
+    def version(self, owner_id: int) -> Optional[int]:
+        """change_seq auquel correspond l'index du propriétaire, None s'il n'est pas chargé"""
+        return self._versions.get(owner_id)
+
+    def load(self, owner_id: int, documents: Iterable[Tuple[int, str, str]], version: int = 0) -> None:
+        self.unload(owner_id)
+        index = _OwnerIndex()
+        for note_id, title, content in documents:
+            index.add(note_id, title, content)
+            self._note_owner[note_id] = owner_id
+        self._owners[owner_id] = index
+        self._versions[owner_id] = version
+
+    def advance(self, owner_id: int, change_seq: int) -> None:
+        """Avance la version après une écriture de ce processus déjà appliquée à l'index
+
+        Seulement si l'écriture suit directement la version chargée : un numéro sauté est
+        une écriture d'un autre worker, que seul un rechargement rattrape.
+        """
+        if self._versions.get(owner_id) == change_seq - 1:
+            self._versions[owner_id] = change_seq
+
+    def add(self, owner_id: int, note_id: int, title: str, content: str) -> None:
+        # Une note peut changer de propriétaire lors d'une mise à jour
+        previous_owner = self._note_owner.get(note_id)
+        if previous_owner is not None and previous_owner != owner_id:
+            self.remove(note_id)
+        index = self._owners.get(owner_id)
+        if index is not None:
+            index.add(note_id, title, content)
+            self._note_owner[note_id] = owner_id
+
+    def remove(self, note_id: int) -> None:
+        owner_id = self._note_owner.pop(note_id, None)
+        if owner_id in self._owners:
+            self._owners[owner_id].remove(note_id)
+
+    def search(self, owner_id: int, query: str, limit: int, offset: int = 0) -> List[Tuple[int, float]]:
+        index = self._owners.get(owner_id)
+        return index.search(query, limit, offset) if index else []
+
+    def unload(self, owner_id: int) -> None:
+        """Oublie un propriétaire (rechargé à sa prochaine recherche), par ex. après un rollback"""
+        index = self._owners.pop(owner_id, None)
+        self._versions.pop(owner_id, None)
+        if index is not None:
+            for note_id in index.lengths:
+                self._note_owner.pop(note_id, None)
+
+    def clear(self) -> None:
+        self._owners.clear()
+        self._note_owner.clear()
+        self._versions.clear()
+
+
+search_index = InvertedIndex()
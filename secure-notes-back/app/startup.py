@@ -0,0 +1,30 @@
+from typing import Iterator
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+import asyncio
+import logging
+import random
+
+logger = logging.getLogger(__name__)
+
+
+def backoff_delays(base: float = 0.5, cap: float = 10.0) -> Iterator[float]:
+    """Délais exponentiels avec gigue complète : les workers ne réessaient pas tous ensemble"""
+    attempt = 0
+    while True:
+        yield random.uniform(0, min(cap, base * 2 ** attempt))
+        attempt += 1
+
+
+async def wait_for_database(engine: AsyncEngine, state, probe_timeout: float = 5) -> None:
+    """Sonde la base en arrière-plan jusqu'à sa disponibilité puis marque state.ready"""
+    for attempt, delay in enumerate(backoff_delays(), start=1):
+        try:
+            async with engine.connect() as conn:
+                await asyncio.wait_for(conn.execute(text("SELECT 1")), probe_timeout)
+            state.ready = True
+            logger.info("Database reachable after %d attempt(s)", attempt)
+            return
+        except Exception as e:
+            logger.warning("Database not ready (attempt %d): %s, retry in %.1fs", attempt, e, delay)
+            await asyncio.sleep(delay)
@@ -0,0 +1,214 @@
+from typing import Dict, List, Optional, Tuple
+from jose import JWTError, jwt
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from .cache import TTLCache
+from .config import (
+    SECRET_KEY, TOKEN_CACHE_SIZE, TOKEN_REVOCATION_CAPACITY, TOKEN_REVOCATION_ERROR_RATE, TOKEN_REVOCATION_REFRESH,
+)
+from .extensions import AsyncSessionLocal
+from .instrumentation import timed
+from .models import RevokedToken
+import hashlib
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+ALGORITHM = "HS256"
+
+
+class TokenRevoked(JWTError):
+    pass
+
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+class BloomFilter:
+    """Filtre de Bloom sur des empreintes SHA-256 : pas de faux négatifs, faux positifs bornés"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest: bytes):
+        # Double hachage : k positions tirées des deux moitiés de l'empreinte
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:16], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, digest: bytes) -> None:
+        for position in self._positions(digest):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(digest))
+
+
+class DatabaseRevocations:
+    """Révocations partagées par tous les workers, dans la table revoked_tokens
+
+    Une révocation y reste jusqu'à l'expiration du jeton, redémarrages compris. Les workers
+    relisent les révocations enregistrées depuis leur dernière lecture, moins overlap
+    secondes : une révocation validée en retard, ou horodatée par une horloge en retard,
+    n'est pas manquée.
+    """
+
+    DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+    def __init__(self, session_factory: async_sessionmaker, overlap: float = 5.0, prune_every: int = 1000):
+        self.session_factory = session_factory
+        self.overlap = overlap
+        self.prune_every = prune_every
+        self._calls = 0
+
+    async def add(self, digest: bytes, expires_at: float, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        table = RevokedToken.__table__
+        async with self.session_factory() as db:
+            await db.execute(
+                self.DIALECTS[db.bind.dialect.name](table)
+                .values(digest=digest.hex(), expires_at=expires_at, revoked_at=now)
+                .on_conflict_do_nothing(index_elements=[table.c.digest])
+            )
+            self._calls += 1
+            if self._calls % self.prune_every == 0:
+                await db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+            await db.commit()
+
+    async def since(self, revoked_after: Optional[float], now: Optional[float] = None) -> List[Tuple[bytes, float, float]]:
+        """(empreinte, exp, révoqué à) des jetons non expirés révoqués après revoked_after (tous si None)"""
+        now = time.time() if now is None else now
+        query = select(RevokedToken.digest, RevokedToken.expires_at, RevokedToken.revoked_at).where(RevokedToken.expires_at > now)
+        if revoked_after is not None:
+            query = query.where(RevokedToken.revoked_at > revoked_after - self.overlap)
+        async with self.session_factory() as db:
+            rows = (await db.execute(query)).all()
+        return [(bytes.fromhex(digest), expires_at, revoked_at) for digest, expires_at, revoked_at in rows]
+
+
+class TokenVerifier:
+    """Vérification des jetons d'accès avec cache des claims et liste de révocation
+
+    Les claims d'un jeton valide sont gardés, indexés par son empreinte, jusqu'à son `exp` :
+    les requêtes suivantes évitent le décodage et la vérification HMAC. Un jeton révoqué
+    (logout) est écarté en O(1) : le filtre de Bloom répond non pour presque tous les jetons,
+    l'ensemble exact confirme les positifs et est purgé des jetons expirés.
+
+    Avec un store, les révocations sont partagées : revoke() les y enregistre et refresh()
+    recopie au plus toutes les refresh_interval secondes celles des autres workers dans le
+    filtre et l'ensemble locaux. Sans store, elles restent propres au processus.
+    """
+
+    def __init__(
+        self,
+        secret_key: Optional[str],
+        cache_size: int = 4096,
+        revocation_capacity: int = 100_000,
+        revocation_error_rate: float = 0.001,
+        store: Optional[DatabaseRevocations] = None,
+        refresh_interval: float = 1.0,
+    ):
+        self.secret_key = secret_key
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self._next_refresh = 0.0
+        self._last_revoked_at: Optional[float] = None
+        self.revocation_capacity = revocation_capacity
+        self.revocation_error_rate = revocation_error_rate
+        self._claims = TTLCache(max_size=cache_size, ttl=0)
+        self._revoked: Dict[bytes, float] = {}
+        self._bloom = BloomFilter(revocation_capacity, revocation_error_rate)
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, claims: Dict) -> str:
+        return jwt.encode(claims, self.secret_key, algorithm=ALGORITHM)
+
+    def is_revoked(self, digest: bytes) -> bool:
+        return digest in self._bloom and digest in self._revoked
+
+    def decode(self, token: str) -> Dict:
+        """Claims du jeton, JWTError s'il est invalide, expiré ou révoqué"""
+        with timed("jwt"):
+            return self._decode(token)
+
+    def _decode(self, token: str) -> Dict:
+        digest = token_digest(token)
+        if self.is_revoked(digest):
+            raise TokenRevoked("Token has been revoked")
+        claims = self._claims.get(digest)
+        if claims is not None:
+            self.hits += 1
+            return claims
+
+        self.misses += 1
+        claims = jwt.decode(token, self.secret_key, algorithms=[ALGORITHM])
+        exp = claims.get("exp")
+        if exp is not None:
+            # Le cache n'allonge jamais la durée de validité du jeton
+            self._claims.set(digest, claims, ttl=exp - time.time())
+        return claims
+
+    async def revoke(self, token: str) -> None:
+        """Révoque le jeton jusqu'à son expiration (sans effet s'il est déjà invalide)"""
+        try:
+            claims = jwt.decode(token, self.secret_key, algorithms=[ALGORITHM])
+        except JWTError:
+            return
+        digest = token_digest(token)
+        expires_at = claims.get("exp", math.inf)
+        self._remember(digest, expires_at)
+        if self.store is not None:
+            await self.store.add(digest, expires_at)
+
+    async def refresh(self) -> None:
+        """Recopie les révocations du store, au plus une fois par refresh_interval"""
+        now = time.monotonic()
+        if self.store is None or now < self._next_refresh:
+            return
+        # Les requêtes concurrentes ne relancent pas la lecture en cours
+        self._next_refresh = now + self.refresh_interval
+        try:
+            revocations = await self.store.since(self._last_revoked_at)
+        except Exception as e:
+            logger.warning("Token revocations not refreshed: %s", e)
+            return
+        for digest, expires_at, revoked_at in revocations:
+            self._remember(digest, expires_at)
+            self._last_revoked_at = max(revoked_at, self._last_revoked_at or revoked_at)
+
+    def _remember(self, digest: bytes, expires_at: float) -> None:
+        self._claims.invalidate(digest)
+        self._revoked[digest] = expires_at
+        self._bloom.add(digest)
+        if len(self._revoked) > self.revocation_capacity:
+            self._prune()
+
+    def _prune(self) -> None:
+        # Un filtre de Bloom ne supprime pas : il est reconstruit sans les jetons expirés
+        now = time.time()
+        self._revoked = {digest: exp for digest, exp in self._revoked.items() if exp > now}
+        self.revocation_capacity = max(self.revocation_capacity, 2 * len(self._revoked))
+        self._bloom = BloomFilter(self.revocation_capacity, self.revocation_error_rate)
+        for digest in self._revoked:
+            self._bloom.add(digest)
+
+    def stats(self) -> Dict:
+        return {"cached": len(self._claims), "revoked": len(self._revoked), "hits": self.hits, "misses": self.misses}
+
+
+token_verifier = TokenVerifier(
+    SECRET_KEY,
+    cache_size=TOKEN_CACHE_SIZE,
+    revocation_capacity=TOKEN_REVOCATION_CAPACITY,
+    revocation_error_rate=TOKEN_REVOCATION_ERROR_RATE,
+    store=DatabaseRevocations(AsyncSessionLocal),
+    refresh_interval=TOKEN_REVOCATION_REFRESH,
+)
@@ -0,0 +1,182 @@
+"""Benchmark : débit et mémoire des pièces jointes (envoi multipart, téléchargement, plages).
+
+Le serveur (run.py, SERVER_MODE=prod) reçoit un fichier de --size-mb Mo en multipart, généré
+au fil de l'eau côté client, puis le même fichier une seconde fois (contenu dédupliqué). Le
+fichier est ensuite téléchargé en entier et par plages de 1 Mo. Le pic de mémoire résidente
+(VmHWM) des processus du serveur est relevé à la fin : il ne doit pas dépendre de la taille
+du fichier.
+
+Usage (depuis secure-notes-back/) :
+    python -m benchmarks.bench_attachments --size-mb 1024
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = tempfile.mkdtemp(prefix="secure-notes-bench-")
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{BENCH_DIR}/bench.db")
+os.environ.setdefault("SMTP_PORT", "587")
+
+import httpx
+
+from app.extensions import Base, SessionLocal, engine
+from app.models import Note, User
+
+BOUNDARY = "bench-attachment-boundary"
+PIECE = 256 * 1024
+MIB = 1024 * 1024
+
+
+def seed() -> int:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.add(User(id=1, email="test@example.com", name="Bench", hashed_password="x"))
+        db.flush()
+        note = Note(title="Note", content="pièces jointes", owner_id=1)
+        db.add(note)
+        db.commit()
+        return note.id
+
+
+def start_server(port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "SERVER_MODE": "prod",
+        "PORT": str(port),
+        "HOST": "127.0.0.1",
+        "WEB_CONCURRENCY": "1",
+        "TESTING": "1",
+        "RUN_MIGRATIONS": "false",
+        "REQUEST_LOG": "false",
+        "ATTACHMENT_DIR": os.path.join(BENCH_DIR, "attachments"),
+    }
+    return subprocess.Popen(
+        [sys.executable, "run.py"], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(url: str, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/livez", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not become ready")
+
+
+def process_tree(pid: int) -> list:
+    pids = [pid]
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as children:
+            for child in children.read().split():
+                pids += process_tree(int(child))
+    return pids
+
+
+def peak_rss_mib(pid: int) -> float:
+    """Plus grand VmHWM (pic de mémoire résidente) parmi le serveur et ses workers"""
+    peak = 0
+    for process in process_tree(pid):
+        with open(f"/proc/{process}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    peak = max(peak, int(line.split()[1]))
+    return peak / 1024
+
+
+def multipart_body(size: int, seed: int):
+    """Corps multipart d'un fichier pseudo-aléatoire de size octets, produit morceau par morceau"""
+    head = (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="big.bin"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{BOUNDARY}--\r\n".encode()
+    piece = random.Random(seed).randbytes(PIECE)
+
+    def body():
+        yield head
+        for low in range(0, size, PIECE):
+            yield piece[:min(PIECE, size - low)]
+        yield tail
+
+    return body(), len(head) + size + len(tail)
+
+
+def upload(client: httpx.Client, note_id: int, size: int) -> tuple:
+    body, length = multipart_body(size, seed=1)
+    start = time.perf_counter()
+    response = client.post(
+        f"/notes/{note_id}/attachments",
+        content=body,
+        headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}", "Content-Length": str(length)},
+    )
+    response.raise_for_status()
+    return response.json(), time.perf_counter() - start
+
+
+def download(client: httpx.Client, url: str, headers: dict = None) -> tuple:
+    received = 0
+    start = time.perf_counter()
+    with client.stream("GET", url, headers=headers or {}) as response:
+        response.raise_for_status()
+        for chunk in response.iter_raw(MIB):
+            received += len(chunk)
+    return received, time.perf_counter() - start
+
+
+def report(label: str, size: int, seconds: float) -> None:
+    print(f"  {label:<28} {size / MIB:8.0f} Mo  {seconds:7.2f} s  {size / MIB / seconds:8.1f} Mo/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--ranges", type=int, default=200, help="plages de 1 Mo téléchargées")
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    size = args.size_mb * MIB
+    note_id = seed()
+    engine.dispose()
+    url = f"http://127.0.0.1:{args.port}"
+    print(f"Base : {engine.url.render_as_string(hide_password=True)}, fichier de {args.size_mb} Mo")
+    server = start_server(args.port)
+    try:
+        wait_ready(url)
+        idle_rss = peak_rss_mib(server.pid)
+        with httpx.Client(base_url=url, timeout=600) as client:
+            attachment, seconds = upload(client, note_id, size)
+            report("envoi", size, seconds)
+            _, seconds = upload(client, note_id, size)
+            report("envoi (dédupliqué)", size, seconds)
+
+            file_url = f"/notes/{note_id}/attachments/{attachment['id']}"
+            received, seconds = download(client, file_url)
+            assert received == size
+            report("téléchargement", received, seconds)
+
+            rng = random.Random(2)
+            total, elapsed = 0, 0.0
+            for _ in range(args.ranges):
+                start = rng.randrange(0, max(1, size - MIB))
+                received, seconds = download(client, file_url, {"Range": f"bytes={start}-{start + MIB - 1}"})
+                total, elapsed = total + received, elapsed + seconds
+            report(f"plages de 1 Mo (x{args.ranges})", total, elapsed)
+            print(f"  latence moyenne d'une plage  {elapsed / args.ranges * 1000:7.2f} ms")
+        print(f"  pic RSS du serveur           {peak_rss_mib(server.pid):8.1f} Mo (au repos {idle_rss:.1f} Mo)")
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark : débit d'import en notes/seconde, POST /notes/ unitaire vs /notes/import vs /notes/batch.
+
+L'application est appelée en mémoire (httpx.ASGITransport) avec l'authentification de test
+(TESTING=1, utilisateur 1) et la vraie session get_db.
+
+Usage (depuis secure-notes-back/) :
+    python -m benchmarks.bench_bulk_import --single 2000 --bulk 50000
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+BENCH_DIR = tempfile.mkdtemp(prefix="secure-notes-bench-")
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{BENCH_DIR}/bench.db")
+os.environ.setdefault("SMTP_PORT", "587")
+os.environ["TESTING"] = "1"
+
+import httpx
+from fastapi import FastAPI
+
+from app.constants import BATCH_MAX_ITEMS
+from app.extensions import Base, SessionLocal, async_engine, engine
+from app.models import User
+from app.routes import notes_routes
+
+
+def reset() -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.add(User(id=1, email="test@example.com", name="Bench", hashed_password="x"))
+        db.commit()
+
+
+def note(i: int) -> dict:
+    return {"title": f"Note {i}", "content": f"contenu de la note {i} " * 5}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--single", type=int, default=2000)
+    parser.add_argument("--bulk", type=int, default=50_000)
+    args = parser.parse_args()
+
+    app = FastAPI()
+    app.include_router(notes_routes.router)
+    transport = httpx.ASGITransport(app=app)
+    print(f"Base : {engine.url.render_as_string(hide_password=True)}")
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        reset()
+        start = time.perf_counter()
+        for i in range(args.single):
+            response = await client.post("/notes/", json={**note(i), "owner_id": 1})
+            response.raise_for_status()
+        single_rate = args.single / (time.perf_counter() - start)
+        print(f"  POST /notes/ unitaire   {args.single:>7} notes  {single_rate:10.0f} notes/s")
+
+        reset()
+        body = "".join(json.dumps(note(i)) + "\n" for i in range(args.bulk)).encode()
+        start = time.perf_counter()
+        response = await client.post("/notes/import", content=body, headers={"Content-Type": "application/x-ndjson"})
+        response.raise_for_status()
+        import_rate = args.bulk / (time.perf_counter() - start)
+        print(f"  POST /notes/import      {args.bulk:>7} notes  {import_rate:10.0f} notes/s  (x{import_rate / single_rate:.0f})")
+
+        reset()
+        start = time.perf_counter()
+        for low in range(0, args.bulk, BATCH_MAX_ITEMS):
+            batch = [note(i) for i in range(low, min(low + BATCH_MAX_ITEMS, args.bulk))]
+            response = await client.post("/notes/batch", json={"create": batch})
+            response.raise_for_status()
+        batch_rate = args.bulk / (time.perf_counter() - start)
+        print(f"  POST /notes/batch       {args.bulk:>7} notes  {batch_rate:10.0f} notes/s  (x{batch_rate / single_rate:.0f})")
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""Benchmark : surcoût du chiffrement AES-GCM sur NoteRepository.get_by_user_id par 1 000 notes.
+
+Deux utilisateurs reçoivent les mêmes notes, l'un chiffrées, l'autre en clair. Les pages de
+1 000 notes sont lues avec le chiffrement désactivé puis activé (déchiffrement en ligne et
+dans le pool de threads) ; le script échoue si le surcoût médian dépasse --budget-ms.
+
+Usage (depuis secure-notes-back/) :
+    python -m benchmarks.bench_encryption --notes 10000 --budget-ms 15
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = tempfile.mkdtemp(prefix="secure-notes-bench-")
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{BENCH_DIR}/bench.db")
+os.environ.setdefault("SMTP_PORT", "587")
+
+from app import repositories
+from app.crypto import NoteCipher
+from app.extensions import AsyncSessionLocal, Base, SessionLocal, async_engine, engine
+from app.models import User
+from app.repositories import NoteRepository
+
+PAGE = 1000
+
+
+def create_users() -> tuple:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        plain = User(email="plain@example.com", name="Plain", hashed_password="x")
+        encrypted = User(email="encrypted@example.com", name="Encrypted", hashed_password="x")
+        db.add_all([plain, encrypted])
+        db.commit()
+        return plain.id, encrypted.id
+
+
+async def seed(owner_id: int, notes: int) -> None:
+    rows = [{"title": f"Note {i}", "content": "Lorem ipsum dolor sit amet. " * 20} for i in range(notes)]
+    async with AsyncSessionLocal() as db:
+        for low in range(0, notes, 5000):
+            await NoteRepository.insert_many(db, owner_id, rows[low:low + 5000])
+        await db.commit()
+
+
+async def median_ms(owner_id: int, repeat: int) -> float:
+    timings = []
+    async with AsyncSessionLocal() as db:
+        for _ in range(repeat):
+            db.expunge_all()
+            start = time.perf_counter()
+            await NoteRepository.get_by_user_id(db=db, user_id=owner_id, limit=PAGE)
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--budget-ms", type=float, default=15.0, help="surcoût maximal par 1 000 notes")
+    args = parser.parse_args()
+
+    plain_id, encrypted_id = create_users()
+    enabled = NoteCipher(os.urandom(32))
+    repositories.note_cipher = NoteCipher(None)
+    await seed(plain_id, args.notes)
+    repositories.note_cipher = enabled
+    await seed(encrypted_id, args.notes)
+    print(f"Base : {engine.url.render_as_string(hide_password=True)}, {args.notes} notes par utilisateur")
+
+    repositories.note_cipher = NoteCipher(None)
+    baseline = await median_ms(plain_id, args.repeat)
+    print(f"  sans chiffrement           {baseline:8.2f} ms / {PAGE} notes")
+
+    worst = 0.0
+    for label, threshold in (("déchiffrement en ligne", 0), ("déchiffrement en thread", 1)):
+        enabled.thread_threshold = threshold
+        repositories.note_cipher = enabled
+        timing = await median_ms(encrypted_id, args.repeat)
+        overhead = timing - baseline
+        worst = max(worst, overhead)
+        print(f"  {label:<26} {timing:8.2f} ms / {PAGE} notes   surcoût {overhead:7.2f} ms")
+
+    await async_engine.dispose()
+    verdict = "OK" if worst <= args.budget_ms else "DÉPASSÉ"
+    print(f"  budget {args.budget_ms:.2f} ms / {PAGE} notes : {verdict}")
+    return 0 if worst <= args.budget_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
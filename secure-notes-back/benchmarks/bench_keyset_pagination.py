@@ -0,0 +1,110 @@
+"""Benchmark : latence d'une page de notes en profondeur, pagination par clé vs OFFSET.
+
+Remplit progressivement les notes d'un utilisateur (10k, 100k, ... jusqu'à 1M) et mesure,
+à 0 %, 50 % et 99 % de profondeur, la médiane du temps de NoteRepository.get_by_user_id
+(clé (updated_at, id)) comparée à la même page lue avec OFFSET/LIMIT.
+
+Usage (depuis secure-notes-back/) :
+    python -m benchmarks.bench_keyset_pagination --sizes 10000,100000,1000000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BENCH_DIR = tempfile.mkdtemp(prefix="secure-notes-bench-")
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{BENCH_DIR}/bench.db")
+os.environ.setdefault("SMTP_PORT", "587")
+
+from sqlalchemy import insert, select
+
+from app.constants import LIMIT
+from app.extensions import AsyncSessionLocal, Base, SessionLocal, async_engine, engine
+from app.models import Note, User
+from app.repositories import NoteRepository
+
+BASE_TIME = datetime(2020, 1, 1)
+
+
+def grow(user_id: int, start: int, stop: int, chunk: int = 50_000) -> None:
+    with engine.begin() as conn:
+        for low in range(start, stop, chunk):
+            conn.execute(insert(Note), [
+                {
+                    "title": f"Note {i}",
+                    "content": "lorem ipsum",
+                    "owner_id": user_id,
+                    "created_at": BASE_TIME + timedelta(seconds=i),
+                    "updated_at": BASE_TIME + timedelta(seconds=i),
+                }
+                for i in range(low, min(low + chunk, stop))
+            ])
+
+
+async def median_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def measure(user_id: int, total: int, repeat: int) -> None:
+    ordering = (Note.updated_at.desc(), Note.id.desc())
+    async with AsyncSessionLocal() as db:
+        for depth in (0.0, 0.5, 0.99):
+            offset = int(total * depth)
+            after = None
+            if offset:
+                row = (await db.execute(
+                    select(Note.updated_at, Note.id).where(Note.owner_id == user_id)
+                    .order_by(*ordering).offset(offset - 1).limit(1)
+                )).one()
+                after = (row.updated_at, row.id)
+
+            async def keyset():
+                await NoteRepository.get_by_user_id(db=db, user_id=user_id, limit=LIMIT, after=after)
+                db.expunge_all()
+
+            async def offset_page():
+                await db.execute(
+                    select(Note).where(Note.owner_id == user_id).order_by(*ordering).offset(offset).limit(LIMIT)
+                )
+                db.expunge_all()
+
+            keyset_ms = await median_ms(keyset, repeat)
+            offset_ms = await median_ms(offset_page, repeat)
+            print(f"  {total:>9} notes  profondeur {depth:>4.0%}  clé {keyset_ms:8.2f} ms   OFFSET {offset_ms:8.2f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user = User(email="bench@example.com", name="Bench", hashed_password="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+    print(f"Base : {engine.url.render_as_string(hide_password=True)}")
+    current = 0
+    for size in sizes:
+        grow(user_id, current, size)
+        current = size
+        await measure(user_id, size, args.repeat)
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
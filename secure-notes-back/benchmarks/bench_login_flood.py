@@ -0,0 +1,178 @@
+"""Benchmark de charge : latence de GET /notes/{id} pendant un flood sur /auth/login.
+
+Le serveur (run.py, SERVER_MODE=prod) est lancé trois fois sur une base SQLite fraîche :
+sans flood, puis avec un flood de mauvais mots de passe sur des comptes existants, venant
+d'adresses variées (X-Forwarded-For), contrôle d'admission désactivé puis activé. Sans
+admission chaque tentative coûte un calcul bcrypt et les cœurs saturent ; avec admission
+les seaux par compte et la file bornée de bcrypt refusent l'excédent en 429/503.
+
+Usage (depuis secure-notes-back/) :
+    python -m benchmarks.bench_login_flood --duration 10 --flood 64 --workers 2
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+BENCH_DIR = tempfile.mkdtemp(prefix="secure-notes-bench-")
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{BENCH_DIR}/bench.db")
+os.environ.setdefault("SMTP_PORT", "587")
+
+import httpx
+
+from app.extensions import Base, SessionLocal, engine
+from app.models import Note, User
+from app.passwords import hash_password
+
+ADMISSION_OFF = {"AUTH_IP_RATE": "0", "AUTH_ACCOUNT_RATE": "0", "PASSWORD_HASH_MAX_QUEUE": "-1"}
+ADMISSION_ON = {}
+
+
+def seed(accounts: int) -> int:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    hashed = hash_password("correct horse battery staple")
+    with SessionLocal() as db:
+        db.add(User(id=1, email="test@example.com", name="Bench", hashed_password=hashed))
+        db.add_all(
+            User(email=f"user{i}@example.com", name=f"User {i}", hashed_password=hashed) for i in range(accounts)
+        )
+        note = Note(title="Note", content="lorem ipsum " * 20, owner_id=1)
+        db.add(note)
+        db.commit()
+        return note.id
+
+
+def start_server(port: int, workers: int, settings: dict) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        **settings,
+        "SERVER_MODE": "prod",
+        "PORT": str(port),
+        "HOST": "127.0.0.1",
+        "WEB_CONCURRENCY": str(workers),
+        "TESTING": "1",
+        "RUN_MIGRATIONS": "false",
+        "REQUEST_LOG": "false",
+    }
+    return subprocess.Popen(
+        [sys.executable, "run.py"], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(url: str, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/livez", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not become ready")
+
+
+async def read_notes(client: httpx.AsyncClient, path: str, stop: asyncio.Event, latencies: list) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        response = await client.get(path)
+        if response.status_code == 200:
+            latencies.append(loop.time() - start)
+        await asyncio.sleep(0.01)
+
+
+async def flood(url: str, connections: int, accounts: int, duration: float) -> Counter:
+    statuses = Counter()
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=connections)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        async def attacker():
+            while time.monotonic() < deadline:
+                ip = f"10.{random.randrange(256)}.{random.randrange(256)}.{random.randrange(1, 255)}"
+                response = await client.post(
+                    "/auth/login",
+                    json={"email": f"user{random.randrange(accounts)}@example.com", "password": "wrong"},
+                    headers={"X-Forwarded-For": ip},
+                )
+                statuses[response.status_code] += 1
+
+        await asyncio.gather(*(attacker() for _ in range(connections)))
+    return statuses
+
+
+def flood_process(url: str, connections: int, accounts: int, duration: float, results) -> None:
+    results.put(asyncio.run(flood(url, connections, accounts, duration)))
+
+
+async def read_during(url: str, note_id: int, readers: int, duration: float) -> list:
+    stop = asyncio.Event()
+    latencies = []
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        tasks = [asyncio.create_task(read_notes(client, f"/notes/{note_id}", stop, latencies)) for _ in range(readers)]
+        await asyncio.sleep(duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+    return sorted(latencies)
+
+
+def run_scenario(url: str, note_id: int, args, flooding: bool) -> tuple:
+    # Le flood tourne dans un autre processus : sa boucle ne retarde pas les lectures mesurées
+    results = multiprocessing.Queue()
+    attacker = multiprocessing.Process(target=flood_process, args=(url, args.flood, args.accounts, args.duration, results))
+    if flooding:
+        attacker.start()
+    latencies = asyncio.run(read_during(url, note_id, args.readers, args.duration))
+    statuses = Counter()
+    if flooding:
+        statuses = results.get()
+        attacker.join()
+    return latencies, statuses
+
+
+def report(label: str, latencies: list, statuses: Counter, duration: float) -> None:
+    p50 = statistics.median(latencies) * 1000 if latencies else 0.0
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000 if latencies else 0.0
+    logins = ", ".join(f"{status}: {count / duration:.0f}/s" for status, count in sorted(statuses.items())) or "-"
+    print(f"  {label:<24} /notes p50 {p50:7.2f} ms   p99 {p99:8.2f} ms   login {logins}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--flood", type=int, default=64, help="connexions du flood de login")
+    parser.add_argument("--readers", type=int, default=4, help="connexions lisant /notes/{id}")
+    parser.add_argument("--accounts", type=int, default=200, help="comptes visés par le flood")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    note_id = seed(args.accounts)
+    engine.dispose()
+    url = f"http://127.0.0.1:{args.port}"
+    print(f"Base : {engine.url.render_as_string(hide_password=True)}, {args.workers} worker(s), {args.flood} connexions de flood")
+    for label, settings, flooding in (
+        ("sans flood", ADMISSION_ON, False),
+        ("flood, sans admission", ADMISSION_OFF, True),
+        ("flood, avec admission", ADMISSION_ON, True),
+    ):
+        server = start_server(args.port, args.workers, settings)
+        try:
+            wait_ready(url)
+            latencies, statuses = run_scenario(url, note_id, args, flooding)
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+        report(label, latencies, statuses, args.duration)
+
+
+if __name__ == "__main__":
+    main()
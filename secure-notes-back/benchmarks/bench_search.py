@@ -0,0 +1,96 @@
+"""Benchmark : latence de NoteRepository.search sur 100k+ notes d'un utilisateur.
+
+Sur SQLite, mesure le chargement initial de l'index inversé en mémoire puis les requêtes
+à chaud ; sur Postgres (BENCH_DATABASE_URL), la requête tsvector servie par l'index GIN.
+Une recherche naïve LIKE sert de point de comparaison.
+
+Usage (depuis secure-notes-back/) :
+    python -m benchmarks.bench_search --notes 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+BENCH_DIR = tempfile.mkdtemp(prefix="secure-notes-bench-")
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{BENCH_DIR}/bench.db")
+os.environ.setdefault("SMTP_PORT", "587")
+
+from sqlalchemy import and_, insert, select
+
+from app.constants import LIMIT
+from app.extensions import AsyncSessionLocal, Base, SessionLocal, async_engine, engine
+from app.models import Note, User
+from app.repositories import NoteRepository
+
+QUERIES = ["projet", "budget reunion", "facture client urgent", "zzzinconnu"]
+
+
+def seed(notes: int, vocabulary_size: int, words_per_note: int) -> int:
+    rng = random.Random(42)
+    vocabulary = [f"mot{i}" for i in range(vocabulary_size)] + ["projet", "budget", "reunion", "facture", "client", "urgent"]
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user = User(email="bench@example.com", name="Bench", hashed_password="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+    with engine.begin() as conn:
+        for low in range(0, notes, 20_000):
+            conn.execute(insert(Note), [
+                {
+                    "title": " ".join(rng.choices(vocabulary, k=3)),
+                    "content": " ".join(rng.choices(vocabulary, k=words_per_note)),
+                    "owner_id": user_id,
+                }
+                for _ in range(low, min(low + 20_000, notes))
+            ])
+    return user_id
+
+
+async def timed_ms(coroutine) -> float:
+    start = time.perf_counter()
+    await coroutine
+    return (time.perf_counter() - start) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, default=100_000)
+    parser.add_argument("--vocabulary", type=int, default=5_000)
+    parser.add_argument("--words", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    user_id = seed(args.notes, args.vocabulary, args.words)
+    print(f"Base : {engine.url.render_as_string(hide_password=True)}, {args.notes} notes")
+
+    async with AsyncSessionLocal() as db:
+        cold = await timed_ms(NoteRepository.search(db, owner_id=user_id, query=QUERIES[0], limit=LIMIT))
+        print(f"  première recherche (chargement de l'index éventuel) : {cold:9.1f} ms")
+
+        for query in QUERIES:
+            timings = []
+            for _ in range(args.repeat):
+                timings.append(await timed_ms(NoteRepository.search(db, owner_id=user_id, query=query, limit=LIMIT)))
+                db.expunge_all()
+            like = select(Note).where(
+                Note.owner_id == user_id,
+                and_(*(Note.content.contains(term) for term in query.split())),
+            ).limit(LIMIT)
+            like_ms = statistics.median([await timed_ms(db.execute(like)) for _ in range(min(args.repeat, 5))])
+            timings.sort()
+            print(
+                f"  {query!r:<26} p50 {statistics.median(timings):8.2f} ms"
+                f"  p95 {timings[int(len(timings) * 0.95) - 1]:8.2f} ms   LIKE {like_ms:8.2f} ms"
+            )
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
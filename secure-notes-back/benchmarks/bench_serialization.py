@@ -0,0 +1,108 @@
+"""Benchmark : coût CPU par note de la sérialisation d'une liste de notes (20, 1 000, 10 000).
+
+Compare l'ancien chemin (dict construit à la main avec isoformat(), puis JSONResponse et le
+module json standard) au chemin actuel de GET /notes/user_id/{id} : validation du schéma
+NoteOut depuis les instances ORM puis encodage par pydantic-core (orm_list_response).
+Le chemin générique response_model de FastAPI (objets -> dicts -> DefaultJSONResponse)
+est donné à titre indicatif.
+
+Usage (depuis secure-notes-back/) :
+    python -m benchmarks.bench_serialization --sizes 20,1000,10000
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("SMTP_PORT", "587")
+
+from fastapi.responses import JSONResponse
+from fastapi.utils import create_model_field
+
+from app.models import Note
+from app.responses import DefaultJSONResponse, orm_list_response
+from app.schemas import NoteOut, note_list_adapter
+
+BASE_TIME = datetime(2024, 1, 1, 12, 30, 15, 123456)
+RESPONSE_FIELD = create_model_field(name="Response_notes", type_=List[NoteOut], mode="serialization")
+
+
+def make_notes(count: int) -> List[Note]:
+    return [
+        Note(
+            id=i,
+            title=f"Note {i}",
+            content="Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4,
+            owner_id=1,
+            created_at=BASE_TIME + timedelta(seconds=i),
+            updated_at=BASE_TIME + timedelta(seconds=i, minutes=5),
+        )
+        for i in range(count)
+    ]
+
+
+def legacy_to_dict(note: Note) -> dict:
+    """Ancien Note.to_dict(), conservé ici comme point de comparaison"""
+    return {
+        "id": note.id,
+        "title": note.title,
+        "content": note.content,
+        "owner_id": note.owner_id,
+        "created_at": note.created_at.isoformat() if note.created_at else None,
+        "updated_at": note.updated_at.isoformat() if note.updated_at else None,
+    }
+
+
+def before(notes: List[Note]) -> bytes:
+    return JSONResponse(content=[legacy_to_dict(note) for note in notes]).body
+
+
+def after(notes: List[Note]) -> bytes:
+    return orm_list_response(note_list_adapter, notes).body
+
+
+def response_model(notes: List[Note]) -> bytes:
+    # Mêmes étapes que fastapi.routing.serialize_response pour un response_model
+    value, errors = RESPONSE_FIELD.validate(notes, {}, loc=("response",))
+    assert not errors
+    return DefaultJSONResponse(content=RESPONSE_FIELD.serialize(value, mode="json")).body
+
+
+def best_of(fn, notes: List[Note], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.process_time()
+        fn(notes)
+        timings.append(time.process_time() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="20,1000,10000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"Encodeur : {DefaultJSONResponse.__name__}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        notes = make_notes(size)
+        # Les chemins doivent produire le même document
+        assert json.loads(before(notes)) == json.loads(after(notes)) == json.loads(response_model(notes))
+        # Les petites listes sont répétées pour rester au-dessus de la résolution de l'horloge
+        loops = max(1, 10_000 // size)
+        before_s, after_s, model_s = (
+            best_of(lambda n: [fn(n) for _ in range(loops)], notes, args.repeat) / loops
+            for fn in (before, after, response_model)
+        )
+        print(
+            f"  {size:>6} notes  avant {before_s / size * 1e6:6.2f} µs/note"
+            f"   après {after_s / size * 1e6:6.2f} µs/note (gain {1 - after_s / before_s:6.1%})"
+            f"   response_model {model_s / size * 1e6:6.2f} µs/note"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Benchmark de charge : requêtes/seconde sur GET /notes/{id}, SERVER_MODE=dev vs prod.
+
+Chaque mode est lancé dans un sous-processus via run.py, sur une base SQLite fraîche
+contenant une note de l'utilisateur de test (TESTING=1), puis chargé par des processus
+clients httpx pendant une durée fixe. Le générateur de charge tournant sur la même machine,
+lancer plutôt un outil dédié (wrk, hey) sur une autre machine pour des chiffres absolus.
+
+Usage (depuis secure-notes-back/) :
+    python -m benchmarks.bench_server_modes --duration 10 --connections 64 --workers 4
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = tempfile.mkdtemp(prefix="secure-notes-bench-")
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{BENCH_DIR}/bench.db")
+os.environ.setdefault("SMTP_PORT", "587")
+
+import httpx
+
+from app.extensions import Base, SessionLocal, engine
+from app.models import Note, User
+
+
+def seed() -> int:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.add(User(id=1, email="test@example.com", name="Bench", hashed_password="x"))
+        note = Note(title="Note", content="lorem ipsum " * 20, owner_id=1)
+        db.add(note)
+        db.commit()
+        return note.id
+
+
+def start_server(mode: str, port: int, workers: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "SERVER_MODE": mode,
+        "PORT": str(port),
+        "HOST": "127.0.0.1",
+        "WEB_CONCURRENCY": str(workers),
+        "TESTING": "1",
+        # Tables créées par seed() : pas de migration sur cette base jetable
+        "RUN_MIGRATIONS": "false",
+    }
+    return subprocess.Popen(
+        [sys.executable, "run.py"], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(url: str, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not become ready")
+
+
+async def load(url: str, path: str, duration: float, connections: int) -> list:
+    latencies = []
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits) as client:
+        async def user():
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                response = await client.get(path)
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(user() for _ in range(connections)))
+    return latencies
+
+
+def client_process(url: str, path: str, duration: float, connections: int, results) -> None:
+    results.put(asyncio.run(load(url, path, duration, connections)))
+
+
+def run_mode(mode: str, args, note_id: int) -> None:
+    url = f"http://127.0.0.1:{args.port}"
+    server = start_server(mode, args.port, args.workers)
+    try:
+        wait_ready(url)
+        results = multiprocessing.Queue()
+        per_process = max(1, args.connections // args.clients)
+        clients = [
+            multiprocessing.Process(
+                target=client_process, args=(url, f"/notes/{note_id}", args.duration, per_process, results),
+            )
+            for _ in range(args.clients)
+        ]
+        for process in clients:
+            process.start()
+        latencies = [latency for _ in clients for latency in results.get()]
+        for process in clients:
+            process.join()
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+    latencies.sort()
+    rate = len(latencies) / args.duration
+    p50 = statistics.median(latencies) * 1000 if latencies else 0.0
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0.0
+    workers = args.workers if mode == "prod" else 1
+    print(f"  {mode:<5} {workers:>2} worker(s)  {rate:9.0f} req/s   p50 {p50:7.2f} ms   p99 {p99:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=2, help="processus générateurs de charge")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="workers en mode prod")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--modes", default="dev,prod")
+    args = parser.parse_args()
+
+    note_id = seed()
+    engine.dispose()
+    print(f"Base : {engine.url.render_as_string(hide_password=True)}, {args.connections} connexions")
+    for mode in args.modes.split(","):
+        run_mode(mode, args, note_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark : coût CPU par requête de la vérification du jeton d'accès, avec et sans cache.
+
+Compare l'ancien verify_token (os.getenv("SECRET_KEY") et jwt.decode à chaque requête) à
+TokenVerifier : cache des claims par empreinte du jeton et contrôle de révocation (filtre
+de Bloom puis ensemble exact), avec une liste de révocation remplie.
+
+Usage (depuis secure-notes-back/) :
+    python -m benchmarks.bench_token_verification --tokens 1000 --requests 100000 --revoked 10000
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("SMTP_PORT", "587")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+from jose import jwt
+
+from app.tokens import TokenVerifier
+
+
+def before(token: str) -> int:
+    payload = jwt.decode(token, os.getenv("SECRET_KEY"), algorithms=["HS256"])
+    return int(payload["sub"])
+
+
+def per_request_us(fn, tokens, requests: int) -> float:
+    sample = [random.choice(tokens) for _ in range(requests)]
+    start = time.process_time()
+    for token in sample:
+        fn(token)
+    return (time.process_time() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=1000, help="sessions actives distinctes")
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--revoked", type=int, default=10_000, help="jetons révoqués (logout)")
+    args = parser.parse_args()
+
+    verifier = TokenVerifier(os.environ["SECRET_KEY"], cache_size=max(args.tokens, 1), revocation_capacity=max(args.revoked, 1))
+    expire = datetime.utcnow() + timedelta(hours=24)
+    tokens = [verifier.encode({"sub": str(i), "exp": expire}) for i in range(args.tokens)]
+    for i in range(args.revoked):
+        verifier.revoke(verifier.encode({"sub": str(i), "exp": expire, "jti": f"revoked-{i}"}))
+
+    before_us = per_request_us(before, tokens, args.requests)
+    after_us = per_request_us(lambda token: int(verifier.decode(token)["sub"]), tokens, args.requests)
+    print(f"{args.tokens} jetons actifs, {args.revoked} révoqués, {args.requests} requêtes")
+    print(f"  jwt.decode à chaque requête  {before_us:7.2f} µs/requête")
+    print(f"  TokenVerifier (cache)        {after_us:7.2f} µs/requête   gain {1 - after_us / before_us:6.1%}")
+    print(f"  {verifier.stats()}")
+
+
+if __name__ == "__main__":
+    main()
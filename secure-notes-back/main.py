@@ -1,47 +1,74 @@
-from fastapi import FastAPI
-from app.extensions import Base, engine
-from app import models
-import os
-import time
-import sys
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from app.attachments import sweep_orphan_blobs_forever
+from app.config import ATTACHMENT_SWEEP_INTERVAL
+from app.events import note_events
+from app.extensions import async_engine
+from app.health import database_health
+from app.instrumentation import InstrumentationMiddleware
+from app.logs import configure_logging, stop_logging
+from app.mailer import mail_queue
+from app.metrics import metrics
+from app.passwords import password_hasher
+from app.purge import account_purger
+from app.replicas import StickyPrimaryMiddleware, replica_router
+from app.pool import pool_stats
+from app.responses import DefaultJSONResponse
 from app.routes import notes_routes, auth_routes, users_routes
-from sqlalchemy.exc import OperationalError
-from sqlalchemy import text
-
-app = FastAPI()
-
-# Fonction pour attendre que PostgreSQL soit prêt
-def wait_for_database(max_retries=30, delay=2):
-    """Attend que la base de données soit prête avec des tentatives de reconnexion"""
-    for attempt in range(max_retries):
-        try:
-            # Test de connexion simple
-            with engine.connect() as conn:
-                conn.execute(text("SELECT 1"))
-            print(f"✅ Connexion à la base de données réussie (tentative {attempt + 1})")
-            return True
-        except OperationalError as e:
-            if attempt < max_retries - 1:
-                print(f"⏳ Tentative {attempt + 1}/{max_retries} - Base de données non prête: {e}")
-                print(f"⏳ Nouvelle tentative dans {delay} secondes...")
-                time.sleep(delay)
-            else:
-                print(f"❌ Échec de connexion à la base de données après {max_retries} tentatives")
-                sys.exit(1)
-    return False
+from app.startup import wait_for_database
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+async def start_background_jobs(app: FastAPI) -> None:
+    await wait_for_database(async_engine, app.state)
+    try:
+        # Purges de comptes interrompues par un arrêt : chaque lot est idempotent
+        await account_purger.resume()
+    except Exception:
+        logger.exception("Could not resume account purges")
+    # Contenus des pièces jointes supprimées en cascade avec leur note ou leur compte
+    await sweep_orphan_blobs_forever(interval=ATTACHMENT_SWEEP_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Le schéma est migré une fois avant le lancement des workers (run.py, app/migrate.py) :
+    # le démarrage n'attend pas la base, /readyz passe à 200 quand elle répond
+    log_listener = configure_logging()
+    app.state.ready = False
+    probe = asyncio.create_task(start_background_jobs(app))
+    await note_events.start()
+    try:
+        yield
+    finally:
+        probe.cancel()
+        await account_purger.stop()
+        await note_events.stop()
+        # Laisse partir les emails en attente avant l'arrêt du worker
+        await mail_queue.stop()
+        password_hasher.shutdown()
+        await async_engine.dispose()
+        await replica_router.dispose()
+        stop_logging(log_listener)
+
+
+app = FastAPI(default_response_class=DefaultJSONResponse, lifespan=lifespan)
+app.state.ready = False
 
 # Configuration CORS
 origins_env = os.getenv("CORS_ORIGINS")
 if origins_env:
     origins = origins_env.split(",")
-    print(".env enable")
-
 else:
     # Valeurs par défaut pour le développement
     origins = ["http://localhost:4200", "http://127.0.0.1:4200", "http://localhost"]
 
-print(origins)
+logger.info("CORS origins: %s", origins)
 
 app.add_middleware(
     CORSMiddleware,
@@ -49,35 +76,58 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Link", "ETag", "Last-Modified", "Server-Timing", "Retry-After"],
 )
 
+# Lecture de ses écritures : cookie primary_until posé après chaque écriture réussie
+app.add_middleware(StickyPrimaryMiddleware)
+
+# Ajouté en dernier : enveloppe CORS, la durée mesurée couvre toute la requête
+app.add_middleware(InstrumentationMiddleware)
+
+# Métriques Prometheus du worker (chaque processus expose ses propres compteurs)
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Endpoint de santé pour les health checks
 @app.get("/health")
 async def health_check():
-    try:
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-        return {"status": "healthy", "database": "connected"}
-    except Exception as e:
-        return {"status": "unhealthy", "database": "disconnected", "error": str(e)}
-
-# Attendre que la base soit prête avant de créer les tables
-print("🔍 Vérification de la connexion à la base de données...")
-wait_for_database()
-
-# Créer les tables une fois que la base est prête
-print("📋 Création des tables...")
-try:
-    #Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
-    print("✅ Tables créées avec succès")
-except Exception as e:
-    print(f"❌ Erreur lors de la création des tables: {e}")
-    sys.exit(1)
+    # Sonde mise en cache quelques secondes : les health checks ne monopolisent pas le pool
+    database = await database_health.check()
+    healthy = database["status"] == "connected"
+    result = {
+        "status": "healthy" if healthy else "unhealthy",
+        "database": database["status"],
+        "database_latency_ms": database["latency_ms"],
+        "checked_at": database["checked_at"],
+        "pool": pool_stats(async_engine.pool),
+        "replicas": replica_router.stats(),
+        "password_hashing": password_hasher.stats(),
+        "mail_queue": mail_queue.stats(),
+        "account_purges": account_purger.stats(),
+        "note_events": note_events.stats(),
+    }
+    if not healthy:
+        result["error"] = database["error"]
+    return result
+
+# Liveness : le processus répond, sans toucher à la base
+@app.get("/livez")
+async def liveness():
+    return {"status": "alive"}
+
+# Readiness : le worker peut recevoir du trafic (base joignable)
+@app.get("/readyz")
+async def readiness():
+    if not app.state.ready:
+        return DefaultJSONResponse(status_code=503, content={"status": "starting"})
+    database = await database_health.check()
+    if database["status"] != "connected":
+        return DefaultJSONResponse(status_code=503, content={"status": "unavailable", "error": database["error"]})
+    return {"status": "ready"}
 
 # Inclure les routes
 app.include_router(notes_routes.router)
 app.include_router(auth_routes.router)
 app.include_router(users_routes.router)
-
-print("🚀 Application FastAPI prête!")
\ No newline at end of file
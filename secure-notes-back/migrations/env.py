@@ -0,0 +1,64 @@
+from alembic import context
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+from app.extensions import Base, DATABASE_URL
+from app import models  # noqa: F401 (enregistre les tables dans Base.metadata)
+
+config = context.config
+target_metadata = Base.metadata
+
+# Clé du verrou consultatif Postgres : un seul processus migre à la fois
+MIGRATION_LOCK_KEY = 7_431_001
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Index réservés à Postgres (ddl_if) : absents des autres bases, ne pas les signaler
+    dialect = context.get_context().dialect.name
+    if type_ == "index" and object is not None and getattr(object, "_ddl_if", None) is not None:
+        return object._ddl_if.dialect in (None, dialect)
+    return True
+
+
+def database_url() -> str:
+    return config.attributes.get("url") or config.get_main_option("sqlalchemy.url") or DATABASE_URL
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=database_url(),
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    engine = create_engine(database_url(), poolclass=NullPool)
+    with engine.connect() as connection:
+        is_postgres = connection.dialect.name == "postgresql"
+        if is_postgres:
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            connection.commit()
+        try:
+            context.configure(
+                connection=connection,
+                target_metadata=target_metadata,
+                include_object=include_object,
+                render_as_batch=connection.dialect.name == "sqlite",
+            )
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            if is_postgres:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+                connection.commit()
+    engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
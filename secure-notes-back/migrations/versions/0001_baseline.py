@@ -0,0 +1,50 @@
+"""Schéma initial (users, notes), tel que créé auparavant par create_all
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Les bases créées par create_all ont déjà ces tables : elles sont seulement adoptées
+    existing = sa.inspect(op.get_bind()).get_table_names()
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("hashed_password", sa.String(), nullable=False),
+            sa.Column("is_email_verified", sa.Boolean(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if "notes" not in existing:
+        op.create_table(
+            "notes",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("title", sa.String(), nullable=True),
+            sa.Column("content", sa.String(), nullable=False),
+            sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_notes_id", "notes", ["id"])
+        op.create_index("ix_notes_title", "notes", ["title"])
+
+
+def downgrade() -> None:
+    op.drop_table("notes")
+    op.drop_table("users")
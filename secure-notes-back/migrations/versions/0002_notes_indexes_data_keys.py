@@ -0,0 +1,43 @@
+"""Index de pagination et de recherche des notes, clé de données chiffrée des utilisateurs
+
+Revision ID: 0002_notes_indexes_data_keys
+Revises: 0001_baseline
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.config import SEARCH_CONFIG
+
+revision = "0002_notes_indexes_data_keys"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if "wrapped_data_key" not in {column["name"] for column in inspector.get_columns("users")}:
+        with op.batch_alter_table("users") as batch:
+            batch.add_column(sa.Column("wrapped_data_key", sa.String(), nullable=True))
+
+    op.create_index("ix_notes_owner_updated_id", "notes", ["owner_id", "updated_at", "id"], if_not_exists=True)
+
+    if bind.dialect.name == "postgresql":
+        # Même expression que app.models.search_document, sinon l'index n'est pas utilisé
+        op.create_index(
+            "ix_notes_search_document",
+            "notes",
+            [sa.text(f"to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(title, '') || ' ' || content)")],
+            postgresql_using="gin",
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_notes_search_document", table_name="notes", if_exists=True)
+    op.drop_index("ix_notes_owner_updated_id", table_name="notes", if_exists=True)
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("wrapped_data_key")
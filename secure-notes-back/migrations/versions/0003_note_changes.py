@@ -0,0 +1,43 @@
+"""Numéros de changement des notes et pierres tombales pour GET /notes/changes
+
+Revision ID: 0003_note_changes
+Revises: 0002_notes_indexes_data_keys
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_note_changes"
+down_revision = "0002_notes_indexes_data_keys"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Les notes existantes ont le numéro 0 : elles font partie de la première synchronisation
+    with op.batch_alter_table("users") as batch:
+        batch.add_column(sa.Column("change_seq", sa.Integer(), nullable=False, server_default="0"))
+    with op.batch_alter_table("notes") as batch:
+        batch.add_column(sa.Column("change_seq", sa.Integer(), nullable=False, server_default="0"))
+    op.create_index("ix_notes_owner_change_seq_id", "notes", ["owner_id", "change_seq", "id"])
+
+    op.create_table(
+        "note_tombstones",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("note_id", sa.Integer(), nullable=False),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("change_seq", sa.Integer(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        "ix_note_tombstones_owner_change_seq_note_id", "note_tombstones", ["owner_id", "change_seq", "note_id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("note_tombstones")
+    op.drop_index("ix_notes_owner_change_seq_id", table_name="notes")
+    with op.batch_alter_table("notes") as batch:
+        batch.drop_column("change_seq")
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("change_seq")
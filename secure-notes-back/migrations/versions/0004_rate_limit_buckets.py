@@ -0,0 +1,28 @@
+"""Seaux à jetons partagés du contrôle d'admission (ADMISSION_BACKEND=database)
+
+Revision ID: 0004_rate_limit_buckets
+Revises: 0003_note_changes
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_rate_limit_buckets"
+down_revision = "0003_note_changes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "rate_limit_buckets",
+        sa.Column("key", sa.String(128), primary_key=True),
+        sa.Column("tokens", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.Float(), nullable=False),
+        sa.Column("admitted", sa.Boolean(), nullable=False),
+    )
+    op.create_index("ix_rate_limit_buckets_updated_at", "rate_limit_buckets", ["updated_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("rate_limit_buckets")
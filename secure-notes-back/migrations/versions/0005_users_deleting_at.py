@@ -0,0 +1,23 @@
+"""Marqueur de suppression de compte en cours (purge des notes par lots)
+
+Revision ID: 0005_users_deleting_at
+Revises: 0004_rate_limit_buckets
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_users_deleting_at"
+down_revision = "0004_rate_limit_buckets"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("users") as batch:
+        batch.add_column(sa.Column("deleting_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("deleting_at")
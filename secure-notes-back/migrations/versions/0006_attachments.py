@@ -0,0 +1,33 @@
+"""Pièces jointes des notes, contenus dédupliqués par SHA-256
+
+Revision ID: 0006_attachments
+Revises: 0005_users_deleting_at
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_attachments"
+down_revision = "0005_users_deleting_at"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "attachments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("note_id", sa.Integer(), sa.ForeignKey("notes.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("filename", sa.String(255), nullable=False),
+        sa.Column("content_type", sa.String(255), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("sha256", sa.String(64), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_attachments_note_id", "attachments", ["note_id"])
+    op.create_index("ix_attachments_sha256", "attachments", ["sha256"])
+
+
+def downgrade() -> None:
+    op.drop_table("attachments")
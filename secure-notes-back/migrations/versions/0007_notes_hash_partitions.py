@@ -0,0 +1,101 @@
+"""Partitionnement de notes par hachage de owner_id (Postgres, si NOTES_PARTITIONS > 0)
+
+La table est recréée partitionnée et ses lignes y sont recopiées : la table notes est
+verrouillée pendant la copie. La clé primaire devient (id, owner_id), Postgres exigeant la clé
+de partition dans toute contrainte d'unicité, et la clé étrangère des pièces jointes porte
+donc sur (note_id, owner_id). Pour changer le nombre de partitions : downgrade vers
+0006_attachments puis upgrade avec le nouveau NOTES_PARTITIONS.
+
+Sur les autres bases, ou avec NOTES_PARTITIONS=0, la migration ne fait rien. Le nombre de
+partitions appliqué est noté dans le commentaire de la table (obj_description('notes'::regclass)) ;
+les modèles (app.models.NOTES_PARTITIONED) déclarent la clé composite d'après NOTES_PARTITIONS, qui
+doit donc rester celui de la migration.
+
+Revision ID: 0007_notes_hash_partitions
+Revises: 0006_attachments
+Create Date: 2026-10-18
+"""
+from alembic import context, op
+import sqlalchemy as sa
+from app.config import NOTES_PARTITIONS, SEARCH_CONFIG
+
+revision = "0007_notes_hash_partitions"
+down_revision = "0006_attachments"
+branch_labels = None
+depends_on = None
+
+COLUMNS = "id, title, content, owner_id, change_seq, created_at, updated_at"
+
+
+def is_partitioned(bind) -> bool:
+    if context.is_offline_mode():
+        # Script SQL (alembic upgrade --sql) : la table d'origine n'est pas partitionnée
+        return False
+    return bind.execute(sa.text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'notes'::regclass")).first() is not None
+
+
+def rebuild_notes(partitions: int) -> None:
+    """Recrée notes, partitionnée en partitions tables si partitions > 0, avec les mêmes lignes"""
+    attachments_fk = "attachments_note_id_owner_id_fkey" if partitions else "attachments_note_id_fkey"
+    old_attachments_fk = "attachments_note_id_fkey" if partitions else "attachments_note_id_owner_id_fkey"
+
+    op.execute("ALTER TABLE notes RENAME TO notes_old")
+    op.execute("ALTER TABLE notes_old RENAME CONSTRAINT notes_pkey TO notes_old_pkey")
+    op.create_table(
+        "notes",
+        # Même séquence que l'ancienne table : les ids continuent
+        sa.Column("id", sa.Integer(), server_default=sa.text("nextval('notes_id_seq'::regclass)"), nullable=False, autoincrement=False),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("content", sa.String(), nullable=False),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE", name="notes_owner_id_fkey"), nullable=False),
+        sa.Column("change_seq", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        **({"postgresql_partition_by": "HASH (owner_id)"} if partitions else {}),
+    )
+    for remainder in range(partitions):
+        op.execute(
+            f"CREATE TABLE notes_p{remainder} PARTITION OF notes "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+        )
+
+    # Copie avant la création des index : un tri par index plutôt qu'une insertion par ligne
+    op.execute(f"INSERT INTO notes ({COLUMNS}) SELECT {COLUMNS} FROM notes_old")
+    op.execute("ALTER SEQUENCE notes_id_seq OWNED BY notes.id")
+    op.drop_constraint(old_attachments_fk, "attachments", type_="foreignkey")
+    op.drop_table("notes_old")
+
+    op.create_primary_key("notes_pkey", "notes", ["id", "owner_id"] if partitions else ["id"])
+    op.create_index("ix_notes_id", "notes", ["id"])
+    op.create_index("ix_notes_title", "notes", ["title"])
+    op.create_index("ix_notes_owner_updated_id", "notes", ["owner_id", "updated_at", "id"])
+    op.create_index("ix_notes_owner_change_seq_id", "notes", ["owner_id", "change_seq", "id"])
+    # Même expression que app.models.search_document, sinon l'index n'est pas utilisé
+    op.create_index(
+        "ix_notes_search_document",
+        "notes",
+        [sa.text(f"to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(title, '') || ' ' || content)")],
+        postgresql_using="gin",
+    )
+    op.create_foreign_key(
+        attachments_fk,
+        "attachments",
+        "notes",
+        ["note_id", "owner_id"] if partitions else ["note_id"],
+        ["id", "owner_id"] if partitions else ["id"],
+        ondelete="CASCADE",
+    )
+    op.execute(f"COMMENT ON TABLE notes IS 'hash partitions: {partitions}'")
+    op.execute("ANALYZE notes")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql" and NOTES_PARTITIONS > 0 and not is_partitioned(bind):
+        rebuild_notes(NOTES_PARTITIONS)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql" and is_partitioned(bind):
+        rebuild_notes(0)
@@ -0,0 +1,28 @@
+"""Jetons d'accès révoqués, partagés entre workers jusqu'à leur expiration
+
+Revision ID: 0008_revoked_tokens
+Revises: 0007_notes_hash_partitions
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008_revoked_tokens"
+down_revision = "0007_notes_hash_partitions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "revoked_tokens",
+        sa.Column("digest", sa.String(64), primary_key=True),
+        sa.Column("expires_at", sa.Float(), nullable=False),
+        sa.Column("revoked_at", sa.Float(), nullable=False),
+    )
+    op.create_index("ix_revoked_tokens_expires_at", "revoked_tokens", ["expires_at"])
+    op.create_index("ix_revoked_tokens_revoked_at", "revoked_tokens", ["revoked_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("revoked_tokens")
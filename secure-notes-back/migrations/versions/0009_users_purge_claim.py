@@ -0,0 +1,25 @@
+"""Propriétaire de la purge d'un compte : un seul worker purge un compte à la fois
+
+Revision ID: 0009_users_purge_claim
+Revises: 0008_revoked_tokens
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009_users_purge_claim"
+down_revision = "0008_revoked_tokens"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("users") as batch:
+        batch.add_column(sa.Column("purge_owner", sa.String(32), nullable=True))
+        batch.add_column(sa.Column("purge_lease_until", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("purge_lease_until")
+        batch.drop_column("purge_owner")
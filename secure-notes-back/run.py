@@ -0,0 +1,59 @@
+"""Lance l'API avec uvicorn selon SERVER_MODE.
+
+- dev  : un seul processus avec rechargement automatique (équivalent de `fastapi dev`)
+- prod : WEB_CONCURRENCY workers, boucle uvloop, parseur httptools, sans rechargement
+
+Les migrations Alembic sont appliquées avant le lancement (RUN_MIGRATIONS=false pour les
+laisser à une étape de déploiement séparée).
+
+Usage (depuis secure-notes-back/) :
+    python run.py
+    SERVER_MODE=prod WEB_CONCURRENCY=4 python run.py
+"""
+from app.config import (
+    ACCESS_LOG, FORWARDED_ALLOW_IPS, GRACEFUL_SHUTDOWN_TIMEOUT, KEEP_ALIVE_TIMEOUT, MIGRATION_MAX_WAIT, RUN_MIGRATIONS,
+    SERVER_BACKLOG, SERVER_HOST, SERVER_MODE, SERVER_PORT, WEB_CONCURRENCY,
+)
+import logging
+import uvicorn
+
+SERVER_MODES = ("dev", "prod")
+
+
+def server_options(mode: str = SERVER_MODE) -> dict:
+    """Arguments passés à uvicorn.run pour le mode demandé"""
+    if mode not in SERVER_MODES:
+        raise ValueError(f"Unknown SERVER_MODE {mode!r}, expected one of {', '.join(SERVER_MODES)}")
+
+    options = {"host": SERVER_HOST, "port": SERVER_PORT}
+    if mode == "dev":
+        return {**options, "reload": True}
+
+    return {
+        **options,
+        "workers": max(1, WEB_CONCURRENCY),
+        "loop": "uvloop",
+        "http": "httptools",
+        "reload": False,
+        "timeout_keep_alive": KEEP_ALIVE_TIMEOUT,
+        "timeout_graceful_shutdown": GRACEFUL_SHUTDOWN_TIMEOUT,
+        "backlog": SERVER_BACKLOG,
+        "proxy_headers": True,
+        "forwarded_allow_ips": FORWARDED_ALLOW_IPS,
+        "access_log": ACCESS_LOG,
+    }
+
+
+def main() -> None:
+    options = server_options()
+    if RUN_MIGRATIONS:
+        # Migrations appliquées une seule fois avant de lancer les workers, qui démarrent
+        # ensuite sans attendre la base ni toucher au schéma
+        from app.migrate import upgrade_database
+        logging.basicConfig(level=logging.INFO)
+        upgrade_database(max_wait=MIGRATION_MAX_WAIT)
+    uvicorn.run("main:app", **options)
+
+
+if __name__ == "__main__":
+    main()
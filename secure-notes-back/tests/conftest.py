@@ -1,10 +1,20 @@
+import asyncio
 import pytest
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
 from fastapi import FastAPI
+from datetime import datetime
+from types import SimpleNamespace
 from unittest.mock import Mock, MagicMock
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool, StaticPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from app.routes.auth_routes import router as auth_router
 from app.routes.notes_routes import router as notes_router
 from app.routes.users_routes import router as users_router
+from app.constants import get_db
+from app.extensions import Base, enable_sqlite_foreign_keys, to_async_url
 from app.models import User, Note
 import os
 
@@ -28,6 +38,71 @@ def client(app):
 def mock_db():
     return Mock()
 
+@pytest.fixture
+def run_with_db():
+    """Exécute scenario(db) avec une AsyncSession sur une base SQLite en mémoire"""
+    def runner(scenario):
+        async def main():
+            engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+            enable_sqlite_foreign_keys(engine.sync_engine)
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            try:
+                async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                    return await scenario(db)
+            finally:
+                await engine.dispose()
+        return asyncio.run(main())
+    return runner
+
+@pytest.fixture
+def db_client(app, tmp_path):
+    """TestClient dont get_db pointe vers une base SQLite vierge contenant l'utilisateur de test"""
+    url = f"sqlite:///{tmp_path}/test.db"
+    sync_engine = create_engine(url)
+    enable_sqlite_foreign_keys(sync_engine)
+    Base.metadata.create_all(bind=sync_engine)
+    with Session(sync_engine) as session:
+        session.add(User(id=1, email="test@example.com", name="Test User", hashed_password="x"))
+        session.commit()
+
+    # NullPool : chaque requête ouvre sa connexion dans la boucle du TestClient
+    async_engine = create_async_engine(to_async_url(url), poolclass=NullPool)
+    enable_sqlite_foreign_keys(async_engine.sync_engine)
+    session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_get_db():
+        async with session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield SimpleNamespace(client=TestClient(app), engine=sync_engine, async_engine=async_engine)
+    app.dependency_overrides.pop(get_db, None)
+    sync_engine.dispose()
+    asyncio.run(async_engine.dispose())
+
+@pytest.fixture
+def sql_statements(db_client):
+    """Instructions SQL envoyées par l'application (db_client) pendant le test, vidables avec clear()"""
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(db_client.async_engine.sync_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(db_client.async_engine.sync_engine, "before_cursor_execute", record)
+
+@pytest.fixture
+def max_queries(sql_statements):
+    """with max_queries(n): échoue si le bloc envoie plus de n instructions SQL (N+1, relectures)"""
+    @contextmanager
+    def check(limit):
+        sql_statements.clear()
+        yield sql_statements
+        assert len(sql_statements) <= limit, (
+            f"{len(sql_statements)} queries, expected at most {limit}:\n" + "\n".join(sql_statements)
+        )
+    return check
+
 @pytest.fixture
 def mock_user():
     user = Mock(spec=User)
@@ -36,12 +111,9 @@ def mock_user():
     user.name = "Test User"
     user.hashed_password = "$2b$12$test_hash"
     user.is_email_verified = True
-    user.to_dict.return_value = {
-        "id": 1,
-        "email": "test@example.com", 
-        "name": "Test User",
-        "is_email_verified": True
-    }
+    user.deleting_at = None
+    user.created_at = datetime(2025, 1, 1)
+    user.updated_at = datetime(2025, 1, 1)
     return user
 
 @pytest.fixture
@@ -51,10 +123,6 @@ def mock_note():
     note.title = "Test Note"
     note.content = "Test Content"
     note.owner_id = 1
-    note.to_dict.return_value = {
-        "id": 1,
-        "title": "Test Note",
-        "content": "Test Content", 
-        "owner_id": 1
-    }
+    note.created_at = datetime(2025, 1, 1)
+    note.updated_at = datetime(2025, 1, 1)
     return note
\ No newline at end of file
@@ -0,0 +1,176 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.admission import AdmissionController, BucketBackend, DatabaseBuckets, MemoryBuckets, Rule
+from app.passwords import HashingOverloaded, PasswordHasher
+
+
+def controller(per_ip=Rule(1, 3), per_account=Rule(0.1, 2)):
+    return AdmissionController(MemoryBuckets(), per_ip=per_ip, per_account=per_account)
+
+@pytest.mark.unit
+class TestMemoryBuckets:
+
+    def test_burst_then_refill_at_rate(self):
+        # Arrange
+        buckets = MemoryBuckets()
+        rule = Rule(rate=2, burst=3)
+
+        async def scenario():
+            burst = [await buckets.take("k", rule, now=0.0) for _ in range(4)]
+            return burst, await buckets.take("k", rule, now=0.5)
+
+        # Act
+        burst, after_refill = asyncio.run(scenario())
+
+        # Assert
+        assert burst[:3] == [0.0, 0.0, 0.0]
+        assert burst[3] == pytest.approx(0.5)
+        assert after_refill == 0.0
+
+    def test_rejected_attempts_do_not_drain_the_bucket(self):
+        # Arrange
+        buckets = MemoryBuckets()
+        rule = Rule(rate=1, burst=1)
+
+        async def scenario():
+            await buckets.take("k", rule, now=0.0)
+            rejected = [await buckets.take("k", rule, now=0.5) for _ in range(10)]
+            return rejected, await buckets.take("k", rule, now=1.0)
+
+        # Act
+        rejected, later = asyncio.run(scenario())
+
+        # Assert
+        assert all(retry == pytest.approx(0.5) for retry in rejected)
+        assert later == 0.0
+
+    def test_key_count_is_bounded(self):
+        # Arrange
+        buckets = MemoryBuckets(max_keys=10)
+
+        # Act
+        for i in range(100):
+            asyncio.run(buckets.take(f"ip:{i}", Rule(1, 5)))
+
+        # Assert
+        assert len(buckets) == 10
+
+    def test_incomplete_backend_cannot_be_instantiated(self):
+        # Arrange
+        class TakeOnlyBuckets(BucketBackend):
+            async def take(self, key, rule, now=None):
+                return 0.0
+
+        # Act / Assert
+        with pytest.raises(TypeError):
+            TakeOnlyBuckets()
+
+@pytest.mark.database
+class TestDatabaseBuckets:
+
+    def test_shared_buckets_use_one_upsert_per_attempt(self, db_client, sql_statements):
+        # Arrange
+        buckets = DatabaseBuckets(async_sessionmaker(db_client.async_engine))
+        rule = Rule(rate=1, burst=2)
+
+        async def scenario():
+            attempts = [await buckets.take("login:ip:1.2.3.4", rule, now=100.0) for _ in range(3)]
+            return attempts, await buckets.take("login:ip:1.2.3.4", rule, now=101.0)
+
+        # Act
+        attempts, after_refill = asyncio.run(scenario())
+
+        # Assert
+        assert attempts[:2] == [0.0, 0.0]
+        assert attempts[2] == pytest.approx(1.0)
+        assert after_refill == 0.0
+        assert sum("ON CONFLICT" in statement for statement in sql_statements) == 4
+        assert not [statement for statement in sql_statements if statement.lstrip().startswith("SELECT")]
+
+@pytest.mark.auth
+class TestAdmissionController:
+
+    def test_ip_flood_is_rejected_with_retry_after(self, client):
+        # Arrange
+        with patch('app.routes.auth_routes.auth_admission', controller(per_ip=Rule(1, 3))), \
+             patch('app.routes.auth_routes.UserRepository', autospec=True) as mock_user_repo:
+            mock_user_repo.get_by_email.return_value = None
+
+            # Act
+            responses = [
+                client.post("/auth/login", json={"email": f"user{i}@example.com", "password": "x"})
+                for i in range(4)
+            ]
+
+        # Assert
+        assert [response.status_code for response in responses[:3]] == [200, 200, 200]
+        assert responses[3].status_code == 429
+        assert responses[3].headers["retry-after"] == "1"
+        # Refusée avant toute lecture de l'utilisateur
+        assert mock_user_repo.get_by_email.await_count == 3
+
+    def test_account_bucket_applies_across_ips(self, client):
+        # Arrange
+        admission = controller(per_ip=Rule(100, 100), per_account=Rule(0.1, 2))
+
+        async def attempts():
+            results = []
+            for ip in ("10.0.0.1", "10.0.0.2", "10.0.0.3"):
+                try:
+                    await admission.admit("login", ip, account="Victim@Example.com ")
+                    results.append(None)
+                except Exception as e:
+                    results.append(e)
+            return results
+
+        # Act
+        results = asyncio.run(attempts())
+
+        # Assert
+        assert results[:2] == [None, None]
+        assert results[2].status_code == 429
+        assert results[2].headers["Retry-After"] == "10"
+
+    def test_disabled_rule_never_rejects(self):
+        # Arrange
+        admission = controller(per_ip=Rule(0, 0), per_account=Rule(0, 0))
+
+        # Act / Assert
+        for _ in range(50):
+            asyncio.run(admission.admit("login", "10.0.0.1", account="a@example.com"))
+
+    @patch('app.routes.auth_routes.UserRepository', autospec=True)
+    @patch('app.routes.auth_routes.verify_password')
+    def test_full_hashing_queue_returns_503(self, mock_verify_pwd, mock_user_repo, client, mock_user):
+        # Arrange
+        mock_user_repo.get_by_email.return_value = mock_user
+        mock_verify_pwd.side_effect = HashingOverloaded(retry_after=2)
+
+        # Act
+        with patch('app.routes.auth_routes.auth_admission', controller()):
+            response = client.post("/auth/login", json={"email": "test@example.com", "password": "password"})
+
+        # Assert
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "2"
+
+@pytest.mark.auth
+class TestHashingQueueLimit:
+
+    def test_hashes_beyond_the_queue_are_rejected_immediately(self):
+        # Arrange
+        hasher = PasswordHasher("thread", max_workers=1, max_queue=1)
+
+        async def scenario():
+            return await asyncio.gather(*(hasher.hash("password") for _ in range(4)), return_exceptions=True)
+
+        # Act
+        results = asyncio.run(scenario())
+        hasher.shutdown()
+
+        # Assert
+        assert sum(isinstance(result, str) for result in results) == 2
+        assert sum(isinstance(result, HashingOverloaded) for result in results) == 2
+        assert hasher.stats()["rejected"] == 2
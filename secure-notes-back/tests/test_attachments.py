@@ -0,0 +1,271 @@
+import asyncio
+import hashlib
+import os
+import tracemalloc
+import pytest
+from functools import partial
+from unittest.mock import patch
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.requests import Request
+from app.attachments import receive_upload, sweep_deleted_blobs, sweep_orphan_blobs
+from app.blobs import BlobStore, LocalBlobStore
+from app.models import Attachment, Note, User
+
+UPLOAD_MEMORY_BYTES = int(os.getenv("UPLOAD_MEMORY_BYTES", str(64 * 1024 * 1024)))
+
+
+@pytest.fixture
+def store(tmp_path, db_client):
+    store = LocalBlobStore(str(tmp_path / "blobs"), chunk_size=64 * 1024)
+    # Le balayage d'après suppression ouvre sa session sur la base de test
+    sessions = async_sessionmaker(db_client.async_engine, expire_on_commit=False)
+    with patch('app.routes.notes_routes.attachment_store', store), \
+         patch('app.routes.notes_routes.AsyncSessionLocal', sessions):
+        yield store
+
+@pytest.fixture
+def notes(db_client):
+    """Une note de l'utilisateur de test (id 1) et une note d'un autre utilisateur"""
+    with Session(db_client.engine) as session:
+        session.add(User(id=2, email="other@example.com", name="Other", hashed_password="x"))
+        session.flush()
+        mine, other = Note(title="mine", content="c", owner_id=1), Note(title="other", content="c", owner_id=2)
+        session.add_all([mine, other])
+        session.commit()
+        return mine.id, other.id
+
+def upload(client, note_id, content, filename="report.pdf", content_type="application/pdf"):
+    return client.post(f"/notes/{note_id}/attachments", files={"file": (filename, content, content_type)})
+
+def blob_files(store):
+    return [name for _, _, files in os.walk(store.root) for name in files]
+
+def multipart_request(boundary: bytes, size: int, piece: int = 64 * 1024) -> Request:
+    """Requête dont le corps multipart (un fichier de size octets) est produit morceau par morceau"""
+    head = (
+        b"--" + boundary + b"\r\n"
+        b'Content-Disposition: form-data; name="file"; filename="big.bin"\r\n'
+        b"Content-Type: application/octet-stream\r\n\r\n"
+    )
+    tail = b"\r\n--" + boundary + b"--\r\n"
+    data = bytes(range(256)) * (piece // 256)
+
+    def body():
+        yield head
+        for low in range(0, size, piece):
+            yield data[:min(piece, size - low)]
+        yield tail
+
+    chunks = body()
+
+    async def receive():
+        chunk = next(chunks, None)
+        return {"type": "http.request", "body": chunk or b"", "more_body": chunk is not None}
+
+    headers = [(b"content-type", b"multipart/form-data; boundary=" + boundary)]
+    return Request({"type": "http", "method": "POST", "headers": headers}, receive)
+
+
+@pytest.mark.notes
+@pytest.mark.database
+class TestAttachments:
+
+    def test_upload_then_download_round_trips_the_file(self, db_client, store, notes):
+        # Arrange
+        mine, _ = notes
+        content = os.urandom(300_000)
+
+        # Act
+        created = upload(db_client.client, mine, content)
+        attachment = created.json()
+        listed = db_client.client.get(f"/notes/{mine}/attachments")
+        download = db_client.client.get(f"/notes/{mine}/attachments/{attachment['id']}")
+
+        # Assert
+        assert created.status_code == 201
+        assert attachment["filename"] == "report.pdf"
+        assert attachment["size"] == len(content)
+        assert attachment["sha256"] == hashlib.sha256(content).hexdigest()
+        assert [item["id"] for item in listed.json()] == [attachment["id"]]
+        assert download.status_code == 200
+        assert download.content == content
+        assert download.headers["etag"] == f'"{attachment["sha256"]}"'
+        assert download.headers["content-disposition"] == 'attachment; filename="report.pdf"'
+        assert download.headers["x-content-type-options"] == "nosniff"
+        assert download.headers["accept-ranges"] == "bytes"
+
+    def test_range_and_conditional_downloads(self, db_client, store, notes):
+        # Arrange
+        mine, _ = notes
+        content = bytes(range(256)) * 100
+        attachment = upload(db_client.client, mine, content).json()
+        url = f"/notes/{mine}/attachments/{attachment['id']}"
+        etag = f'"{attachment["sha256"]}"'
+
+        # Act
+        partial = db_client.client.get(url, headers={"Range": "bytes=100-199"})
+        suffix = db_client.client.get(url, headers={"Range": "bytes=-10"})
+        stale_if_range = db_client.client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+        unsatisfiable = db_client.client.get(url, headers={"Range": f"bytes={len(content)}-"})
+        revalidated = db_client.client.get(url, headers={"If-None-Match": etag})
+
+        # Assert
+        assert partial.status_code == 206
+        assert partial.headers["content-range"] == f"bytes 100-199/{len(content)}"
+        assert partial.content == content[100:200]
+        assert suffix.content == content[-10:]
+        assert stale_if_range.status_code == 200
+        assert len(stale_if_range.content) == len(content)
+        assert unsatisfiable.status_code == 416
+        assert revalidated.status_code == 304
+
+    def test_identical_contents_are_stored_once(self, db_client, store, notes):
+        # Arrange
+        mine, _ = notes
+        content = b"same bytes" * 1000
+
+        # Act
+        first = upload(db_client.client, mine, content, filename="a.txt").json()
+        second = upload(db_client.client, mine, content, filename="b.txt").json()
+        stored = blob_files(store)
+        db_client.client.delete(f"/notes/{mine}/attachments/{first['id']}")
+        still_referenced = blob_files(store)
+        db_client.client.delete(f"/notes/{mine}/attachments/{second['id']}")
+        within_grace = blob_files(store)
+
+        async def sweep():
+            async with async_sessionmaker(db_client.async_engine)() as db:
+                return await sweep_orphan_blobs(db, store, grace=-1)
+
+        swept = asyncio.run(sweep())
+
+        # Assert
+        assert first["sha256"] == second["sha256"]
+        assert stored == [first["sha256"]]
+        assert still_referenced == stored
+        assert within_grace == stored
+        assert swept == 1
+        assert blob_files(store) == []
+
+    def test_deleted_contents_are_swept_after_the_response_with_their_own_session(self, db_client, store, notes):
+        # Arrange
+        mine, _ = notes
+        attachment = upload(db_client.client, mine, b"bytes" * 100).json()
+        sessions = async_sessionmaker(db_client.async_engine, expire_on_commit=False)
+        opened = []
+
+        def session_factory():
+            opened.append(True)
+            return sessions()
+
+        # Act
+        with patch('app.routes.notes_routes.AsyncSessionLocal', session_factory), \
+             patch('app.routes.notes_routes.sweep_deleted_blobs', partial(sweep_deleted_blobs, grace=-1)):
+            response = db_client.client.delete(f"/notes/{mine}/attachments/{attachment['id']}")
+
+        # Assert
+        assert response.status_code == 200
+        assert opened == [True]
+        assert blob_files(store) == []
+
+    def test_attachments_follow_note_ownership(self, db_client, store, notes):
+        # Arrange
+        mine, other = notes
+        with Session(db_client.engine) as session:
+            session.add(Attachment(note_id=other, owner_id=2, filename="x", content_type="text/plain", size=1, sha256="0" * 64))
+            session.commit()
+            foreign_id = session.query(Attachment.id).scalar()
+
+        # Act
+        upload_foreign = upload(db_client.client, other, b"data")
+        list_foreign = db_client.client.get(f"/notes/{other}/attachments")
+        download_foreign = db_client.client.get(f"/notes/{other}/attachments/{foreign_id}")
+        download_through_mine = db_client.client.get(f"/notes/{mine}/attachments/{foreign_id}")
+        delete_foreign = db_client.client.delete(f"/notes/{other}/attachments/{foreign_id}")
+
+        # Assert
+        assert upload_foreign.status_code == 404
+        assert list_foreign.json() == []
+        assert download_foreign.status_code == 404
+        assert download_through_mine.status_code == 404
+        assert delete_foreign.status_code == 404
+        assert blob_files(store) == []
+
+    def test_oversized_and_malformed_uploads_are_rejected(self, db_client, store, notes):
+        # Arrange
+        mine, _ = notes
+
+        # Act
+        with patch('app.routes.notes_routes.ATTACHMENT_MAX_SIZE', 1000):
+            too_large = upload(db_client.client, mine, b"x" * 20_000)
+        not_multipart = db_client.client.post(f"/notes/{mine}/attachments", content=b"raw", headers={"Content-Type": "application/pdf"})
+        without_file = db_client.client.post(
+            f"/notes/{mine}/attachments",
+            content=b'--b\r\nContent-Disposition: form-data; name="title"\r\n\r\nno file\r\n--b--\r\n',
+            headers={"Content-Type": "multipart/form-data; boundary=b"},
+        )
+
+        # Assert
+        assert too_large.status_code == 413
+        assert not_multipart.status_code == 400
+        assert without_file.status_code == 400
+        assert without_file.json() == {"message": "No file in the multipart body"}
+        assert blob_files(store) == []
+
+    def test_deleting_a_note_cascades_to_its_attachments(self, db_client, store, notes):
+        # Arrange
+        mine, _ = notes
+        upload(db_client.client, mine, b"cascade")
+
+        # Act
+        db_client.client.delete(f"/notes/{mine}")
+        with Session(db_client.engine) as session:
+            remaining = session.query(Attachment).count()
+
+        async def sweep():
+            async with async_sessionmaker(db_client.async_engine)() as db:
+                return await sweep_orphan_blobs(db, store, grace=-1)
+
+        swept = asyncio.run(sweep())
+
+        # Assert
+        assert remaining == 0
+        assert swept == 1
+
+
+@pytest.mark.notes
+@pytest.mark.unit
+class TestStreamingUpload:
+
+    def test_upload_memory_does_not_depend_on_file_size(self, tmp_path):
+        # Arrange
+        store = LocalBlobStore(str(tmp_path), chunk_size=1024 * 1024)
+        request = multipart_request(b"bench-boundary", UPLOAD_MEMORY_BYTES)
+
+        async def scenario():
+            tracemalloc.start()
+            try:
+                result = await receive_upload(request, store, max_size=UPLOAD_MEMORY_BYTES)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            return result, peak
+
+        # Act
+        result, peak = asyncio.run(scenario())
+
+        # Assert : un bloc d'écriture et un morceau reçu, pas le fichier
+        assert result.size == UPLOAD_MEMORY_BYTES
+        assert os.path.getsize(store.path(result.key)) == UPLOAD_MEMORY_BYTES
+        assert peak < 8 * 1024 * 1024
+
+    def test_incomplete_blob_store_cannot_be_instantiated(self, tmp_path):
+        # Arrange
+        class ReadOnlyStore(BlobStore):
+            def path(self, key):
+                return str(tmp_path / key)
+
+        # Act / Assert
+        with pytest.raises(TypeError):
+            ReadOnlyStore()
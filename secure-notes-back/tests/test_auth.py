@@ -5,7 +5,7 @@ from datetime import datetime, timedelta
 @pytest.mark.auth
 class TestAuthRoutes:
     
-    @patch('app.routes.auth_routes.UserRepository')
+    @patch('app.routes.auth_routes.UserRepository', autospec=True)
     @patch('app.routes.auth_routes.get_db')
     @patch('app.routes.auth_routes.verify_password')
     @patch('app.routes.auth_routes.create_access_token')
@@ -26,7 +26,31 @@ class TestAuthRoutes:
         assert response.status_code == 200
         assert response.json()["message"] == "Login successful"
 
-    @patch('app.routes.auth_routes.UserRepository')
+    @patch('app.routes.auth_routes.UserRepository', autospec=True)
+    @patch('app.routes.auth_routes.verify_password')
+    @patch('app.routes.auth_routes.get_password_hash')
+    @patch('app.routes.auth_routes.needs_rehash')
+    def test_login_rehashes_outdated_password(self, mock_needs_rehash, mock_hash_pwd, mock_verify_pwd,
+                                              mock_user_repo, client, mock_user):
+        # Arrange
+        mock_user_repo.get_by_email.return_value = mock_user
+        mock_verify_pwd.return_value = True
+        mock_needs_rehash.return_value = True
+        mock_hash_pwd.return_value = "$2b$13$new_hash"
+
+        # Act
+        response = client.post("/auth/login", json={
+            "email": "test@example.com",
+            "password": "password"
+        })
+
+        # Assert
+        assert response.status_code == 200
+        mock_hash_pwd.assert_awaited_once_with("password")
+        mock_user_repo.update.assert_awaited_once()
+        assert mock_user.hashed_password == "$2b$13$new_hash"
+
+    @patch('app.routes.auth_routes.UserRepository', autospec=True)
     @patch('app.routes.auth_routes.get_db')
     def test_login_invalid_credentials(self, mock_get_db, mock_user_repo, client):
         # Arrange
@@ -50,7 +74,7 @@ class TestAuthRoutes:
         assert response_data[0]["error"] == "Invalid credentials"
         assert response_data[1] == 401
 
-    @patch('app.routes.auth_routes.UserRepository')
+    @patch('app.routes.auth_routes.UserRepository', autospec=True)
     @patch('app.routes.auth_routes.get_db')
     @patch('app.routes.auth_routes.get_password_hash')
     @patch('app.routes.auth_routes.generate_verification_token')
@@ -76,7 +100,7 @@ class TestAuthRoutes:
         assert response.status_code == 201
         assert response.json()["message"] == "User registered successfully"
 
-    @patch('app.routes.auth_routes.UserRepository')
+    @patch('app.routes.auth_routes.UserRepository', autospec=True)
     @patch('app.routes.auth_routes.get_db')
     def test_register_email_already_exists(self, mock_get_db, mock_user_repo, client, mock_user):
         # Arrange
@@ -111,7 +135,7 @@ class TestAuthRoutes:
 
     @patch('app.routes.auth_routes.verify_email_token')
     @patch('app.routes.auth_routes.jwt.decode')
-    @patch('app.routes.auth_routes.UserRepository')
+    @patch('app.routes.auth_routes.UserRepository', autospec=True)
     @patch('app.routes.auth_routes.get_db')
     def test_verify_email_success(self, mock_get_db, mock_user_repo, mock_jwt_decode, 
                                  mock_verify_token, client, mock_user):
@@ -0,0 +1,87 @@
+import json
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models import User, Note
+from app.search import search_index
+
+
+def notes_of(engine, owner_id=1):
+    with Session(engine) as session:
+        return session.scalars(select(Note).where(Note.owner_id == owner_id).order_by(Note.id)).all()
+
+@pytest.mark.notes
+@pytest.mark.database
+class TestBatchAndImport:
+
+    @pytest.fixture(autouse=True)
+    def fresh_index(self):
+        search_index.clear()
+        yield
+        search_index.clear()
+
+    def test_batch_creates_updates_and_deletes_in_one_call(self, db_client):
+        # Arrange
+        with Session(db_client.engine) as session:
+            session.add(User(id=2, email="other@example.com", name="Other", hashed_password="x"))
+            session.add_all([
+                Note(id=10, title="a", content="a", owner_id=1),
+                Note(id=11, title="b", content="b", owner_id=1),
+                Note(id=20, title="foreign", content="x", owner_id=2),
+            ])
+            session.commit()
+
+        # Act
+        response = db_client.client.post("/notes/batch", json={
+            "create": [{"title": "new", "content": "n1"}, {"content": "n2"}],
+            "update": [{"id": 10, "content": "a2"}, {"id": 20, "content": "stolen"}],
+            "delete": [11, 20, 999],
+        })
+
+        # Assert
+        body = response.json()
+        assert response.status_code == 200
+        assert len(body["created"]) == 2
+        assert body["updated"] == [10]
+        assert body["deleted"] == [11]
+        assert {(error["op"], error["id"]) for error in body["errors"]} == {("update", 20), ("delete", 20), ("delete", 999)}
+        assert [(note.id, note.content) for note in notes_of(db_client.engine)] == [(10, "a2")] + [
+            (note_id, content) for note_id, content in zip(body["created"], ["n1", "n2"])
+        ]
+        assert [note.content for note in notes_of(db_client.engine, owner_id=2)] == ["x"]
+
+    def test_import_ndjson_stream_reports_invalid_lines(self, db_client):
+        # Arrange
+        lines = [json.dumps({"title": f"t{i}", "content": f"c{i}"}) for i in range(5)]
+        lines.insert(2, "{not json")
+        lines.insert(4, json.dumps({"title": "missing content"}))
+        body = ("\n".join(lines) + "\n").encode()
+
+        # Act
+        response = db_client.client.post(
+            "/notes/import", content=body, headers={"Content-Type": "application/x-ndjson"}
+        )
+
+        # Assert
+        report = response.json()
+        assert response.status_code == 201
+        assert report["created"] == 5
+        assert report["error_count"] == 2
+        assert [error["index"] for error in report["errors"]] == [2, 4]
+        assert [note.title for note in notes_of(db_client.engine)] == [f"t{i}" for i in range(5)]
+
+    def test_import_json_array(self, db_client):
+        # Act
+        response = db_client.client.post("/notes/import", json=[{"title": "a", "content": "b"}] * 3)
+
+        # Assert
+        assert response.status_code == 201
+        assert response.json()["created"] == 3
+        assert len(notes_of(db_client.engine)) == 3
+
+    def test_import_rejects_non_array_json(self, db_client):
+        # Act
+        response = db_client.client.post("/notes/import", json={"title": "a", "content": "b"})
+
+        # Assert
+        assert response.status_code == 400
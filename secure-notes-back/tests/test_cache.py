@@ -0,0 +1,56 @@
+import pytest
+from unittest.mock import patch
+from app.cache import TTLCache
+
+@pytest.mark.unit
+class TestTTLCache:
+
+    def test_get_returns_stored_value(self):
+        # Arrange
+        cache = TTLCache(max_size=2, ttl=60)
+
+        # Act
+        cache.set("a", 1)
+
+        # Assert
+        assert cache.get("a") == 1
+        assert cache.get("missing") is None
+
+    def test_entries_expire_after_ttl(self):
+        # Arrange
+        cache = TTLCache(max_size=2, ttl=10)
+        with patch('app.cache.time.monotonic', return_value=100.0):
+            cache.set("a", 1)
+
+        # Act
+        with patch('app.cache.time.monotonic', return_value=111.0):
+            value = cache.get("a")
+
+        # Assert
+        assert value is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_entry_is_evicted(self):
+        # Arrange
+        cache = TTLCache(max_size=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+
+        # Act
+        cache.set("c", 3)
+
+        # Assert
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_zero_size_disables_cache(self):
+        # Arrange
+        cache = TTLCache(max_size=0, ttl=60)
+
+        # Act
+        cache.set("a", 1)
+
+        # Assert
+        assert cache.get("a") is None
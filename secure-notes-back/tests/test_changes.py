@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import text
+from app.search import search_index
+
+
+def sync(client, since=None, limit=None):
+    params = {key: value for key, value in (("since", since), ("limit", limit)) if value is not None}
+    response = client.get("/notes/changes", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+@pytest.mark.notes
+@pytest.mark.database
+class TestNoteChanges:
+
+    @pytest.fixture(autouse=True)
+    def fresh_index(self):
+        search_index.clear()
+        yield
+        search_index.clear()
+
+    def test_sync_returns_only_changes_since_cursor_with_tombstones(self, db_client):
+        # Arrange
+        created = db_client.client.post("/notes/batch", json={"create": [{"title": f"t{i}", "content": f"c{i}"} for i in range(5)]}).json()["created"]
+        initial = sync(db_client.client)
+
+        # Act
+        db_client.client.put(f"/notes/{created[0]}", json={"title": "t0", "content": "modifiée", "owner_id": 1})
+        db_client.client.delete(f"/notes/{created[1]}")
+        db_client.client.post("/notes/batch", json={"create": [{"content": "nouvelle"}], "delete": [created[2]]})
+        delta = sync(db_client.client, since=initial["cursor"])
+        caught_up = sync(db_client.client, since=delta["cursor"])
+
+        # Assert
+        assert [change["id"] for change in initial["changes"]] == created
+        assert [(change["id"], change["deleted"]) for change in delta["changes"]] == [
+            (created[0], False), (created[1], True), (created[-1] + 1, False), (created[2], True),
+        ]
+        assert delta["changes"][0]["content"] == "modifiée"
+        assert caught_up["changes"] == [] and caught_up["cursor"] == delta["cursor"]
+
+    def test_changes_are_paginated(self, db_client):
+        # Arrange
+        db_client.client.post("/notes/batch", json={"create": [{"content": f"c{i}"} for i in range(7)]})
+
+        # Act
+        pages, cursor = [], None
+        while True:
+            page = sync(db_client.client, since=cursor, limit=3)
+            pages.append([change["content"] for change in page["changes"]])
+            cursor = page["cursor"]
+            if not page["has_more"]:
+                break
+
+        # Assert
+        assert pages == [["c0", "c1", "c2"], ["c3", "c4", "c5"], ["c6"]]
+
+    def test_invalid_cursor_is_rejected(self, db_client):
+        # Act
+        response = db_client.client.get("/notes/changes", params={"since": "%%%"})
+
+        # Assert
+        assert response.status_code == 400
+
+    def test_change_query_uses_the_change_index(self, db_client):
+        # Act
+        with db_client.engine.connect() as conn:
+            plan = " ".join(str(row) for row in conn.execute(text(
+                "EXPLAIN QUERY PLAN SELECT * FROM notes WHERE owner_id = 1 AND (change_seq, id) > (5, 0) "
+                "ORDER BY change_seq, id LIMIT 100"
+            )))
+
+        # Assert
+        assert "ix_notes_owner_change_seq_id" in plan
@@ -0,0 +1,103 @@
+import pytest
+from types import SimpleNamespace
+from sqlalchemy.orm import Session
+from app.conditional import not_modified, note_etag
+from app.models import Note
+
+
+def make_request(**headers):
+    return SimpleNamespace(headers={name.replace("_", "-"): value for name, value in headers.items()})
+
+def add_notes(engine, count):
+    with Session(engine) as session:
+        notes = [Note(title=f"t{i}", content="lorem ipsum " * 200, owner_id=1) for i in range(count)]
+        session.add_all(notes)
+        session.commit()
+        return [note.id for note in notes]
+
+@pytest.mark.unit
+class TestValidators:
+
+    def test_if_none_match_accepts_lists_weak_tags_and_wildcard(self):
+        # Arrange
+        etag = note_etag(1, None)
+
+        # Act / Assert
+        assert not_modified(make_request(if_none_match=f'"other", {etag}'), etag)
+        assert not_modified(make_request(if_none_match=f"W/{etag}"), etag)
+        assert not_modified(make_request(if_none_match="*"), etag)
+        assert not not_modified(make_request(if_none_match='"other"'), etag)
+
+    def test_if_none_match_takes_precedence_over_if_modified_since(self):
+        # Arrange
+        etag = note_etag(1, None)
+        request = make_request(if_none_match='"other"', if_modified_since="Fri, 01 Jan 2100 00:00:00 GMT")
+
+        # Act / Assert
+        assert not not_modified(request, etag, last_modified=None)
+
+@pytest.mark.notes
+@pytest.mark.database
+class TestConditionalNoteReads:
+
+    def test_unchanged_note_is_revalidated_without_loading_content(self, db_client, sql_statements):
+        # Arrange
+        note_id = add_notes(db_client.engine, 1)[0]
+        first = db_client.client.get(f"/notes/{note_id}")
+        sql_statements.clear()
+
+        # Act
+        revalidated = db_client.client.get(f"/notes/{note_id}", headers={"If-None-Match": first.headers["ETag"]})
+
+        # Assert
+        assert first.status_code == 200
+        assert first.headers["Cache-Control"] == "private, no-cache"
+        assert "Last-Modified" in first.headers
+        assert revalidated.status_code == 304
+        assert revalidated.content == b"" and len(first.content) > 2000
+        assert revalidated.headers["ETag"] == first.headers["ETag"]
+        assert len(sql_statements) == 1 and "content" not in sql_statements[0]
+
+    def test_modified_note_gets_a_new_etag(self, db_client):
+        # Arrange
+        note_id = add_notes(db_client.engine, 1)[0]
+        etag = db_client.client.get(f"/notes/{note_id}").headers["ETag"]
+        db_client.client.put(f"/notes/{note_id}", json={"title": "t", "content": "changé", "owner_id": 1})
+
+        # Act
+        response = db_client.client.get(f"/notes/{note_id}", headers={"If-None-Match": etag})
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json()["content"] == "changé"
+        assert response.headers["ETag"] != etag
+
+    def test_if_modified_since_answers_304(self, db_client):
+        # Arrange
+        note_id = add_notes(db_client.engine, 1)[0]
+        last_modified = db_client.client.get(f"/notes/{note_id}").headers["Last-Modified"]
+
+        # Act
+        response = db_client.client.get(f"/notes/{note_id}", headers={"If-Modified-Since": last_modified})
+
+        # Assert
+        assert response.status_code == 304
+
+    def test_unchanged_page_is_revalidated_on_versions_only(self, db_client, sql_statements):
+        # Arrange
+        add_notes(db_client.engine, 30)
+        first = db_client.client.get("/notes/user_id/1?limit=20")
+        sql_statements.clear()
+
+        # Act
+        revalidated = db_client.client.get("/notes/user_id/1?limit=20", headers={"If-None-Match": first.headers["ETag"]})
+        statements = list(sql_statements)
+        add_notes(db_client.engine, 1)
+        changed = db_client.client.get("/notes/user_id/1?limit=20", headers={"If-None-Match": first.headers["ETag"]})
+
+        # Assert
+        assert first.status_code == 200 and len(first.json()) == 20
+        assert revalidated.status_code == 304 and revalidated.content == b""
+        assert not any("notes.content" in statement for statement in statements)
+        assert changed.status_code == 200
+        assert changed.headers["ETag"] != first.headers["ETag"]
@@ -0,0 +1,176 @@
+import asyncio
+import base64
+import os
+import pytest
+from unittest.mock import patch
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from sqlalchemy import select
+from app.crypto import FIELD_PREFIX, NoteCipher, parse_master_key
+from app.models import User, Note
+from app.repositories import NoteRepository
+from app.search import search_index
+
+
+@pytest.fixture
+def cipher():
+    """Chiffrement activé avec une clé maître de test, injecté dans NoteRepository"""
+    note_cipher = NoteCipher(os.urandom(32), cache_size=16, cache_ttl=60)
+    with patch('app.repositories.note_cipher', note_cipher):
+        yield note_cipher
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    search_index.clear()
+    yield
+    search_index.clear()
+
+async def add_owner(db, email="a@example.com"):
+    owner = User(email=email, name="A", hashed_password="x")
+    db.add(owner)
+    await db.commit()
+    return owner.id
+
+async def stored(db, note_id):
+    """Valeurs réellement enregistrées en base"""
+    return (await db.execute(select(Note.title, Note.content).where(Note.id == note_id))).one()
+
+@pytest.mark.unit
+class TestNoteCipherFields:
+
+    def test_field_round_trip_is_bound_to_owner_and_field(self):
+        # Arrange
+        aead = AESGCM(AESGCM.generate_key(bit_length=256))
+
+        # Act
+        encrypted = NoteCipher.encrypt_field(aead, 1, "content", "secret")
+
+        # Assert
+        assert encrypted.startswith(FIELD_PREFIX)
+        assert NoteCipher.decrypt_field(aead, 1, "content", encrypted) == "secret"
+        with pytest.raises(InvalidTag):
+            NoteCipher.decrypt_field(aead, 2, "content", encrypted)
+        with pytest.raises(InvalidTag):
+            NoteCipher.decrypt_field(aead, 1, "title", encrypted)
+
+    def test_plaintext_values_are_returned_unchanged(self):
+        # Act / Assert
+        assert NoteCipher.decrypt_field(None, 1, "content", "note d'avant le chiffrement") == "note d'avant le chiffrement"
+        assert NoteCipher.decrypt_field(None, 1, "title", None) is None
+
+    def test_master_key_must_be_32_base64_bytes(self):
+        # Act / Assert
+        assert parse_master_key("") is None
+        assert len(parse_master_key(base64.b64encode(os.urandom(32)).decode())) == 32
+        with pytest.raises(ValueError):
+            parse_master_key(base64.b64encode(os.urandom(16)).decode())
+
+@pytest.mark.notes
+@pytest.mark.database
+class TestEncryptedNoteRepository:
+
+    def test_notes_are_stored_encrypted_and_read_in_clear(self, run_with_db, cipher):
+        async def scenario(db):
+            owner_id = await add_owner(db)
+            note = await NoteRepository.create(db, Note(title="Titre", content="Contenu secret", owner_id=owner_id))
+            db.expunge_all()
+            read = await NoteRepository.get_by_id(db, note_id=note.id)
+            return note, read, await stored(db, note.id), db.dirty
+
+        # Act
+        created, read, (raw_title, raw_content), dirty = run_with_db(scenario)
+
+        # Assert
+        assert (created.title, created.content) == ("Titre", "Contenu secret")
+        assert (read.title, read.content) == ("Titre", "Contenu secret")
+        assert raw_title.startswith(FIELD_PREFIX) and raw_content.startswith(FIELD_PREFIX)
+        assert "secret" not in raw_content
+        # Le clair n'est jamais réécrit en base par un flush
+        assert not dirty
+
+    def test_update_and_bulk_operations_encrypt_values(self, run_with_db, cipher):
+        async def scenario(db):
+            owner_id = await add_owner(db)
+            ids = await NoteRepository.insert_many(db, owner_id, [{"title": None, "content": f"note {i}"} for i in range(3)])
+            await NoteRepository.update_many(db, owner_id, [{"id": ids[0], "content": "modifiée"}])
+            await db.commit()
+            await NoteRepository.update(db, Note(id=ids[1], title="T", content="remplacée", owner_id=owner_id))
+            db.expunge_all()
+            page = await NoteRepository.get_by_user_id(db, user_id=owner_id, limit=10)
+            return page, [await stored(db, note_id) for note_id in ids]
+
+        # Act
+        page, raw = run_with_db(scenario)
+
+        # Assert
+        assert sorted(note.content for note in page) == ["modifiée", "note 2", "remplacée"]
+        assert all(content.startswith(FIELD_PREFIX) for _, content in raw)
+        assert [title is None for title, _ in raw] == [True, False, True]
+
+    def test_search_works_on_encrypted_notes(self, run_with_db, cipher):
+        async def scenario(db):
+            owner_id = await add_owner(db)
+            await NoteRepository.insert_many(db, owner_id, [{"title": "Courses", "content": "acheter des pommes"}])
+            await db.commit()
+            search_index.clear()
+            return await NoteRepository.search(db, owner_id=owner_id, query="pommes", limit=10)
+
+        # Act
+        results = run_with_db(scenario)
+
+        # Assert
+        assert [note.content for note, _ in results] == ["acheter des pommes"]
+
+    def test_legacy_plaintext_notes_stay_readable(self, run_with_db, cipher):
+        async def scenario(db):
+            owner_id = await add_owner(db)
+            db.add(Note(title="Ancienne", content="en clair", owner_id=owner_id))
+            await db.commit()
+            db.expunge_all()
+            return await NoteRepository.get_by_user_id(db, user_id=owner_id, limit=10), await db.get(User, owner_id)
+
+        # Act
+        notes, owner = run_with_db(scenario)
+
+        # Assert
+        assert [note.content for note in notes] == ["en clair"]
+        # Une simple lecture ne crée pas de clé de données
+        assert owner.wrapped_data_key is None
+
+    def test_data_key_is_cached_only_after_commit(self, run_with_db, cipher):
+        async def scenario(db):
+            owner_id = await add_owner(db)
+            await cipher.data_key(db, owner_id)
+            await db.rollback()
+            cached_after_rollback = cipher._keys.get(owner_id)
+            aead = await cipher.data_key(db, owner_id)
+            await db.commit()
+            return cached_after_rollback, aead, cipher._keys.get(owner_id), await db.get(User, owner_id)
+
+        # Act
+        after_rollback, aead, cached, owner = run_with_db(scenario)
+
+        # Assert
+        assert after_rollback is None
+        assert cached is aead
+        assert owner.wrapped_data_key.startswith("v1:")
+
+    def test_large_batches_are_decrypted_on_a_thread(self, run_with_db, cipher):
+        # Arrange
+        cipher.thread_threshold = 10
+
+        async def scenario(db):
+            owner_id = await add_owner(db)
+            await NoteRepository.insert_many(db, owner_id, [{"title": f"t{i}", "content": f"c{i}"} for i in range(50)])
+            await db.commit()
+            db.expunge_all()
+            with patch.object(asyncio.get_running_loop(), "run_in_executor", wraps=asyncio.get_running_loop().run_in_executor) as executor:
+                notes = await NoteRepository.get_by_user_id(db, user_id=owner_id, limit=50)
+            return notes, executor.call_count
+
+        # Act
+        notes, executor_calls = run_with_db(scenario)
+
+        # Assert
+        assert sorted(note.content for note in notes) == sorted(f"c{i}" for i in range(50))
+        assert executor_calls == 1
@@ -0,0 +1,216 @@
+import asyncio
+import gc
+import gzip
+import json
+import os
+import pytest
+from functools import partial
+from unittest.mock import patch
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.constants import EXPORT_BATCH_SIZE, get_db
+from app.export import accepts_encoding, export_notes_ndjson
+from app.extensions import Base, to_async_url
+from app.models import User, Note
+
+EXPORT_MEMORY_NOTES = int(os.getenv("EXPORT_MEMORY_NOTES", "500000"))
+
+
+def proc_status_kib(field: str) -> int:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+async def seed(db, notes):
+    owner = User(email="a@example.com", name="A", hashed_password="x")
+    other = User(email="b@example.com", name="B", hashed_password="x")
+    db.add_all([owner, other])
+    await db.commit()
+    for low in range(0, notes, 50_000):
+        await db.execute(insert(Note), [
+            {"title": f"Note {i}", "content": "lorem ipsum dolor sit amet " * 4, "owner_id": owner.id}
+            for i in range(low, min(low + 50_000, notes))
+        ])
+    await db.execute(insert(Note), [{"title": "other", "content": "hidden", "owner_id": other.id}])
+    await db.commit()
+    return owner.id
+
+
+async def collect(owner_id, db, **kwargs):
+    session_factory = async_sessionmaker(db.bind, expire_on_commit=False)
+    return b"".join([chunk async for chunk in export_notes_ndjson(owner_id, session_factory=session_factory, **kwargs)])
+
+@pytest.mark.notes
+class TestNotesExport:
+
+    @pytest.mark.database
+    def test_export_streams_only_owner_notes_as_ndjson(self, run_with_db):
+        async def scenario(db):
+            owner_id = await seed(db, 5)
+            return await collect(owner_id, db, batch_size=2), await collect(owner_id, db, compress=True, batch_size=2)
+
+        # Act
+        plain, compressed = run_with_db(scenario)
+
+        # Assert
+        lines = [json.loads(line) for line in plain.decode().splitlines()]
+        assert [line["title"] for line in lines] == [f"Note {i}" for i in range(5)]
+        assert gzip.decompress(compressed) == plain
+
+    @pytest.mark.unit
+    def test_accepts_encoding_follows_quality_values(self):
+        # Assert
+        assert accepts_encoding("gzip, deflate", "gzip")
+        assert accepts_encoding("br, *", "gzip")
+        assert not accepts_encoding("identity", "gzip")
+        assert not accepts_encoding("gzip;q=0, *", "gzip")
+        assert not accepts_encoding("", "gzip")
+
+    @patch('app.routes.notes_routes.export_notes_ndjson')
+    @patch('app.routes.notes_routes.NoteRepository', autospec=True)
+    def test_export_answers_304_when_etag_matches(self, mock_note_repo, mock_export, client):
+        # Arrange
+        async def chunks(*args, **kwargs):
+            yield b""
+        mock_note_repo.get_collection_version.return_value = (0, None, None)
+        mock_export.side_effect = chunks
+        etag = client.get("/notes/export").headers["ETag"]
+        mock_export.reset_mock()
+
+        # Act
+        response = client.get("/notes/export", headers={"If-None-Match": etag})
+
+        # Assert
+        assert response.status_code == 304
+        assert response.content == b""
+        mock_export.assert_not_called()
+
+    @patch('app.routes.notes_routes.export_notes_ndjson')
+    @patch('app.routes.notes_routes.NoteRepository', autospec=True)
+    def test_export_streams_response(self, mock_note_repo, mock_export, client):
+        # Arrange
+        async def chunks(*args, **kwargs):
+            yield b'{"id": 1}\n'
+            yield b'{"id": 2}\n'
+        mock_note_repo.get_collection_version.return_value = (EXPORT_BATCH_SIZE + 1, None, 2)
+        mock_export.side_effect = chunks
+
+        # Act
+        response = client.get("/notes/export", headers={"Accept-Encoding": "identity"})
+
+        # Assert : plusieurs lots, la taille n'est pas connue d'avance
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert response.headers["cache-control"] == "private, no-cache"
+        assert "content-length" not in response.headers
+        assert response.content.splitlines() == [b'{"id": 1}', b'{"id": 2}']
+
+    @patch('app.routes.notes_routes.export_notes_ndjson')
+    @patch('app.routes.notes_routes.NoteRepository', autospec=True)
+    def test_export_negotiates_gzip_and_sizes_small_exports(self, mock_note_repo, mock_export, client):
+        # Arrange
+        body = b'{"id": 1}\n'
+
+        async def chunks(owner_id, compress=False):
+            yield gzip.compress(body) if compress else body
+        mock_note_repo.get_collection_version.return_value = (1, None, 1)
+        mock_export.side_effect = chunks
+
+        # Act
+        responses = {
+            accept: client.get("/notes/export", headers={"Accept-Encoding": accept})
+            for accept in ("gzip, deflate", "br, *", "identity", "gzip;q=0, identity")
+        }
+        refused = client.get("/notes/export?gzip=false", headers={"Accept-Encoding": "gzip"})
+
+        # Assert
+        encodings = {accept: response.headers.get("content-encoding") for accept, response in responses.items()}
+        assert encodings == {"gzip, deflate": "gzip", "br, *": "gzip", "identity": None, "gzip;q=0, identity": None}
+        assert refused.headers.get("content-encoding") is None
+        assert all(response.content == body for response in [*responses.values(), refused])
+        assert all(response.headers["vary"] == "Accept-Encoding" for response in responses.values())
+        assert responses["identity"].headers["content-length"] == str(len(body))
+        assert responses["gzip, deflate"].headers["content-length"] == str(len(gzip.compress(body)))
+        assert responses["gzip, deflate"].headers["etag"] != responses["identity"].headers["etag"]
+
+    @pytest.mark.slow
+    @pytest.mark.database
+    def test_export_peak_rss_stays_bounded(self, app, tmp_path):
+        # Arrange : réinitialiser le pic de RSS (VmHWM) demande Linux
+        try:
+            with open("/proc/self/clear_refs", "w") as clear_refs:
+                clear_refs.write("5")
+        except OSError:
+            pytest.skip("VmHWM cannot be reset on this platform")
+        url = f"sqlite:///{tmp_path}/export.db"
+        sync_engine = create_engine(url)
+        Base.metadata.create_all(bind=sync_engine)
+        with Session(sync_engine) as session:
+            session.add(User(id=1, email="test@example.com", name="Test User", hashed_password="x"))
+            session.commit()
+            for low in range(0, EXPORT_MEMORY_NOTES, 50_000):
+                session.execute(insert(Note), [
+                    {"title": f"Note {i}", "content": "lorem ipsum dolor sit amet " * 4, "owner_id": 1}
+                    for i in range(low, min(low + 50_000, EXPORT_MEMORY_NOTES))
+                ])
+            session.commit()
+        sync_engine.dispose()
+        async_engine = create_async_engine(to_async_url(url), poolclass=NullPool)
+        session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+
+        async def override_get_db():
+            async with session_factory() as db:
+                yield db
+
+        async def scenario():
+            exported = 0
+            requested = False
+            done = asyncio.Event()
+
+            async def receive():
+                # Le corps de la requête, puis une connexion ouverte jusqu'à la fin de la réponse
+                nonlocal requested
+                if not requested:
+                    requested = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                await done.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                # Le transport envoie chaque morceau sans le garder
+                nonlocal exported
+                exported += len(message.get("body", b""))
+                if message["type"] == "http.response.body" and not message.get("more_body", False):
+                    done.set()
+
+            scope = {
+                "type": "http", "method": "GET", "path": "/notes/export", "raw_path": b"/notes/export",
+                "query_string": b"", "root_path": "", "headers": [(b"accept-encoding", b"identity")],
+                "http_version": "1.1", "scheme": "http", "client": ("127.0.0.1", 5000), "server": ("testserver", 80),
+            }
+            try:
+                gc.collect()
+                baseline = proc_status_kib("VmRSS")
+                with open("/proc/self/clear_refs", "w") as clear_refs:
+                    clear_refs.write("5")
+                await app(scope, receive, send)
+                return exported, (proc_status_kib("VmHWM") - baseline) * 1024
+            finally:
+                await async_engine.dispose()
+
+        # Act
+        app.dependency_overrides[get_db] = override_get_db
+        try:
+            with patch('app.routes.notes_routes.export_notes_ndjson', partial(export_notes_ndjson, session_factory=session_factory)):
+                exported, peak_growth = asyncio.run(scenario())
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+
+        # Assert : le pic de mémoire résidente ne dépend que de la taille de lot, pas du volume exporté
+        assert exported > 100 * EXPORT_MEMORY_NOTES
+        assert peak_growth < 32 * 1024 * 1024, f"{peak_growth / 1024 ** 2:.1f} Mo"
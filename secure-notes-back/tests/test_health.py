@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.extensions import engine_options
+from app.health import DatabaseHealth
+from app.pool import TimedAsyncAdaptedQueuePool, TimedQueuePool, pool_stats
+
+
+class CountingHealth(DatabaseHealth):
+    """Sonde dont on compte les appels réels à la base"""
+
+    def __init__(self, *args, delay=0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.delay = delay
+        self.probes = 0
+
+    async def _probe(self):
+        self.probes += 1
+        await asyncio.sleep(self.delay)
+
+
+@pytest.mark.database
+class TestDatabaseHealth:
+
+    def test_probe_result_is_cached(self):
+        # Arrange
+        health = CountingHealth(engine=None, ttl=60)
+
+        # Act
+        async def scenario():
+            return [await health.check() for _ in range(10)]
+        results = asyncio.run(scenario())
+
+        # Assert
+        assert health.probes == 1
+        assert all(result["status"] == "connected" for result in results)
+
+    def test_slow_database_is_reported_after_timeout(self):
+        # Arrange
+        health = CountingHealth(engine=None, ttl=60, timeout=0.05, delay=1)
+
+        # Act
+        result = asyncio.run(health.check())
+
+        # Assert
+        assert result["status"] == "disconnected"
+        assert "timed out" in result["error"]
+
+    def test_probe_runs_select_on_engine(self, tmp_path):
+        # Arrange
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/health.db")
+        health = DatabaseHealth(engine, ttl=60)
+
+        # Act
+        async def scenario():
+            try:
+                return await health.check()
+            finally:
+                await engine.dispose()
+        result = asyncio.run(scenario())
+
+        # Assert
+        assert result["status"] == "connected"
+        assert result["latency_ms"] >= 0
+
+
+@pytest.mark.database
+class TestConnectionPool:
+
+    def test_engine_options_tune_postgres_pool(self):
+        # Act
+        sync_options = engine_options("postgresql://user:secret@db/notes")
+        async_options = engine_options("postgresql+asyncpg://user:secret@db/notes")
+
+        # Assert
+        assert sync_options["poolclass"] is TimedQueuePool
+        assert sync_options["pool_pre_ping"] is True
+        assert "statement_timeout" in sync_options["connect_args"]["options"]
+        assert async_options["poolclass"] is TimedAsyncAdaptedQueuePool
+        assert "statement_timeout" in async_options["connect_args"]["server_settings"]
+
+    def test_in_memory_sqlite_keeps_default_pool(self):
+        # Act
+        options = engine_options("sqlite:///:memory:")
+
+        # Assert
+        assert "poolclass" not in options
+
+    def test_pool_stats_report_checkouts_and_timeouts(self, tmp_path):
+        # Arrange
+        engine = create_engine(
+            f"sqlite:///{tmp_path}/pool.db", poolclass=TimedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05,
+        )
+
+        # Act
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            busy = pool_stats(engine.pool)
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+        stats = pool_stats(engine.pool)
+        engine.dispose()
+
+        # Assert
+        assert busy["checked_out"] == 1
+        assert busy["size"] == 1
+        assert stats["checked_out"] == 0
+        assert stats["checkouts"] == 1
+        assert stats["timeouts"] == 1
+        assert stats["wait_seconds_max"] >= 0
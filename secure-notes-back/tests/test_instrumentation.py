@@ -0,0 +1,200 @@
+import asyncio
+import json
+import logging
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.instrumentation import InstrumentationMiddleware, RequestMetrics, instrument_engine, timed, uninstrument_engine, _current
+from app.logs import JsonFormatter, configure_logging, stop_logging
+from app.metrics import Counter, Histogram, MetricsRegistry
+from app.models import Note
+from app.passwords import PasswordHasher
+from sqlalchemy.orm import Session
+
+
+@pytest.fixture
+def instrumented(db_client):
+    """db_client derrière le middleware, moteur instrumenté et registre de métriques vierge"""
+    engine = db_client.async_engine.sync_engine
+    registry = MetricsRegistry()
+    instrument_engine(engine)
+    with patch('app.instrumentation.metrics', registry):
+        yield TestClient(InstrumentationMiddleware(db_client.client.app)), registry
+    uninstrument_engine(engine)
+
+def add_note(db_client):
+    with Session(db_client.engine) as session:
+        note = Note(title="t", content="c", owner_id=1)
+        session.add(note)
+        session.commit()
+        return note.id
+
+def server_timing(response):
+    return dict(
+        (part.split(";")[0], part) for part in response.headers["server-timing"].split(", ")
+    )
+
+@pytest.mark.unit
+class TestMetrics:
+
+    def test_histogram_renders_cumulative_buckets(self):
+        # Arrange
+        histogram = Histogram("latency_seconds", "Latence", ("route",), buckets=(0.1, 1.0))
+
+        # Act
+        for value in (0.05, 0.5, 0.5, 3.0):
+            histogram.observe(("/notes/{note_id}",), value)
+        lines = histogram.render()
+
+        # Assert
+        assert 'latency_seconds_bucket{route="/notes/{note_id}",le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{route="/notes/{note_id}",le="1.0"} 3' in lines
+        assert 'latency_seconds_bucket{route="/notes/{note_id}",le="+Inf"} 4' in lines
+        assert 'latency_seconds_count{route="/notes/{note_id}"} 4' in lines
+        assert 'latency_seconds_sum{route="/notes/{note_id}"} 4.05' in lines
+
+    def test_counter_escapes_label_values(self):
+        # Arrange
+        counter = Counter("events_total", "Événements", ("route",))
+
+        # Act
+        counter.inc(('a"b',), 2)
+
+        # Assert
+        assert 'events_total{route="a\\"b"} 2.0' in counter.render()
+
+@pytest.mark.unit
+class TestTimed:
+
+    def test_timed_is_a_no_op_outside_a_request(self):
+        # Act / Assert
+        with timed("bcrypt"):
+            pass
+        assert _current.get() is None
+
+    def test_bcrypt_time_is_attributed_to_the_request(self):
+        # Arrange
+        hasher = PasswordHasher("thread", 1)
+        request_metrics = RequestMetrics()
+
+        async def scenario():
+            token = _current.set(request_metrics)
+            try:
+                return await hasher.hash("secret")
+            finally:
+                _current.reset(token)
+
+        # Act
+        asyncio.run(scenario())
+        hasher.shutdown()
+
+        # Assert
+        assert request_metrics.timings["bcrypt"] > 0
+
+@pytest.mark.database
+class TestInstrumentationMiddleware:
+
+    def test_server_timing_reports_db_time_and_query_count(self, db_client, instrumented):
+        # Arrange
+        client, _ = instrumented
+        note_id = add_note(db_client)
+
+        # Act
+        response = client.get(f"/notes/{note_id}")
+
+        # Assert
+        assert response.status_code == 200
+        timings = server_timing(response)
+        assert timings["db"].endswith('desc="1 queries"')
+        assert "total" in timings
+
+    def test_latency_and_queries_are_recorded_per_route_template(self, db_client, instrumented):
+        # Arrange
+        client, registry = instrumented
+        note_id = add_note(db_client)
+
+        # Act
+        client.get(f"/notes/{note_id}")
+        client.get(f"/notes/{note_id + 1000}")
+        client.get("/does-not-exist")
+
+        # Assert
+        assert registry.request_duration.count(("GET", "/notes/{note_id}", 200)) == 1
+        assert registry.request_duration.count(("GET", "/notes/{note_id}", 404)) == 1
+        assert registry.request_duration.count(("GET", "unmatched", 404)) == 1
+        assert registry.db_queries.value(("/notes/{note_id}",)) == 2
+        assert 'route="/notes/{note_id}"' in registry.render()
+
+    def test_slow_queries_are_logged_with_their_statement(self, db_client, instrumented, caplog):
+        # Arrange
+        client, registry = instrumented
+        note_id = add_note(db_client)
+
+        # Act
+        with patch('app.config.SLOW_QUERY_MS', 0), caplog.at_level(logging.WARNING, logger="app.sql"):
+            client.get(f"/notes/{note_id}")
+
+        # Assert
+        slow = [record for record in caplog.records if record.name == "app.sql"]
+        assert slow and "FROM notes" in slow[0].statement
+        assert registry.slow_queries.value() == len(slow)
+
+    def test_server_timing_can_be_disabled(self, db_client, instrumented):
+        # Arrange
+        client, _ = instrumented
+
+        # Act
+        with patch('app.config.SERVER_TIMING', False):
+            response = client.get("/notes/user_id/1")
+
+        # Assert
+        assert "server-timing" not in response.headers
+
+@pytest.mark.unit
+class TestLogging:
+
+    def test_json_formatter_includes_extra_fields(self):
+        # Arrange
+        record = logging.makeLogRecord({"name": "app.requests", "levelname": "INFO", "msg": "request", "route": "/notes/{note_id}", "status": 200})
+
+        # Act
+        entry = json.loads(JsonFormatter().format(record))
+
+        # Assert
+        assert entry["message"] == "request"
+        assert (entry["route"], entry["status"]) == ("/notes/{note_id}", 200)
+
+    def test_records_are_written_by_the_listener_thread(self, capfd):
+        # Arrange
+        root = logging.getLogger()
+        handlers, level = list(root.handlers), root.level
+        listener = configure_logging("INFO", "json")
+
+        # Act
+        try:
+            logging.getLogger("app.requests").info("request", extra={"route": "/livez"})
+        finally:
+            stop_logging(listener)
+            root.handlers[:] = handlers
+            root.setLevel(level)
+
+        # Assert
+        line = capfd.readouterr().err.strip().splitlines()[-1]
+        assert json.loads(line)["route"] == "/livez"
+
+@pytest.mark.unit
+class TestMetricsEndpoint:
+
+    def test_metrics_endpoint_exposes_prometheus_text(self):
+        # Arrange
+        from main import app
+
+        # Act
+        client = TestClient(app)
+        client.get("/livez")
+        response = client.get("/metrics")
+
+        # Assert
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'http_request_duration_seconds_count{method="GET",route="/livez",status="200"}' in response.text
@@ -0,0 +1,126 @@
+import asyncio
+import socket
+import pytest
+from app.mailer import MailQueue, SMTPConnectionPool, build_message
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class RecordingHandler:
+    """Serveur SMTP de test : compte les connexions et peut refuser les premiers envois"""
+
+    def __init__(self, transient_failures=0, reject_code=None):
+        self.messages = []
+        self.connections = 0
+        self.transient_failures = transient_failures
+        self.reject_code = reject_code
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.reject_code:
+            return f"{self.reject_code} Mailbox unavailable"
+        if self.transient_failures:
+            self.transient_failures -= 1
+            return "451 Try again later"
+        self.messages.append(envelope.rcpt_tos[0])
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp_server():
+    servers = []
+
+    def start(handler):
+        controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=free_port())
+        controller.start()
+        servers.append(controller)
+        return controller
+
+    yield start
+    for controller in servers:
+        controller.stop()
+
+
+def make_queue(controller, **kwargs):
+    pool = SMTPConnectionPool(controller.hostname, controller.port, size=1, start_tls=False, timeout=5)
+    return MailQueue(pool, workers=1, retry_base_delay=0.01, **kwargs)
+
+@pytest.mark.email
+class TestMailQueue:
+
+    def test_messages_are_batched_over_one_connection(self, smtp_server):
+        # Arrange
+        handler = RecordingHandler()
+        queue = make_queue(smtp_server(handler), batch_size=10)
+
+        async def scenario():
+            for i in range(5):
+                queue.enqueue(build_message(f"user{i}@example.com", "Sujet", "Corps", sender="app@example.com"))
+            await queue.drain(timeout=5)
+            await queue.stop()
+
+        # Act
+        asyncio.run(scenario())
+
+        # Assert
+        assert sorted(handler.messages) == [f"user{i}@example.com" for i in range(5)]
+        assert queue.pool.opened == 1
+        assert handler.connections == 1
+        assert queue.sent == 5
+
+    def test_transient_failures_are_retried(self, smtp_server):
+        # Arrange
+        handler = RecordingHandler(transient_failures=2)
+        queue = make_queue(smtp_server(handler))
+
+        async def scenario():
+            queue.enqueue(build_message("user@example.com", "Sujet", "Corps", sender="app@example.com"))
+            await queue.drain(timeout=5)
+            await queue.stop()
+
+        # Act
+        asyncio.run(scenario())
+
+        # Assert
+        assert handler.messages == ["user@example.com"]
+        assert queue.sent == 1
+        assert queue.failed == 0
+
+    def test_permanent_failures_are_dropped(self, smtp_server):
+        # Arrange
+        handler = RecordingHandler(reject_code=550)
+        queue = make_queue(smtp_server(handler))
+
+        async def scenario():
+            queue.enqueue(build_message("user@example.com", "Sujet", "Corps", sender="app@example.com"))
+            await queue.drain(timeout=5)
+            await queue.stop()
+
+        # Act
+        asyncio.run(scenario())
+
+        # Assert
+        assert handler.messages == []
+        assert queue.failed == 1
+
+    def test_enqueue_fails_fast_when_queue_is_full(self):
+        # Arrange
+        queue = MailQueue(SMTPConnectionPool("127.0.0.1", 1), max_size=1, workers=0)
+
+        async def scenario():
+            queue.enqueue(build_message("a@example.com", "Sujet", "Corps"))
+            with pytest.raises(asyncio.QueueFull):
+                queue.enqueue(build_message("b@example.com", "Sujet", "Corps"))
+
+        # Act / Assert
+        asyncio.run(scenario())
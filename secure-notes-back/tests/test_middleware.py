@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+from fastapi import HTTPException
+from app.cache import user_cache
+from app.middleware import get_current_user_from_access_cookie, get_current_user_even_if_deleting
+from app.tokens import token_verifier
+
+
+def make_request(token="fake_token"):
+    return SimpleNamespace(cookies={"access_token": token}, state=SimpleNamespace())
+
+@pytest.mark.auth
+class TestCurrentUserResolution:
+
+    @pytest.fixture(autouse=True)
+    def real_auth(self, monkeypatch):
+        monkeypatch.delenv("TESTING", raising=False)
+        # Révocations locales seulement : pas de lecture de revoked_tokens
+        monkeypatch.setattr(token_verifier, "store", None)
+        user_cache.clear()
+        yield
+        user_cache.clear()
+
+    @patch('app.middleware.UserRepository', autospec=True)
+    @patch('app.middleware.verify_token')
+    def test_user_is_resolved_once_per_request(self, mock_verify_token, mock_user_repo, mock_user):
+        # Arrange
+        mock_verify_token.return_value = 1
+        mock_user_repo.get_by_id.return_value = mock_user
+        request = make_request()
+
+        # Act
+        first = asyncio.run(get_current_user_from_access_cookie(request, db=Mock()))
+        second = asyncio.run(get_current_user_from_access_cookie(request, db=Mock()))
+
+        # Assert
+        assert first is second is mock_user
+        mock_verify_token.assert_called_once()
+
+    @patch('app.middleware.UserRepository', autospec=True)
+    @patch('app.middleware.verify_token')
+    def test_user_is_cached_across_requests_until_invalidated(self, mock_verify_token, mock_user_repo, mock_user):
+        # Arrange
+        mock_verify_token.return_value = 1
+        mock_user_repo.get_by_id.return_value = mock_user
+
+        # Act
+        asyncio.run(get_current_user_from_access_cookie(make_request(), db=Mock()))
+        asyncio.run(get_current_user_from_access_cookie(make_request(), db=Mock()))
+        calls_before_invalidation = mock_user_repo.get_by_id.await_count
+        user_cache.invalidate(1)
+        asyncio.run(get_current_user_from_access_cookie(make_request(), db=Mock()))
+
+        # Assert
+        assert calls_before_invalidation == 1
+        assert mock_user_repo.get_by_id.await_count == 2
+
+    @patch('app.middleware.UserRepository', autospec=True)
+    @patch('app.middleware.verify_token')
+    def test_accounts_being_deleted_are_rejected(self, mock_verify_token, mock_user_repo, mock_user):
+        # Arrange : jeton encore valide d'un compte marqué en cours de suppression
+        mock_verify_token.return_value = 1
+        mock_user.deleting_at = datetime.utcnow()
+        mock_user_repo.get_by_id.return_value = mock_user
+
+        # Act
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(get_current_user_from_access_cookie(make_request(), db=Mock()))
+        owner = asyncio.run(get_current_user_even_if_deleting(make_request(), db=Mock()))
+
+        # Assert : seul le suivi de la suppression reste accessible
+        assert error.value.status_code == 410
+        assert owner is mock_user
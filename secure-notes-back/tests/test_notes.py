@@ -1,18 +1,20 @@
 import pytest
-from unittest.mock import Mock, patch
+from datetime import datetime
+from unittest.mock import ANY, Mock, patch
+from app.pagination import encode_cursor, decode_cursor
 
 @pytest.mark.notes
 class TestNotesRoutes:
     
     @patch('app.routes.notes_routes.get_current_user_from_access_cookie')
-    @patch('app.routes.notes_routes.NoteRepository')
+    @patch('app.routes.notes_routes.NoteRepository', autospec=True)
     @patch('app.routes.notes_routes.get_db')
     def test_read_note_success(self, mock_get_db, mock_note_repo, mock_get_user, 
                               client, mock_user, mock_note):
         # Arrange
         mock_get_db.return_value = Mock()
         mock_get_user.return_value = mock_user
-        mock_note_repo.get_by_id.return_value = mock_note
+        mock_note_repo.get_owned.return_value = mock_note
         
         # Act - Ajouter un cookie d'authentification simulé
         with patch('app.middleware.get_current_user_from_access_cookie', return_value=mock_user):
@@ -24,13 +26,13 @@ class TestNotesRoutes:
         assert response.json()["title"] == "Test Note"
 
     @patch('app.routes.notes_routes.get_current_user_from_access_cookie')
-    @patch('app.routes.notes_routes.NoteRepository')
+    @patch('app.routes.notes_routes.NoteRepository', autospec=True)
     @patch('app.routes.notes_routes.get_db')
     def test_read_note_not_found(self, mock_get_db, mock_note_repo, mock_get_user, client, mock_user):
         # Arrange
         mock_get_db.return_value = Mock()
         mock_get_user.return_value = mock_user
-        mock_note_repo.get_by_id.return_value = None
+        mock_note_repo.get_owned.return_value = None
         
         # Act
         with patch('app.middleware.get_current_user_from_access_cookie', return_value=mock_user):
@@ -40,16 +42,14 @@ class TestNotesRoutes:
         assert response.status_code == 404
 
     @patch('app.routes.notes_routes.get_current_user_from_access_cookie')
-    @patch('app.routes.notes_routes.UserRepository')
-    @patch('app.routes.notes_routes.NoteRepository')
+    @patch('app.routes.notes_routes.NoteRepository', autospec=True)
     @patch('app.routes.notes_routes.get_db')
     def test_read_notes_by_user_success(self, mock_get_db, mock_note_repo, 
-                                       mock_user_repo, mock_get_user, client, mock_user, mock_note):
+                                       mock_get_user, client, mock_user, mock_note):
         # Arrange
         mock_get_db.return_value = Mock()
         mock_get_user.return_value = mock_user
-        mock_user_repo.get_by_id.return_value = mock_user
-        mock_note_repo.get_by_user_id.return_value = [mock_note]
+        mock_note_repo.list_owned.return_value = [mock_note]
         
         # Act
         with patch('app.middleware.get_current_user_from_access_cookie', return_value=mock_user):
@@ -60,25 +60,81 @@ class TestNotesRoutes:
         assert len(response.json()) == 1
         assert response.json()[0]["id"] == 1
 
-    @patch('app.routes.notes_routes.get_current_user_from_access_cookie')
-    @patch('app.routes.notes_routes.UserRepository')
-    @patch('app.routes.notes_routes.get_db')
-    def test_read_notes_by_user_not_found(self, mock_get_db, mock_user_repo, 
-                                         mock_get_user, client, mock_user):
+    @patch('app.routes.notes_routes.NoteRepository', autospec=True)
+    def test_read_notes_by_user_returns_next_cursor_when_page_is_full(self, mock_note_repo, client, mock_user, mock_note):
         # Arrange
-        mock_get_db.return_value = Mock()
-        mock_get_user.return_value = mock_user
-        mock_user_repo.get_by_id.return_value = None
-        
+        mock_note.updated_at = datetime(2025, 1, 1)
+        mock_note_repo.list_owned.return_value = [mock_note, mock_note, mock_note]
+
         # Act
-        with patch('app.middleware.get_current_user_from_access_cookie', return_value=mock_user):
-            response = client.get("/notes/user_id/999", cookies={"access_token": "fake_token"})
+        response = client.get("/notes/user_id/1?limit=2")
+
+        # Assert
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+        assert decode_cursor(response.headers["X-Next-Cursor"]) == (datetime(2025, 1, 1), 1)
+        mock_note_repo.list_owned.assert_awaited_once_with(db=ANY, owner_id=1, limit=3, after=None)
+
+    @patch('app.routes.notes_routes.NoteRepository', autospec=True)
+    def test_read_notes_by_user_forwards_cursor(self, mock_note_repo, client, mock_user, mock_note):
+        # Arrange
+        mock_note_repo.list_owned.return_value = [mock_note]
+        cursor = encode_cursor(datetime(2025, 1, 1), 7)
+
+        # Act
+        response = client.get(f"/notes/user_id/1?cursor={cursor}")
+
+        # Assert
+        assert response.status_code == 200
+        assert "X-Next-Cursor" not in response.headers
+        mock_note_repo.list_owned.assert_awaited_once_with(db=ANY, owner_id=1, limit=21, after=(datetime(2025, 1, 1), 7))
+
+    def test_read_notes_by_user_rejects_invalid_cursor(self, client):
+        # Act
+        response = client.get("/notes/user_id/1?cursor=%%%")
+
+        # Assert
+        assert response.status_code == 400
+
+    def test_read_notes_by_user_rejects_oversized_page(self, client):
+        # Act
+        response = client.get("/notes/user_id/1?limit=1000")
+
+        # Assert
+        assert response.status_code == 422
+
+    @patch('app.routes.notes_routes.NoteRepository', autospec=True)
+    def test_read_notes_of_another_user_are_forbidden(self, mock_note_repo, client):
+        # Act
+        response = client.get("/notes/user_id/999")
         
         # Assert
-        assert response.status_code == 404
+        assert response.status_code == 403
+        mock_note_repo.list_owned.assert_not_called()
+
+    @patch('app.routes.notes_routes.NoteRepository', autospec=True)
+    def test_search_notes_returns_ranked_notes(self, mock_note_repo, client, mock_note):
+        # Arrange
+        mock_note_repo.search.return_value = [(mock_note, 0.75)]
+
+        # Act
+        response = client.get("/notes/search?q=test&limit=5")
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json()[0]["id"] == 1
+        assert response.json()[0]["rank"] == 0.75
+        mock_note_repo.search.assert_awaited_once_with(db=ANY, owner_id=1, query="test", limit=5, offset=0)
+
+    def test_search_notes_requires_query(self, client):
+        # Act
+        response = client.get("/notes/search")
+
+        # Assert
+        assert response.status_code == 422
 
     @patch('app.routes.notes_routes.get_current_user_from_access_cookie')
-    @patch('app.routes.notes_routes.NoteRepository')
+    @patch('app.routes.notes_routes.NoteRepository', autospec=True)
     @patch('app.routes.notes_routes.get_db')
     def test_create_note_success(self, mock_get_db, mock_note_repo, mock_get_user, 
                                 client, mock_user, mock_note):
@@ -102,15 +158,14 @@ class TestNotesRoutes:
         assert response.json()["title"] == "Test Note"
 
     @patch('app.routes.notes_routes.get_current_user_from_access_cookie')
-    @patch('app.routes.notes_routes.NoteRepository')
+    @patch('app.routes.notes_routes.NoteRepository', autospec=True)
     @patch('app.routes.notes_routes.get_db')
     def test_update_note_success(self, mock_get_db, mock_note_repo, mock_get_user, 
                                 client, mock_user, mock_note):
         # Arrange
         mock_get_db.return_value = Mock()
         mock_get_user.return_value = mock_user
-        mock_note_repo.get_by_id.return_value = mock_note
-        mock_note_repo.update.return_value = mock_note
+        mock_note_repo.patch.return_value = mock_note
         
         # Act
         with patch('app.middleware.get_current_user_from_access_cookie', return_value=mock_user):
@@ -127,13 +182,13 @@ class TestNotesRoutes:
         assert "updated" in response.json()["message"]
 
     @patch('app.routes.notes_routes.get_current_user_from_access_cookie')
-    @patch('app.routes.notes_routes.NoteRepository')
+    @patch('app.routes.notes_routes.NoteRepository', autospec=True)
     @patch('app.routes.notes_routes.get_db')
     def test_update_note_not_found(self, mock_get_db, mock_note_repo, mock_get_user, client, mock_user):
         # Arrange
         mock_get_db.return_value = Mock()
         mock_get_user.return_value = mock_user
-        mock_note_repo.get_by_id.return_value = None
+        mock_note_repo.patch.return_value = None
         
         # Act
         with patch('app.middleware.get_current_user_from_access_cookie', return_value=mock_user):
@@ -149,15 +204,14 @@ class TestNotesRoutes:
         assert response.status_code == 404
 
     @patch('app.routes.notes_routes.get_current_user_from_access_cookie')
-    @patch('app.routes.notes_routes.NoteRepository')
+    @patch('app.routes.notes_routes.NoteRepository', autospec=True)
     @patch('app.routes.notes_routes.get_db')
     def test_delete_note_success(self, mock_get_db, mock_note_repo, mock_get_user, 
                                 client, mock_user, mock_note):
         # Arrange
         mock_get_db.return_value = Mock()
         mock_get_user.return_value = mock_user
-        mock_note_repo.get_by_id.return_value = mock_note
-        mock_note_repo.delete.return_value = None
+        mock_note_repo.delete_owned.return_value = True
         
         # Act
         with patch('app.middleware.get_current_user_from_access_cookie', return_value=mock_user):
@@ -168,13 +222,13 @@ class TestNotesRoutes:
         assert "deleted" in response.json()["message"]
 
     @patch('app.routes.notes_routes.get_current_user_from_access_cookie')
-    @patch('app.routes.notes_routes.NoteRepository')
+    @patch('app.routes.notes_routes.NoteRepository', autospec=True)
     @patch('app.routes.notes_routes.get_db')
     def test_delete_note_not_found(self, mock_get_db, mock_note_repo, mock_get_user, client, mock_user):
         # Arrange
         mock_get_db.return_value = Mock()
         mock_get_user.return_value = mock_user
-        mock_note_repo.get_by_id.return_value = None
+        mock_note_repo.delete_owned.return_value = False
         
         # Act
         with patch('app.middleware.get_current_user_from_access_cookie', return_value=mock_user):
@@ -0,0 +1,57 @@
+import pytest
+from datetime import datetime, timedelta
+from app.models import User, Note
+from app.pagination import encode_cursor, decode_cursor
+from app.repositories import NoteRepository
+
+@pytest.mark.notes
+class TestKeysetPagination:
+
+    def test_cursor_roundtrip(self):
+        # Arrange
+        updated_at = datetime(2025, 1, 2, 3, 4, 5, 678)
+
+        # Act
+        decoded = decode_cursor(encode_cursor(updated_at, 42))
+
+        # Assert
+        assert decoded == (updated_at, 42)
+
+    def test_invalid_cursor_raises_value_error(self):
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+
+    @pytest.mark.database
+    def test_pages_cover_all_notes_without_duplicates(self, run_with_db):
+        # Arrange
+        base = datetime(2025, 1, 1)
+
+        async def scenario(db):
+            owner = User(email="a@example.com", name="A", hashed_password="x")
+            other = User(email="b@example.com", name="B", hashed_password="x")
+            db.add_all([owner, other])
+            await db.flush()
+            # Plusieurs notes partagent le même updated_at : l'id départage
+            db.add_all(
+                Note(title=f"n{i}", content="c", owner_id=owner.id, updated_at=base + timedelta(minutes=i // 3))
+                for i in range(25)
+            )
+            db.add(Note(title="other", content="c", owner_id=other.id, updated_at=base))
+            await db.commit()
+
+            seen, after = [], None
+            while True:
+                page = await NoteRepository.get_by_user_id(db, user_id=owner.id, limit=7, after=after)
+                if not page:
+                    return seen
+                seen.extend(page)
+                after = (page[-1].updated_at, page[-1].id)
+
+        # Act
+        notes = run_with_db(scenario)
+
+        # Assert
+        keys = [(note.updated_at, note.id) for note in notes]
+        assert len(keys) == 25
+        assert len(set(keys)) == 25
+        assert keys == sorted(keys, reverse=True)
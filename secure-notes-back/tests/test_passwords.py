@@ -0,0 +1,57 @@
+import asyncio
+import time
+import pytest
+from passlib.context import CryptContext
+from app.passwords import PasswordHasher, needs_rehash
+
+@pytest.mark.auth
+class TestPasswordHasher:
+
+    def test_hash_and_verify_roundtrip(self):
+        # Arrange
+        hasher = PasswordHasher("thread", max_workers=2)
+
+        async def scenario():
+            hashed = await hasher.hash("password")
+            return await hasher.verify("password", hashed), await hasher.verify("wrong", hashed)
+
+        # Act
+        valid, invalid = asyncio.run(scenario())
+        hasher.shutdown()
+
+        # Assert
+        assert valid is True
+        assert invalid is False
+        assert hasher.stats()["completed"] == 3
+        assert hasher.queue_depth == 0
+
+    def test_hashing_does_not_block_event_loop(self):
+        # Arrange
+        hasher = PasswordHasher("thread", max_workers=1)
+
+        async def scenario():
+            ticks = []
+
+            async def ticker():
+                while len(ticks) < 5:
+                    ticks.append(time.perf_counter())
+                    await asyncio.sleep(0.01)
+
+            await asyncio.gather(hasher.hash("password"), ticker())
+            return ticks
+
+        # Act
+        ticks = asyncio.run(scenario())
+        hasher.shutdown()
+
+        # Assert
+        gaps = [later - earlier for earlier, later in zip(ticks, ticks[1:])]
+        assert max(gaps) < 0.1
+
+    def test_needs_rehash_when_rounds_differ(self):
+        # Arrange
+        weak_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("password")
+
+        # Act / Assert
+        assert needs_rehash(weak_hash) is True
+        assert needs_rehash("$2b$12$test_hash") is False
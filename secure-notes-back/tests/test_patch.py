@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+from app.models import Note, User
+from app.repositories import NoteRepository
+from app.search import search_index
+
+
+def add_note(engine, owner_id=1, **values):
+    with Session(engine) as session:
+        if owner_id != 1:
+            session.add(User(id=owner_id, email=f"{owner_id}@example.com", name="Other", hashed_password="x"))
+        note = Note(owner_id=owner_id, **{"title": "Titre", "content": "Contenu", **values})
+        session.add(note)
+        session.commit()
+        return note.id
+
+def stored(engine, note_id):
+    with Session(engine) as session:
+        return session.execute(select(Note.title, Note.content, Note.change_seq).where(Note.id == note_id)).one()
+
+@pytest.mark.notes
+@pytest.mark.database
+class TestPatchNote:
+
+    @pytest.fixture(autouse=True)
+    def fresh_index(self):
+        search_index.clear()
+        yield
+        search_index.clear()
+
+    def test_patch_updates_only_sent_fields_in_one_update(self, db_client, sql_statements):
+        # Arrange
+        note_id = add_note(db_client.engine, content="x" * 10_000)
+        sql_statements.clear()
+
+        # Act
+        response = db_client.client.patch(f"/notes/{note_id}", json={"title": "Nouveau titre"})
+
+        # Assert
+        note_updates = [statement for statement in sql_statements if statement.startswith("UPDATE notes")]
+        assert response.status_code == 200
+        assert response.json()["title"] == "Nouveau titre"
+        assert "ETag" in response.headers
+        assert stored(db_client.engine, note_id)[:2] == ("Nouveau titre", "x" * 10_000)
+        # Pas de lecture préalable ni de réécriture de content
+        assert not any(statement.startswith("SELECT") for statement in sql_statements)
+        assert len(note_updates) == 1
+        assert "RETURNING" in note_updates[0] and "content=" not in note_updates[0].replace(" ", "")
+
+    def test_patch_cannot_touch_another_users_note(self, db_client):
+        # Arrange
+        note_id = add_note(db_client.engine, owner_id=2)
+
+        # Act
+        response = db_client.client.patch(f"/notes/{note_id}", json={"content": "volé"})
+
+        # Assert
+        assert response.status_code == 404
+        assert stored(db_client.engine, note_id) == ("Titre", "Contenu", 0)
+
+    def test_empty_or_null_content_patch_is_rejected(self, db_client):
+        # Arrange
+        note_id = add_note(db_client.engine)
+
+        # Act
+        empty = db_client.client.patch(f"/notes/{note_id}", json={})
+        null_content = db_client.client.patch(f"/notes/{note_id}", json={"content": None})
+
+        # Assert
+        assert empty.status_code == 400
+        assert null_content.status_code == 422
+
+@pytest.mark.notes
+@pytest.mark.unit
+class TestPatchStatement:
+
+    def test_postgres_patch_is_a_single_statement(self):
+        # Arrange
+        note = Note(id=3, title="t", content="c", owner_id=1)
+        db = MagicMock()
+        db.get_bind.return_value = SimpleNamespace(dialect=postgresql.dialect())
+        db.execute = AsyncMock(return_value=MagicMock(**{"scalars.return_value.first.return_value": note}))
+        db.commit = AsyncMock()
+
+        # Act
+        result = asyncio.run(NoteRepository.patch(db, note_id=3, owner_id=1, values={"content": "c"}))
+        sql = str(db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+
+        # Assert
+        assert result is note
+        db.execute.assert_awaited_once()
+        assert sql.startswith("WITH next_change_seq AS")
+        assert "RETURNING" in sql
@@ -0,0 +1,209 @@
+import asyncio
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.models import Note, NoteTombstone, User
+from app.purge import AccountPurger
+from app.repositories import NoteRepository, UserRepository
+
+
+def seed(engine, notes):
+    """notes notes pour l'utilisateur de test (id 1), une note gardée pour un autre compte (id 2)"""
+    with Session(engine) as session:
+        session.add(User(id=2, email="other@example.com", name="Other", hashed_password="x"))
+        session.flush()
+        session.add_all(Note(title=f"t{i}", content=f"c{i}", owner_id=1) for i in range(notes))
+        session.add(NoteTombstone(note_id=0, owner_id=1, change_seq=1))
+        session.add(Note(title="kept", content="kept", owner_id=2))
+        session.commit()
+
+def counts(engine):
+    with Session(engine) as session:
+        return (
+            session.scalar(select(func.count()).select_from(User).where(User.id == 1)),
+            session.scalar(select(func.count()).select_from(Note).where(Note.owner_id == 1)),
+            session.scalar(select(func.count()).select_from(NoteTombstone)),
+            session.scalar(select(func.count()).select_from(Note).where(Note.owner_id == 2)),
+        )
+
+@pytest.mark.users
+@pytest.mark.database
+class TestAccountDeletion:
+
+    def test_small_account_is_deleted_by_the_database_cascade(self, db_client, sql_statements):
+        # Arrange
+        seed(db_client.engine, notes=50)
+        sql_statements.clear()
+
+        # Act
+        with patch('app.routes.users_routes.ACCOUNT_PURGE_THRESHOLD', 100):
+            response = db_client.client.delete("/users/1")
+
+        # Assert
+        assert response.status_code == 200
+        assert counts(db_client.engine) == (0, 0, 0, 1)
+        # Aucune note chargée ni supprimée une par une
+        deletes = [statement for statement in sql_statements if statement.startswith("DELETE")]
+        assert deletes == ["DELETE FROM users WHERE users.id = ?"]
+        assert not any("FROM notes" in statement and statement.startswith("SELECT notes.") for statement in sql_statements)
+
+    def test_large_account_is_marked_then_purged_in_batches(self, db_client, sql_statements):
+        # Arrange
+        seed(db_client.engine, notes=250)
+        purger = AccountPurger(async_sessionmaker(db_client.async_engine, expire_on_commit=False), batch_size=100, pause=0)
+
+        # Act
+        with patch('app.routes.users_routes.ACCOUNT_PURGE_THRESHOLD', 100), \
+             patch('app.routes.users_routes.account_purger', purger), \
+             patch.object(purger, 'start') as start:
+            response = db_client.client.delete("/users/1")
+        marked = counts(db_client.engine)
+        with Session(db_client.engine) as session:
+            deleting_at = session.get(User, 1).deleting_at
+
+        sql_statements.clear()
+
+        async def purge():
+            purger.start(1)
+            await purger.wait(1, timeout=10)
+
+        asyncio.run(purge())
+
+        # Assert
+        assert response.status_code == 202
+        assert response.headers["location"] == "/users/1/deletion"
+        start.assert_called_once_with(1)
+        assert marked == (1, 250, 1, 1)
+        assert deleting_at is not None
+        assert counts(db_client.engine) == (0, 0, 0, 1)
+        batches = [statement for statement in sql_statements if statement.startswith("DELETE FROM notes")]
+        # Trois lots pleins ou partiels, puis un lot vide avant la suppression du compte
+        assert len(batches) == 4
+        assert purger.stats() == {"running": 0, "deleted": 0}
+
+    def test_interrupted_purges_are_resumed(self, db_client):
+        # Arrange
+        seed(db_client.engine, notes=30)
+        session_factory = async_sessionmaker(db_client.async_engine, expire_on_commit=False)
+        purger = AccountPurger(session_factory, batch_size=10, pause=0)
+
+        async def scenario():
+            async with session_factory() as db:
+                await UserRepository.mark_deleting(db, 1)
+            resumed = await purger.resume()
+            await purger.wait(1, timeout=10)
+            return resumed
+
+        # Act
+        resumed = asyncio.run(scenario())
+
+        # Assert
+        assert resumed == [1]
+        assert counts(db_client.engine) == (0, 0, 0, 1)
+
+    def test_a_short_batch_does_not_end_the_purge(self, db_client):
+        # Arrange
+        seed(db_client.engine, notes=30)
+        session_factory = async_sessionmaker(db_client.async_engine, expire_on_commit=False)
+        purger = AccountPurger(session_factory, batch_size=10, pause=0)
+        purge_batch = NoteRepository.purge_batch
+        deleted = []
+
+        async def short_first_batch(db, owner_id, limit):
+            # Le premier lot n'en supprime que 3, comme s'il avait croisé une écriture concurrente
+            count = await purge_batch(db, owner_id, 3 if not deleted else limit)
+            deleted.append(count)
+            return count
+
+        async def scenario():
+            async with session_factory() as db:
+                await UserRepository.mark_deleting(db, 1)
+            purger.start(1)
+            await purger.wait(1, timeout=10)
+
+        # Act
+        with patch('app.purge.NoteRepository.purge_batch', side_effect=short_first_batch):
+            asyncio.run(scenario())
+
+        # Assert
+        assert deleted == [3, 10, 10, 7, 0]
+        assert counts(db_client.engine) == (0, 0, 0, 1)
+
+    def test_concurrent_purgers_leave_each_account_to_one_owner(self, db_client):
+        # Arrange
+        seed(db_client.engine, notes=50)
+        session_factory = async_sessionmaker(db_client.async_engine, expire_on_commit=False)
+        purgers = [AccountPurger(session_factory, batch_size=10, pause=0, lease=0.2) for _ in range(2)]
+        claim_purge = UserRepository.claim_purge
+        claims = []
+
+        async def recorded_claim(db, user_id, owner, now, lease):
+            claimed = await claim_purge(db, user_id, owner, now, lease)
+            claims.append((owner, claimed))
+            return claimed
+
+        async def scenario():
+            async with session_factory() as db:
+                await UserRepository.mark_deleting(db, 1)
+            for purger in purgers:
+                purger.start(1)
+            await asyncio.gather(*(purger.wait(1, timeout=10) for purger in purgers))
+
+        # Act
+        with patch('app.purge.UserRepository.claim_purge', side_effect=recorded_claim):
+            asyncio.run(scenario())
+
+        # Assert : un seul worker a tenu le bail, l'autre s'est arrêté une fois le compte supprimé
+        assert len({owner for owner, claimed in claims if claimed}) == 1
+        assert (purgers[1].owner, False) in claims or (purgers[0].owner, False) in claims
+        assert counts(db_client.engine) == (0, 0, 0, 1)
+        assert [purger.stats()["running"] for purger in purgers] == [0, 0]
+
+    def test_other_accounts_cannot_be_deleted(self, db_client):
+        # Arrange
+        seed(db_client.engine, notes=5)
+
+        # Act
+        with patch('app.routes.users_routes.account_purger') as purger:
+            response = db_client.client.delete("/users/2")
+
+        # Assert
+        assert response.status_code == 403
+        purger.start.assert_not_called()
+        with Session(db_client.engine) as session:
+            assert session.get(User, 2).deleting_at is None
+        assert counts(db_client.engine) == (1, 5, 1, 1)
+
+    def test_deletion_status_reports_remaining_notes(self, db_client):
+        # Arrange
+        seed(db_client.engine, notes=30)
+        with Session(db_client.engine) as session:
+            session.get(User, 1).deleting_at = datetime.utcnow()
+            session.commit()
+
+        # Act
+        status = db_client.client.get("/users/1/deletion")
+        forbidden = db_client.client.get("/users/2/deletion")
+
+        # Assert
+        assert status.status_code == 200
+        assert status.json()["status"] == "deleting"
+        assert status.json()["notes_remaining"] == 30
+        assert forbidden.status_code == 403
+
+    def test_accounts_being_deleted_cannot_log_in(self, db_client):
+        # Arrange
+        with Session(db_client.engine) as session:
+            session.add(User(id=2, email="big@example.com", name="Big", hashed_password="x", deleting_at=datetime.utcnow()))
+            session.commit()
+
+        # Act
+        with patch('app.routes.auth_routes.verify_password') as verify:
+            response = db_client.client.post("/auth/login", json={"email": "big@example.com", "password": "x"})
+
+        # Assert
+        assert response.json() == [{"error": "Invalid credentials"}, 401]
+        verify.assert_not_called()
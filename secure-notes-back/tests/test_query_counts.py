@@ -0,0 +1,130 @@
+import pytest
+import re
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.models import Note, User
+from app.repositories import NoteRepository
+from app.search import search_index
+
+# Instructions SQL par endpoint sur SQLite. Les écritures ajoutent l'incrément de
+# users.change_seq (et la pierre tombale pour une suppression), regroupés avec l'écriture
+# dans une seule instruction sur Postgres.
+ENDPOINT_BUDGETS = [
+    ("get", "/notes/{id}", None, 1),
+    ("get", "/notes/user_id/1", None, 1),
+    ("get", "/notes/user_id/1?limit=5", None, 1),
+    ("get", "/notes/changes", None, 2),
+    ("patch", "/notes/{id}", {"content": "modifiée"}, 2),
+    ("put", "/notes/{id}", {"title": "t", "content": "remplacée", "owner_id": 1}, 2),
+    ("post", "/notes/", {"title": "t", "content": "nouvelle", "owner_id": 1}, 2),
+    ("delete", "/notes/{id}", None, 3),
+]
+
+
+def seed(engine, count=20):
+    with Session(engine) as session:
+        session.add(User(id=2, email="other@example.com", name="Other", hashed_password="x"))
+        notes = [Note(title=f"t{i}", content=f"c{i}", owner_id=1) for i in range(count)]
+        foreign = Note(title="foreign", content="x", owner_id=2)
+        session.add_all(notes + [foreign])
+        session.commit()
+        return notes[0].id, foreign.id
+
+@pytest.mark.notes
+@pytest.mark.database
+class TestQueryCounts:
+
+    @pytest.fixture(autouse=True)
+    def fresh_index(self):
+        search_index.clear()
+        yield
+        search_index.clear()
+
+    @pytest.mark.parametrize("method,path,body,budget", ENDPOINT_BUDGETS)
+    def test_endpoint_stays_within_query_budget(self, db_client, max_queries, method, path, body, budget):
+        # Arrange
+        note_id, _ = seed(db_client.engine)
+        kwargs = {"json": body} if body is not None else {}
+
+        # Act
+        with max_queries(budget):
+            response = getattr(db_client.client, method)(path.format(id=note_id), **kwargs)
+
+        # Assert
+        assert response.status_code in (200, 201)
+
+    @pytest.mark.parametrize("method", ["get", "patch", "delete"])
+    def test_foreign_note_is_not_found_in_one_query(self, db_client, max_queries, method):
+        # Arrange
+        _, foreign_id = seed(db_client.engine)
+        kwargs = {"json": {"content": "volé"}} if method == "patch" else {}
+
+        # Act
+        with max_queries(2) as statements:
+            response = getattr(db_client.client, method)(f"/notes/{foreign_id}", **kwargs)
+
+        # Assert
+        assert response.status_code == 404
+        assert sum(statement.lstrip().startswith(("SELECT", "DELETE", "UPDATE notes")) for statement in statements) == 1
+        with Session(db_client.engine) as session:
+            assert session.get(Note, foreign_id).content == "x"
+
+    def test_created_notes_belong_to_the_current_user(self, db_client):
+        # Arrange
+        seed(db_client.engine)
+
+        # Act : un owner_id envoyé dans le corps est ignoré
+        response = db_client.client.post("/notes/", json={"title": "t", "content": "pour 2", "owner_id": 2})
+
+        # Assert
+        assert response.status_code == 201
+        assert response.json()["owner_id"] == 1
+        with Session(db_client.engine) as session:
+            assert session.get(Note, response.json()["id"]).owner_id == 1
+
+
+@pytest.mark.notes
+@pytest.mark.database
+class TestPartitionKey:
+
+    def test_note_statements_always_filter_on_owner_id(self, run_with_db):
+        # Arrange : avec NOTES_PARTITIONS, une condition sur owner_id limite l'instruction à une partition
+        async def scenario(db):
+            statements = []
+            event.listen(db.get_bind(), "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+            db.add(User(id=1, email="test@example.com", name="Test", hashed_password="x"))
+            await db.commit()
+            note = await NoteRepository.create(db, Note(title="t", content="c", owner_id=1))
+            note_id = note.id
+            statements.clear()
+
+            await NoteRepository.get_owned(db, note_id, 1)
+            await NoteRepository.get_owned_version(db, note_id, 1)
+            await NoteRepository.list_owned(db, owner_id=1, limit=10)
+            await NoteRepository.get_page_versions(db, user_id=1, limit=10)
+            await NoteRepository.get_collection_version(db, 1)
+            await NoteRepository.get_changes(db, owner_id=1, after=(0, 0), limit=10)
+            await NoteRepository.search(db, owner_id=1, query="c", limit=10, offset=0)
+            await NoteRepository.update(db, Note(id=note_id, title="t", content="u", owner_id=1))
+            await NoteRepository.patch(db, note_id, 1, {"content": "p"})
+            ids = await NoteRepository.insert_many(db, 1, [{"title": "a", "content": "a"}, {"title": "b", "content": "b"}])
+            await NoteRepository.update_many(db, 1, [{"id": ids[0], "content": "m"}])
+            await NoteRepository.delete_many(db, 1, [ids[0]])
+            await db.commit()
+            await NoteRepository.delete(db, await NoteRepository.get_owned(db, ids[1], 1))
+            await NoteRepository.delete_owned(db, note_id, 1)
+            await NoteRepository.purge_batch(db, 1, 10)
+            return statements
+
+        # Act
+        statements = run_with_db(scenario)
+
+        # Assert
+        note_statements = [
+            statement for statement in statements
+            if re.search(r"\bnotes\b", statement) and not statement.lstrip().startswith("INSERT")
+        ]
+        # Condition de l'instruction elle-même, hors sous-requêtes
+        outer_conditions = {statement: statement.partition("WHERE")[2].partition("(SELECT")[0] for statement in note_statements}
+        assert len(note_statements) >= 15
+        assert [statement for statement, condition in outer_conditions.items() if "notes.owner_id" not in condition] == []
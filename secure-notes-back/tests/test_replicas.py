@@ -0,0 +1,146 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.extensions import Base, to_async_url
+from app.models import Note, User
+from app.replicas import STICKY_COOKIE, ReplicaRouter, StickyPrimaryMiddleware
+from app.search import search_index
+from app.tokens import token_verifier
+
+
+def create_database(url, content):
+    """Base SQLite contenant l'utilisateur de test et une note dont le contenu désigne la base"""
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        if session.get(User, 1) is None:
+            session.add(User(id=1, email="test@example.com", name="Test User", hashed_password="x"))
+            session.flush()
+        session.add(Note(id=1, title="t", content=content, owner_id=1))
+        session.commit()
+    return engine
+
+@pytest.fixture
+def replicated(db_client, tmp_path):
+    """db_client (primaire) et un réplica SQLite distinct, derrière StickyPrimaryMiddleware"""
+    create_database(f"sqlite:///{tmp_path}/test.db", "primary")
+    replica_sync = create_database(f"sqlite:///{tmp_path}/replica.db", "replica")
+    replica = create_async_engine(to_async_url(f"sqlite:///{tmp_path}/replica.db"), poolclass=NullPool)
+    router = ReplicaRouter([replica], stickiness=5, retry_after=30)
+    search_index.clear()
+    with patch('app.constants.replica_router', router):
+        yield TestClient(StickyPrimaryMiddleware(db_client.client.app, router)), router, db_client
+    search_index.clear()
+    replica_sync.dispose()
+    asyncio.run(replica.dispose())
+
+def primary_notes(db_client):
+    with Session(db_client.engine) as session:
+        return session.scalar(select(func.count()).select_from(Note))
+
+@pytest.mark.database
+class TestReplicaRouting:
+
+    def test_reads_go_to_the_replica(self, replicated):
+        # Arrange
+        client, _, _ = replicated
+
+        # Act
+        note = client.get("/notes/1")
+        notes = client.get("/notes/user_id/1")
+
+        # Assert
+        assert note.json()["content"] == "replica"
+        assert [item["content"] for item in notes.json()] == ["replica"]
+
+    def test_writes_go_to_the_primary_and_make_reads_sticky(self, replicated):
+        # Arrange
+        client, _, db_client = replicated
+
+        # Act
+        created = client.post("/notes/", json={"title": "n", "content": "nouvelle", "owner_id": 1})
+        after_write = client.get("/notes/1")
+        client.cookies.clear()
+        later = client.get("/notes/1")
+
+        # Assert
+        assert created.status_code == 201
+        assert primary_notes(db_client) == 2
+        assert float(created.cookies[STICKY_COOKIE]) > datetime.now().timestamp()
+        assert after_write.json()["content"] == "primary"
+        assert later.json()["content"] == "replica"
+
+    def test_stickiness_follows_the_user_across_clients(self, replicated):
+        # Arrange
+        client, _, _ = replicated
+        token = token_verifier.encode({"sub": "1", "exp": datetime.utcnow() + timedelta(hours=1)})
+        client.cookies.set("access_token", token)
+        client.patch("/notes/1", json={"content": "modifiée"})
+        other_device = TestClient(client.app, cookies={"access_token": token})
+
+        # Act
+        response = other_device.get("/notes/1")
+
+        # Assert
+        assert STICKY_COOKIE not in other_device.cookies
+        assert response.json()["content"] == "modifiée"
+
+    def test_failed_writes_do_not_make_reads_sticky(self, replicated):
+        # Arrange
+        client, _, _ = replicated
+
+        # Act
+        response = client.patch("/notes/999", json={"content": "x"})
+
+        # Assert
+        assert response.status_code == 404
+        assert STICKY_COOKIE not in response.cookies
+
+    def test_unreachable_replica_falls_back_to_the_primary(self, replicated, tmp_path):
+        # Arrange
+        client, router, _ = replicated
+        broken = create_async_engine(to_async_url(f"sqlite:///{tmp_path}/missing/replica.db"), poolclass=NullPool)
+        router.replicas[0].engine = broken
+        router.replicas[0].session_factory.configure(bind=broken)
+
+        # Act
+        first = client.get("/notes/1")
+        second = client.get("/notes/1")
+
+        # Assert
+        assert [first.json()["content"], second.json()["content"]] == ["primary", "primary"]
+        assert router.stats()[0]["available"] is False
+        asyncio.run(broken.dispose())
+
+@pytest.mark.unit
+class TestReplicaRouter:
+
+    def test_reads_are_spread_over_available_replicas(self):
+        # Arrange
+        engines = [create_async_engine("sqlite+aiosqlite://"), create_async_engine("sqlite+aiosqlite://")]
+        router = ReplicaRouter(engines)
+        request = type("FakeRequest", (), {"method": "GET", "cookies": {}})()
+
+        # Act
+        chosen = [router.choose(request) for _ in range(4)]
+        router.replicas[0].down_until = float("inf")
+        after_failure = [router.choose(request) for _ in range(2)]
+
+        # Assert
+        assert chosen == [router.replicas[0], router.replicas[1], router.replicas[0], router.replicas[1]]
+        assert after_failure == [router.replicas[1], router.replicas[1]]
+
+    def test_without_replicas_everything_reads_from_the_primary(self):
+        # Arrange
+        router = ReplicaRouter([])
+        request = type("FakeRequest", (), {"method": "GET", "cookies": {}})()
+
+        # Act / Assert
+        assert router.enabled is False
+        assert router.choose(request) is None
@@ -0,0 +1,29 @@
+import pytest
+from run import server_options
+
+@pytest.mark.unit
+class TestServerOptions:
+
+    def test_dev_mode_reloads_in_single_process(self):
+        # Act
+        options = server_options("dev")
+
+        # Assert
+        assert options["reload"] is True
+        assert "workers" not in options
+
+    def test_prod_mode_runs_workers_without_reload(self):
+        # Act
+        options = server_options("prod")
+
+        # Assert
+        assert options["reload"] is False
+        assert options["workers"] >= 1
+        assert options["loop"] == "uvloop"
+        assert options["http"] == "httptools"
+        assert options["timeout_graceful_shutdown"] > 0
+
+    def test_unknown_mode_is_rejected(self):
+        # Act / Assert
+        with pytest.raises(ValueError):
+            server_options("staging")
@@ -0,0 +1,56 @@
+import json
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from app.models import Note, User
+from app.responses import orm_list_response
+from app.schemas import NoteOut, UserOut, note_list_adapter, validate_orm
+
+
+def make_note(note_id):
+    return Note(id=note_id, title=f"Note {note_id}", content="Contenu", owner_id=1,
+                created_at=datetime(2025, 1, 1), updated_at=datetime(2025, 1, 2, 3, 4, 5, 6))
+
+@pytest.mark.unit
+class TestSchemas:
+
+    def test_user_schema_never_exposes_password_hash(self):
+        # Arrange
+        user = User(id=1, email="a@example.com", name="A", hashed_password="$2b$12$secret", is_email_verified=True)
+
+        # Act
+        data = UserOut.model_validate(user).model_dump()
+
+        # Assert
+        assert "hashed_password" not in data
+        assert data["email"] == "a@example.com"
+
+    def test_orm_list_response_matches_note_schema(self):
+        # Arrange
+        notes = [make_note(1), make_note(2)]
+
+        # Act
+        response = orm_list_response(note_list_adapter, notes, headers={"X-Next-Cursor": "abc"})
+
+        # Assert
+        assert response.media_type == "application/json"
+        assert response.headers["X-Next-Cursor"] == "abc"
+        assert json.loads(response.body) == [
+            {"id": 1, "title": "Note 1", "content": "Contenu", "owner_id": 1,
+             "created_at": "2025-01-01T00:00:00", "updated_at": "2025-01-02T03:04:05.000006"},
+            {"id": 2, "title": "Note 2", "content": "Contenu", "owner_id": 1,
+             "created_at": "2025-01-01T00:00:00", "updated_at": "2025-01-02T03:04:05.000006"},
+        ]
+
+    def test_validate_orm_falls_back_to_attributes_when_dict_is_incomplete(self):
+        # Arrange
+        note = make_note(1)
+        del note.__dict__["content"]
+
+        # Act
+        with patch.object(Note, "content", "Rechargé"):
+            models = validate_orm(note_list_adapter, [note])
+
+        # Assert
+        assert models == [NoteOut(id=1, title="Note 1", content="Rechargé", owner_id=1,
+                                  created_at=datetime(2025, 1, 1), updated_at=datetime(2025, 1, 2, 3, 4, 5, 6))]
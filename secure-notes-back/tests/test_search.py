@@ -0,0 +1,139 @@
+import asyncio
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.models import User, Note
+from app.repositories import NoteRepository
+from app.search import InvertedIndex, search_index, tokenize
+
+@pytest.mark.notes
+class TestInvertedIndex:
+
+    def test_tokenize_lowercases_and_strips_accents(self):
+        assert tokenize("Réunion d'Équipe, 2025!") == ["reunion", "d", "equipe", "2025"]
+
+    def test_search_requires_all_terms_and_ranks_by_relevance(self):
+        # Arrange
+        index = InvertedIndex()
+        index.load(1, [
+            (1, "Courses", "acheter du pain et du lait"),
+            (2, "Pain", "pain pain pain au levain"),
+            (3, "Lait", "lait seulement"),
+        ])
+
+        # Act
+        both = index.search(1, "pain lait", limit=10)
+        bread = index.search(1, "pain", limit=10)
+
+        # Assert
+        assert [note_id for note_id, _ in both] == [1]
+        assert [note_id for note_id, _ in bread] == [2, 1]
+
+    def test_search_is_scoped_to_owner(self):
+        # Arrange
+        index = InvertedIndex()
+        index.load(1, [(1, "Secret", "projet confidentiel")])
+        index.load(2, [(2, "Autre", "projet public")])
+
+        # Act / Assert
+        assert [note_id for note_id, _ in index.search(2, "projet", limit=10)] == [2]
+        assert index.search(3, "projet", limit=10) == []
+
+    def test_update_and_remove_keep_index_consistent(self):
+        # Arrange
+        index = InvertedIndex()
+        index.load(1, [(1, "Ancien", "texte initial")])
+
+        # Act
+        index.add(1, 1, "Nouveau", "texte modifié")
+        after_update = index.search(1, "initial", limit=10), index.search(1, "modifie", limit=10)
+        index.remove(1)
+
+        # Assert
+        assert after_update[0] == []
+        assert [note_id for note_id, _ in after_update[1]] == [1]
+        assert index.search(1, "texte", limit=10) == []
+
+    def test_pagination_with_offset(self):
+        # Arrange
+        index = InvertedIndex()
+        index.load(1, [(i, f"note {i}", "mot " * i) for i in range(1, 6)])
+
+        # Act
+        first, second = index.search(1, "mot", limit=2), index.search(1, "mot", limit=2, offset=2)
+
+        # Assert
+        assert len(first) == len(second) == 2
+        assert not {note_id for note_id, _ in first} & {note_id for note_id, _ in second}
+
+@pytest.mark.notes
+@pytest.mark.database
+class TestNoteRepositorySearch:
+
+    @pytest.fixture(autouse=True)
+    def fresh_index(self):
+        search_index.clear()
+        yield
+        search_index.clear()
+
+    def test_search_follows_create_update_delete(self, run_with_db):
+        async def scenario(db):
+            owner = User(email="a@example.com", name="A", hashed_password="x")
+            db.add(owner)
+            await db.commit()
+            note = await NoteRepository.create(db, Note(title="Liste", content="acheter des pommes", owner_id=owner.id))
+            found_after_create = await NoteRepository.search(db, owner_id=owner.id, query="pommes", limit=10)
+
+            await NoteRepository.update(db, Note(id=note.id, title="Liste", content="acheter des poires", owner_id=owner.id))
+            found_after_update = await NoteRepository.search(db, owner_id=owner.id, query="poires", limit=10)
+            stale_after_update = await NoteRepository.search(db, owner_id=owner.id, query="pommes", limit=10)
+
+            await NoteRepository.delete(db, await NoteRepository.get_by_id(db, note_id=note.id))
+            found_after_delete = await NoteRepository.search(db, owner_id=owner.id, query="poires", limit=10)
+            return note.id, found_after_create, found_after_update, stale_after_update, found_after_delete
+
+        # Act
+        note_id, created, updated, stale, deleted = run_with_db(scenario)
+
+        # Assert
+        assert [note.id for note, _ in created] == [note_id]
+        assert [note.content for note, _ in updated] == ["acheter des poires"]
+        assert stale == []
+        assert deleted == []
+
+    def test_writes_from_another_worker_reload_the_index(self, db_client, sql_statements):
+        # Arrange : cette session voit l'index du processus, l'autre worker écrit sans le toucher
+        sessions = async_sessionmaker(db_client.async_engine, expire_on_commit=False)
+
+        async def other_worker_rewrites(note_id):
+            async with sessions() as db:
+                await NoteRepository.next_change_seq(db, 1)
+                await db.execute(update(Note).where(Note.id == note_id, Note.owner_id == 1).values(content="acheter des poires"))
+                await db.commit()
+
+        async def scenario():
+            async with sessions() as db:
+                note = await NoteRepository.create(db, Note(title="Liste", content="acheter des pommes", owner_id=1))
+                before = await NoteRepository.search(db, owner_id=1, query="pommes", limit=10)
+                await NoteRepository.create(db, Note(title="Autre", content="rien", owner_id=1))
+                sql_statements.clear()
+                after_local_write = await NoteRepository.search(db, owner_id=1, query="pommes", limit=10)
+                local_reloads = sum(statement.startswith("SELECT notes.id, notes.title, notes.content \nFROM") for statement in sql_statements)
+
+            await other_worker_rewrites(note.id)
+
+            async with sessions() as db:
+                stale = await NoteRepository.search(db, owner_id=1, query="pommes", limit=10)
+                fresh = await NoteRepository.search(db, owner_id=1, query="poires", limit=10)
+            return note.id, before, after_local_write, local_reloads, stale, fresh
+
+        # Act
+        note_id, before, after_local_write, local_reloads, stale, fresh = asyncio.run(scenario())
+
+        # Assert
+        assert [note.id for note, _ in before] == [note_id]
+        assert [note.id for note, _ in after_local_write] == [note_id]
+        # Les écritures de ce processus sont appliquées à l'index sans rechargement
+        assert local_reloads == 0
+        assert stale == []
+        assert [note.content for note, _ in fresh] == ["acheter des poires"]
@@ -0,0 +1,171 @@
+import os
+import subprocess
+import sys
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect, text
+from app.extensions import Base
+from app.migrate import alembic_config, upgrade_database
+from app.startup import backoff_delays
+import main
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+# Budget d'import de l'application (temps cumulé de main, sans base joignable), ajustable sur une CI lente
+IMPORT_TIME_BUDGET = float(os.getenv("IMPORT_TIME_BUDGET", "3"))
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Index réservés à Postgres, absents de SQLite
+    return not (type_ == "index" and getattr(object, "_ddl_if", None) is not None)
+
+
+@pytest.mark.unit
+class TestStartup:
+
+    def test_import_does_not_wait_for_the_database(self):
+        # Arrange : base injoignable, l'import ne doit pas s'y connecter (processus neuf, main pas encore importé)
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{BACKEND_DIR}/missing-dir/none.db", "SMTP_PORT": "587"}
+        code = (
+            "from unittest.mock import patch\n"
+            "from sqlalchemy.pool import Pool\n"
+            "with patch.object(Pool, 'connect', autospec=True) as connect:\n"
+            "    import main\n"
+            "print(connect.call_count)"
+        )
+
+        # Act
+        result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=60)
+
+        # Assert : aucune connexion demandée à un pool pendant l'import
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip().splitlines()[-1] == "0"
+
+    @pytest.mark.slow
+    def test_import_stays_within_the_cold_start_budget(self):
+        # Arrange : -X importtime mesure l'import lui-même, sans le démarrage de l'interpréteur
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{BACKEND_DIR}/missing-dir/none.db", "SMTP_PORT": "587"}
+
+        # Act
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=60)
+
+        # Assert : temps cumulé de main (en microsecondes), dépendances comprises
+        assert result.returncode == 0, result.stderr
+        cumulative = [int(line.split("|")[1]) for line in result.stderr.splitlines() if line.startswith("import time:") and line.split("|")[-1].strip() == "main"]
+        assert cumulative, result.stderr[-2000:]
+        assert cumulative[0] / 1e6 < IMPORT_TIME_BUDGET, f"{cumulative[0] / 1e6:.2f}s"
+
+    def test_backoff_delays_are_jittered_and_capped(self):
+        # Act
+        delays = backoff_delays(base=0.5, cap=4)
+        samples = [next(delays) for _ in range(20)]
+
+        # Assert
+        assert 0 <= samples[0] <= 0.5
+        assert all(0 <= delay <= 4 for delay in samples)
+
+
+@pytest.mark.unit
+class TestProbes:
+
+    def test_livez_does_not_touch_the_database(self):
+        # Arrange
+        client = TestClient(main.app)
+
+        # Act
+        with patch('main.database_health.check', autospec=True) as check:
+            response = client.get("/livez")
+
+        # Assert
+        assert response.status_code == 200
+        check.assert_not_called()
+
+    def test_readyz_is_unavailable_until_the_database_answers(self):
+        # Arrange
+        client = TestClient(main.app)
+        main.app.state.ready = False
+
+        # Act
+        starting = client.get("/readyz")
+        main.app.state.ready = True
+        with patch('main.database_health.check', autospec=True, return_value={"status": "connected"}):
+            ready = client.get("/readyz")
+        with patch('main.database_health.check', autospec=True, return_value={"status": "disconnected", "error": "down"}):
+            down = client.get("/readyz")
+        main.app.state.ready = False
+
+        # Assert
+        assert starting.status_code == 503
+        assert ready.status_code == 200
+        assert down.status_code == 503
+        assert down.json()["error"] == "down"
+
+
+@pytest.mark.database
+class TestMigrations:
+
+    def test_migrations_match_the_models(self, tmp_path):
+        # Arrange
+        url = f"sqlite:///{tmp_path}/migrated.db"
+
+        # Act
+        upgrade_database(url)
+        engine = create_engine(url)
+        with engine.connect() as conn:
+            context = MigrationContext.configure(conn, opts={"include_object": include_object})
+            diff = compare_metadata(context, Base.metadata)
+        engine.dispose()
+
+        # Assert
+        assert diff == []
+
+    def test_partitioned_notes_keys_match_the_models(self):
+        # Arrange : script SQL de 0007 pour Postgres (sans serveur) et DDL des modèles, avec 4 partitions
+        url = "postgresql://notes@localhost/notes"
+        env = {**os.environ, "DATABASE_URL": url, "NOTES_PARTITIONS": "4"}
+        code = (
+            "from alembic import command\n"
+            "from sqlalchemy.dialects import postgresql\n"
+            "from sqlalchemy.schema import CreateTable\n"
+            "from app.migrate import alembic_config\n"
+            "from app.models import Attachment, Note\n"
+            f"command.upgrade(alembic_config({url!r}), '0006_attachments:0007_notes_hash_partitions', sql=True)\n"
+            "print('-- models')\n"
+            "for table in (Note.__table__, Attachment.__table__):\n"
+            "    print(CreateTable(table).compile(dialect=postgresql.dialect()))\n"
+        )
+
+        # Act
+        result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=60)
+        migration, _, models = result.stdout.partition("-- models")
+
+        # Assert
+        assert result.returncode == 0, result.stderr
+        assert "ADD CONSTRAINT notes_pkey PRIMARY KEY (id, owner_id)" in migration
+        assert "FOREIGN KEY(note_id, owner_id) REFERENCES notes (id, owner_id) ON DELETE CASCADE" in migration
+        assert "COMMENT ON TABLE notes IS 'hash partitions: 4'" in migration
+        assert "PRIMARY KEY (id, owner_id)" in models
+        assert "FOREIGN KEY(note_id, owner_id) REFERENCES notes (id, owner_id) ON DELETE CASCADE" in models
+
+    def test_existing_create_all_schema_is_adopted(self, tmp_path):
+        # Arrange : base créée par l'ancien create_all au démarrage, sans table alembic_version
+        url = f"sqlite:///{tmp_path}/legacy.db"
+        upgrade_database(url, revision="0002_notes_indexes_data_keys")
+        engine = create_engine(url)
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE alembic_version"))
+
+        # Act
+        upgrade_database(url)
+        tables = inspect(engine).get_table_names()
+        with engine.connect() as conn:
+            revision = MigrationContext.configure(conn).get_current_revision()
+        engine.dispose()
+
+        # Assert
+        assert {"users", "notes", "alembic_version"} <= set(tables)
+        assert revision == ScriptDirectory.from_config(alembic_config()).get_current_head()
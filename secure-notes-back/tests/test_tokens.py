@@ -0,0 +1,162 @@
+import asyncio
+import pytest
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from fastapi import HTTPException
+from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.routes.auth_routes import verify_token
+from app.tokens import BloomFilter, DatabaseRevocations, TokenRevoked, TokenVerifier, token_digest, token_verifier
+
+
+def make_token(verifier, sub="1", expires_in=timedelta(hours=1)):
+    return verifier.encode({"sub": sub, "exp": datetime.utcnow() + expires_in})
+
+@pytest.fixture
+def verifier():
+    return TokenVerifier("test-secret", cache_size=8, revocation_capacity=4)
+
+@pytest.mark.unit
+class TestBloomFilter:
+
+    def test_added_digests_are_always_found(self):
+        # Arrange
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        added = [token_digest(f"token-{i}") for i in range(1000)]
+
+        # Act
+        for digest in added:
+            bloom.add(digest)
+        false_positives = sum(token_digest(f"other-{i}") in bloom for i in range(10_000))
+
+        # Assert
+        assert all(digest in bloom for digest in added)
+        assert false_positives < 300
+
+@pytest.mark.auth
+class TestTokenVerifier:
+
+    def test_claims_are_cached_after_first_verification(self, verifier):
+        # Arrange
+        token = make_token(verifier)
+
+        # Act
+        with patch('app.tokens.jwt.decode', wraps=jwt.decode) as decode:
+            claims = [verifier.decode(token) for _ in range(5)]
+
+        # Assert
+        assert all(claim["sub"] == "1" for claim in claims)
+        assert decode.call_count == 1
+        assert verifier.stats()["hits"] == 4
+
+    def test_cached_claims_do_not_outlive_the_token(self, verifier):
+        # Arrange
+        token = make_token(verifier, expires_in=timedelta(seconds=30))
+
+        # Act
+        verifier.decode(token)
+
+        # Assert
+        with patch('app.cache.time.monotonic', return_value=time.monotonic() + 31):
+            assert verifier._claims.get(token_digest(token)) is None
+
+    def test_invalid_signature_is_rejected(self, verifier):
+        # Arrange
+        token = make_token(TokenVerifier("other-secret"))
+
+        # Act / Assert
+        with pytest.raises(JWTError):
+            verifier.decode(token)
+
+    def test_revoked_token_is_rejected_even_when_cached(self, verifier):
+        # Arrange
+        token = make_token(verifier)
+        other = make_token(verifier, sub="2")
+        verifier.decode(token)
+
+        # Act
+        asyncio.run(verifier.revoke(token))
+
+        # Assert
+        with pytest.raises(TokenRevoked):
+            verifier.decode(token)
+        assert verifier.decode(other)["sub"] == "2"
+
+    def test_expired_revocations_are_pruned(self, verifier):
+        # Arrange
+        expired = [make_token(verifier, sub=str(i), expires_in=timedelta(seconds=1)) for i in range(4)]
+        for token in expired:
+            asyncio.run(verifier.revoke(token))
+        live = [make_token(verifier, sub=str(i)) for i in range(10, 13)]
+
+        # Act
+        with patch('app.tokens.time.time', return_value=(datetime.utcnow() + timedelta(minutes=1) - datetime(1970, 1, 1)).total_seconds()):
+            for token in live:
+                asyncio.run(verifier.revoke(token))
+
+        # Assert
+        assert verifier.stats()["revoked"] == 3
+        for token in live:
+            with pytest.raises(TokenRevoked):
+                verifier.decode(token)
+
+    @pytest.mark.database
+    def test_revocations_are_shared_between_workers_and_restarts(self, run_with_db):
+        async def scenario(db):
+            store = DatabaseRevocations(async_sessionmaker(db.bind, expire_on_commit=False))
+            worker, other_worker = (TokenVerifier("test-secret", store=store, refresh_interval=0) for _ in range(2))
+            token, kept = make_token(worker), make_token(worker, sub="2")
+            other_worker.decode(token)
+
+            await worker.revoke(token)
+            await other_worker.refresh()
+            # Un worker redémarré relit toutes les révocations non expirées
+            restarted = TokenVerifier("test-secret", store=store, refresh_interval=0)
+            await restarted.refresh()
+            return token, kept, other_worker, restarted
+
+        # Act
+        token, kept, other_worker, restarted = run_with_db(scenario)
+
+        # Assert
+        for verifier in (other_worker, restarted):
+            with pytest.raises(TokenRevoked):
+                verifier.decode(token)
+            assert verifier.decode(kept)["sub"] == "2"
+
+    @pytest.mark.database
+    def test_refresh_reads_the_store_at_most_once_per_interval(self, run_with_db):
+        async def scenario(db):
+            store = DatabaseRevocations(async_sessionmaker(db.bind, expire_on_commit=False))
+            verifier = TokenVerifier("test-secret", store=store, refresh_interval=60)
+            with patch.object(store, 'since', wraps=store.since) as since:
+                for _ in range(5):
+                    await verifier.refresh()
+            return since.call_count
+
+        # Act
+        reads = run_with_db(scenario)
+
+        # Assert
+        assert reads == 1
+
+    def test_logout_revokes_the_cookie_token(self, client, db_client):
+        # Arrange
+        store = DatabaseRevocations(async_sessionmaker(db_client.async_engine, expire_on_commit=False))
+        token = make_token(token_verifier, sub="42")
+        assert verify_token(token) == 42
+
+        # Act
+        with patch.object(token_verifier, 'store', store):
+            response = client.post("/auth/logout", cookies={"access_token": token})
+        restarted = TokenVerifier(token_verifier.secret_key, store=store)
+        asyncio.run(restarted.refresh())
+
+        # Assert
+        assert response.status_code == 200
+        with pytest.raises(HTTPException) as error:
+            verify_token(token)
+        assert error.value.status_code == 401
+        with pytest.raises(TokenRevoked):
+            restarted.decode(token)
@@ -19,7 +19,7 @@ class TestUsersRoutes:
 
 
     @patch('app.routes.users_routes.get_current_user_from_access_cookie')
-    @patch('app.routes.users_routes.UserRepository')
+    @patch('app.routes.users_routes.UserRepository', autospec=True)
     @patch('app.routes.users_routes.get_db')
     def test_update_user_success(self, mock_get_db, mock_user_repo, mock_get_user, 
                                 client, mock_user):
@@ -39,8 +39,25 @@ class TestUsersRoutes:
         assert response.status_code == 200
         assert "updated" in response.json()["message"]
 
+    @patch('app.routes.users_routes.UserRepository', autospec=True)
+    def test_update_user_never_returns_password_hash(self, mock_user_repo, client, mock_user):
+        # Arrange
+        mock_user_repo.update.return_value = mock_user
+
+        # Act
+        response = client.put("/users/1", json={
+            "email": "test@example.com",
+            "name": "Test User",
+            "hashed_password": "new_hash"
+        })
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json()["user"]["email"] == "test@example.com"
+        assert "hashed_password" not in response.json()["user"]
+
     @patch('app.routes.users_routes.get_current_user_from_access_cookie')
-    @patch('app.routes.users_routes.UserRepository')
+    @patch('app.routes.users_routes.UserRepository', autospec=True)
     @patch('app.routes.users_routes.get_db')
     def test_update_user_exception(self, mock_get_db, mock_user_repo, mock_get_user, client, mock_user):
         # Arrange
@@ -59,7 +76,7 @@ class TestUsersRoutes:
         assert response.status_code == 500
 
     @patch('app.routes.users_routes.get_current_user_from_access_cookie')
-    @patch('app.routes.users_routes.UserRepository')
+    @patch('app.routes.users_routes.UserRepository', autospec=True)
     @patch('app.routes.users_routes.get_db')
     def test_delete_user_success(self, mock_get_db, mock_user_repo, mock_get_user, 
                                 client, mock_user):
@@ -67,6 +84,7 @@ class TestUsersRoutes:
         mock_get_db.return_value = Mock()
         mock_get_user.return_value = mock_user
         mock_user_repo.get_by_id.return_value = mock_user
+        mock_user_repo.count_notes.return_value = 10
         mock_user_repo.delete.return_value = None
         
         # Act
@@ -77,7 +95,7 @@ class TestUsersRoutes:
         assert "deleted" in response.json()["message"]
 
     @patch('app.routes.users_routes.get_current_user_from_access_cookie')
-    @patch('app.routes.users_routes.UserRepository')
+    @patch('app.routes.users_routes.UserRepository', autospec=True)
     @patch('app.routes.users_routes.get_db')
     def test_delete_user_not_found(self, mock_get_db, mock_user_repo, mock_get_user, client, mock_user):
         # Arrange
@@ -86,19 +104,20 @@ class TestUsersRoutes:
         mock_user_repo.get_by_id.return_value = None
         
         # Act
-        response = client.delete("/users/999")
+        response = client.delete("/users/1")
         
         # Assert
         assert response.status_code == 404
 
     @patch('app.routes.users_routes.get_current_user_from_access_cookie')
-    @patch('app.routes.users_routes.UserRepository')
+    @patch('app.routes.users_routes.UserRepository', autospec=True)
     @patch('app.routes.users_routes.get_db')
     def test_delete_user_exception(self, mock_get_db, mock_user_repo, mock_get_user, client, mock_user):
         # Arrange
         mock_get_db.return_value = Mock()
         mock_get_user.return_value = mock_user
         mock_user_repo.get_by_id.return_value = mock_user
+        mock_user_repo.count_notes.return_value = 10
         mock_user_repo.delete.side_effect = Exception("Database error")
         
         # Act